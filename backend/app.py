@@ -1,6 +1,7 @@
 # backend/app.py
 import flask
-from flask import Flask, jsonify
+import time
+from flask import Flask, Response, g, jsonify, request
 from flask_cors import CORS
 from config import Config
 import os
@@ -17,6 +18,12 @@ from routes.anime_api_routes import anime_api_bp
 from routes.proxy_api_routes import proxy_api_bp
 from controllers.data_controller import DataController
 from globals import global_clustering_service, global_data_embedding_service
+from globals import global_startup_tasks, global_ollama_embedder, global_anime_api_service, global_job_runner
+from utils.lazy_service import is_initialized, resolve
+from services.ollama_client import OllamaClient
+from services.model_residency_service import ModelResidencyManager
+from services.metrics_service import Metrics
+from services.profiling_service import Profiler
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(module)s - %(message)s')
 
@@ -29,7 +36,17 @@ def create_app():
     app.config.from_object(Config)
 
     # Initialize controllers with their required services
-    DataController.initialize(global_clustering_service, global_data_embedding_service)
+    DataController.initialize(global_clustering_service, global_data_embedding_service, global_job_runner)
+
+    # Keep Ollama's liveness state fresh in the background instead of probing per request
+    OllamaClient.shared().start_health_monitor()
+
+    # Load the chat and embedding models before the first request needs them
+    if Config.OLLAMA_PRELOAD_MODELS:
+        ModelResidencyManager.shared().warm_up_in_background()
+
+    register_metrics(app)
+    register_profiling(app)
 
     # Register all API blueprints
     app.register_blueprint(one_piece_api_bp)
@@ -40,19 +57,157 @@ def create_app():
 
     @app.route('/')
     def index():
+        # Reporting on the vector store must not be what builds it, so it reads as empty until start-up does.
+        store_loaded = is_initialized(global_vector_store)
         return jsonify({
             "message": "Clank Clank Mushi API is running!",
-            "vector_db_documents": len(global_vector_store.documents),
+            "ready": global_startup_tasks.is_ready(),
+            "startup": global_startup_tasks.get_status(),
+            "vector_db_documents": len(global_vector_store.documents) if store_loaded else 0,
+            "vector_snapshot_version": global_vector_store.snapshot_version if store_loaded else None,
             "current_llm_for_generation": Config.CURRENT_GENERATION_LLM,
-            "cluster_cache_exists": os.path.exists(CLUSTER_CACHE_PATH)
+            "ollama": OllamaClient.shared().get_health(),
+            "cluster_cache_exists": os.path.exists(CLUSTER_CACHE_PATH),
+            "jobs": global_job_runner.get_status()
         }), 200
 
+    @app.route('/ready')
+    def ready():
+        # For load balancers and orchestrators: 503 until the required start-up tasks are done.
+        status = global_startup_tasks.get_status()
+        return jsonify(status), 200 if status["ready"] else 503
+
     return app
 
+def register_metrics(app: Flask):
+    """
+    Times every request into a histogram (until its body has finished streaming), serves
+    /metrics and, with METRICS_TIMING_HEADER, adds a Server-Timing header per response.
+    """
+    metrics = Metrics.shared()
+
+    @app.route('/metrics')
+    def metrics_endpoint():
+        return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+    if not metrics.enabled:
+        return
+
+    @app.before_request
+    def start_request_timer():
+        g.request_started_at = time.perf_counter()
+        metrics.start_request()
+
+    @app.after_request
+    def record_request_timing(response):
+        timings = metrics.finish_request()
+        if Config.METRICS_TIMING_HEADER and timings:
+            response.headers['Server-Timing'] = metrics.server_timing_header(timings)
+        started_at = g.get('request_started_at')
+        if started_at is not None:
+            labels = {
+                "endpoint": request.url_rule.rule if request.url_rule else "unmatched",
+                "method": request.method,
+                "status": str(response.status_code),
+            }
+            response.call_on_close(lambda: metrics.observe_histogram(Metrics.REQUEST_HISTOGRAM, time.perf_counter() - started_at, **labels))
+        return response
+
+def register_profiling(app: Flask):
+    """
+    Profiles a single request when it carries `?profile=1` and the admin token in the
+    X-Admin-Token header (see PROFILING_ADMIN_TOKEN). The profile covers the request until
+    its body has finished streaming; X-Profile-Report names the files it is written to.
+    """
+    profiler = Profiler.shared()
+
+    @app.before_request
+    def start_request_profile():
+        if request.args.get('profile') not in ('1', 'true'):
+            return None
+        if not profiler.is_authorized(request.headers.get('X-Admin-Token')):
+            return jsonify({"error": "Profiling requires a valid X-Admin-Token."}), 403
+        report = {}
+        session = profiler.profile(f"request-{request.endpoint or 'unmatched'}", report=report)
+        session.__enter__()
+        g.profile_session, g.profile_report = session, report
+
+    def stop_request_profile():
+        session = g.pop('profile_session', None)
+        if session is not None:
+            session.__exit__(None, None, None)
+
+    @app.after_request
+    def attach_request_profile(response):
+        session = g.pop('profile_session', None)
+        if session is not None:
+            response.headers['X-Profile-Report'] = os.path.basename(g.profile_report["folded"])
+            response.call_on_close(lambda: session.__exit__(None, None, None))
+        return response
+
+    @app.teardown_request
+    def close_failed_request_profile(error):
+        # Only still set when the request failed before a response was produced.
+        stop_request_profile()
+
+def load_startup_data():
+    """
+    Loads the vector database into memory and warns if the data needs to be built first.
+    """
+    logging.info("--- Server Startup: Loading Vector Database ---")
+    if Config.VECTOR_STORE_MODE == "shared" and global_vector_store.load_snapshot():
+        # Workers share one memory-mapped snapshot and follow newly published versions.
+        global_vector_store.start_snapshot_watcher()
+    else:
+        if Config.VECTOR_STORE_MODE == "shared":
+            logging.warning("No published vector snapshot found. Loading a private copy of the vector store instead.")
+        global_vector_store.load()
+
+    if not global_vector_store.documents or not os.path.exists(CLUSTER_CACHE_PATH):
+        logging.warning("!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
+        logging.warning("!!! WARNING: Vector DB or Cluster Cache not found.   !!!")
+        logging.warning("!!! The application will run, but search and data    !!!")
+        logging.warning("!!! insights will not function correctly.           !!!")
+        logging.warning("!!!                                                 !!!")
+        logging.warning("!!! TO FIX: Stop the server and run this command:   !!!")
+        logging.warning("!!! python3 backend/build_database.py               !!!")
+        logging.warning("!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
+    else:
+        logging.info(f"Successfully loaded {len(global_vector_store.documents)} documents from vector store.")
+        logging.info(f"Cluster cache is present at {CLUSTER_CACHE_PATH}.")
+    logging.info("--- Load Check Complete ---")
+
+def start_background_startup():
+    """
+    Starts the slow start-up work on background threads so the server can answer requests
+    (and report its progress on `/` and `/ready`) straight away. Only loading the vector
+    store holds readiness back; the embedding model check keeps retrying while Ollama is
+    down, and the scraper session is built ahead of the first anime request.
+
+    Ingestion jobs start executing once the store has loaded. Shared-mode workers serve a
+    read-only snapshot, so they neither execute jobs nor schedule refreshes.
+    """
+    def load_vector_store():
+        load_startup_data()
+        return True
+
+    global_startup_tasks.run_in_background("vector_store", load_vector_store)
+    global_startup_tasks.run_in_background("ollama_embedding_model", global_ollama_embedder.verify_model, required=False,
+                                           retry_seconds=Config.OLLAMA_HEALTH_CHECK_INTERVAL_SECONDS)
+    global_startup_tasks.run_in_background("anime_scraper", lambda: resolve(global_anime_api_service) is not None, required=False)
+    if Config.VECTOR_STORE_MODE != "shared":
+        global_job_runner.start(is_ready=global_startup_tasks.is_ready, scheduled_kind=DataController.JOB_REFRESH,
+                                resets_schedule=(DataController.JOB_INGEST_ALL,))
+
 def on_shutdown():
     """
     Ensures that the in-memory vector store is saved to disk when the app shuts down.
+    Only unsaved changes are written, so several worker processes exiting together
+    do not all rewrite the same files.
     """
+    if not is_initialized(global_vector_store) or not global_vector_store.has_unsaved_changes:
+        logging.info("Flask app is shutting down. Vector store has no unsaved changes. Goodbye, Senpai!")
+        return
     logging.info("Flask app is shutting down. Saving vector store...")
     global_vector_store.save()
     logging.info("Vector store saved successfully. Goodbye, Senpai!")
@@ -61,25 +216,12 @@ def on_shutdown():
 atexit.register(on_shutdown)
 
 if __name__ == '__main__':
+    # Development server with the auto-reloader; use serve.py in production.
     app = create_app()
 
-    if os.environ.get('WERKZEUG_RUN_MAIN') != 'true':
-        logging.info("--- Server Startup: Loading Vector Database ---")
-        global_vector_store.load()
-
-        if not global_vector_store.documents or not os.path.exists(CLUSTER_CACHE_PATH):
-            logging.warning("!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
-            logging.warning("!!! WARNING: Vector DB or Cluster Cache not found.   !!!")
-            logging.warning("!!! The application will run, but search and data    !!!")
-            logging.warning("!!! insights will not function correctly.           !!!")
-            logging.warning("!!!                                                 !!!")
-            logging.warning("!!! TO FIX: Stop the server and run this command:   !!!")
-            logging.warning("!!! python3 backend/build_database.py               !!!")
-            logging.warning("!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
-        else:
-            logging.info(f"Successfully loaded {len(global_vector_store.documents)} documents from vector store.")
-            logging.info(f"Cluster cache is present at {CLUSTER_CACHE_PATH}.")
-        logging.info("--- Load Check Complete ---")
+    # Only the reloader's child process serves requests, so only it loads the data.
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_background_startup()
 
     logging.info(f"🚀 Mushi is taking off! Listening on http://{Config.HOST}:{Config.PORT}")
     app.run(debug=True, host=Config.HOST, port=Config.PORT, use_reloader=True)
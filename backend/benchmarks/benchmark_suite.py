@@ -0,0 +1,326 @@
+# backend/benchmarks/benchmark_suite.py
+"""
+Offline benchmark suite for the backend's hot paths. Needs no network: Ollama, the anime
+site and the HLS origin are the local stand-ins from fake_servers.py, the anime pages are
+the recorded responses in fixtures/hianime, and embeddings are deterministic.
+
+Cases:
+- vector_store: add, search, save and load at each --sizes document count
+- clustering: the full cluster precompute (K-Means runs plus LLM titling)
+- anime_parsing: the home and details routes, and the parse time of each recorded page
+- m3u8_rewrite: the playlist proxy rewriting a long playlist
+- chat: the full chat path (embedding, retrieval, prompt, streamed generation)
+
+Results are written as JSON (--output), tagged with the git commit, so two runs can be
+compared with --compare: every metric is listed with its change, and the run exits with
+status 1 when any metric regressed by more than --threshold. A full run takes several
+minutes (mostly saving the 100k-document store); --quick stops at 10k documents.
+
+Usage:
+    python benchmarks/benchmark_suite.py [--cases vector_store,clustering,anime_parsing,m3u8_rewrite,chat]
+                                         [--sizes 1000,10000,100000] [--dimension 256] [--quick]
+                                         [--embed-delay 0.0] [--first-token-delay 0.0] [--token-delay 0.0]
+                                         [--output results.json] [--compare baseline.json] [--threshold 0.2]
+"""
+import argparse
+import datetime
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BENCHMARKS_DIR = os.path.abspath(os.path.dirname(__file__))
+BACKEND_DIR = os.path.abspath(os.path.join(BENCHMARKS_DIR, '..'))
+sys.path.insert(0, BENCHMARKS_DIR)
+sys.path.insert(0, BACKEND_DIR)
+from fake_servers import fake_embedding, load_site_fixtures, make_anime_site_handler, make_media_origin_handler, make_ollama_handler, start_server
+
+CASES = ("vector_store", "clustering", "anime_parsing", "m3u8_rewrite", "chat")
+# Metrics where a larger value is better; every other metric is a duration or a size.
+HIGHER_IS_BETTER_SUFFIXES = ("_per_second",)
+
+
+def percentile(samples, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def latency_summary(samples_seconds, prefix: str = "") -> dict:
+    return {
+        f"{prefix}p50_ms": round(statistics.median(samples_seconds) * 1000, 3),
+        f"{prefix}p99_ms": round(percentile(samples_seconds, 0.99) * 1000, 3),
+    }
+
+
+def start_upstreams(args) -> dict:
+    """Starts the fake upstreams and points the backend's configuration at them (before it is imported)."""
+    ollama = start_server(make_ollama_handler(args.first_token_delay, args.token_delay, embed_delay=args.embed_delay), 0)
+    site = start_server(make_anime_site_handler(fixtures=load_site_fixtures()), 0)
+    media = start_server(make_media_origin_handler(segments=args.playlist_segments), 0)
+    url = lambda server: f"http://127.0.0.1:{server.server_address[1]}"
+    os.environ.update(
+        OLLAMA_BASE_URL=url(ollama),
+        ANIME_SOURCE_BASE_URL=url(site),
+        ANIME_EMBED_BASE_URL=url(site),
+        ANIME_DECRYPTION_KEY_URL=f"{url(site)}/key.txt",
+        OLLAMA_PRELOAD_MODELS="false",
+        # Measure the local path only, with every chat turn reaching the model.
+        LLM_FALLBACK_PROVIDER="",
+        SEMANTIC_CACHE_ENABLED="false",
+        CHAT_SUGGESTIONS_MODE="retrieval",
+        VECTOR_SNAPSHOT_PUBLISH_ON_SAVE="false",
+    )
+    return {"media": url(media)}
+
+
+def synthetic_documents(count: int, dimension: int, seed: int = 0):
+    vectors = np.random.default_rng(seed).random((count, dimension), dtype=np.float32)
+    for i, vector in enumerate(vectors):
+        yield (f"Synthetic document {i} about anime number {i % 500}.", vector.tolist(),
+               {"type": "anime", "title": f"Anime {i % 500}"}, f"synthetic_{i}")
+
+
+def bench_vector_store(sizes, dimension: int, searches: int, workdir: str) -> dict:
+    from embeddings.vector_store import VectorStore
+    results = {}
+    rng = np.random.default_rng(1)
+    for size in sizes:
+        db_path = os.path.join(workdir, f"vector_db_{size}.pkl.gz")
+        store = VectorStore(db_path=db_path)
+        documents = list(synthetic_documents(size, dimension))
+        started_at = time.perf_counter()
+        for content, embedding, metadata, source_item_id in documents:
+            store.add_document(content, embedding, metadata=metadata, source_item_id=source_item_id)
+        store.flush()
+        add_seconds = time.perf_counter() - started_at
+        del documents
+
+        query_array = rng.random((searches, dimension), dtype=np.float32)
+        queries = query_array.tolist()
+        search_times = []
+        for query in queries:
+            started_at = time.perf_counter()
+            store.similarity_search(query, top_k=5)
+            search_times.append(time.perf_counter() - started_at)
+        started_at = time.perf_counter()
+        store.search_batch(query_array, top_k=5)
+        batch_seconds = time.perf_counter() - started_at
+
+        started_at = time.perf_counter()
+        store.save()
+        save_seconds = time.perf_counter() - started_at
+        file_mb = (os.path.getsize(store.db_path) + os.path.getsize(store.index_path)) / 1024 ** 2
+        del store
+
+        reloaded = VectorStore(db_path=db_path)
+        started_at = time.perf_counter()
+        reloaded.load()
+        load_seconds = time.perf_counter() - started_at
+        assert len(reloaded.documents) == size, "Reloaded store lost documents."
+        del reloaded
+        for path in (db_path, db_path.replace('.pkl.gz', '.faiss')):
+            os.remove(path)
+
+        results[f"vector_store_{size}"] = {
+            "add_documents_per_second": round(size / add_seconds, 1),
+            **latency_summary(search_times, "search_"),
+            "search_batch_ms_per_query": round(batch_seconds / searches * 1000, 4),
+            "save_seconds": round(save_seconds, 3),
+            "load_seconds": round(load_seconds, 3),
+            "file_mb": round(file_mb, 1),
+        }
+    return results
+
+
+def bench_clustering(documents: int, dimension: int, workdir: str) -> dict:
+    from embeddings.vector_store import VectorStore
+    import services.clustering_service as clustering_service
+    # The precompute writes its cache to a module-level path; keep the real one untouched.
+    clustering_service.CLUSTER_CACHE_PATH = os.path.join(workdir, 'cluster_cache.json')
+    store = VectorStore(db_path=os.path.join(workdir, 'clustering_db.pkl.gz'))
+    for content, embedding, metadata, source_item_id in synthetic_documents(documents, dimension, seed=2):
+        store.add_document(content, embedding, metadata=metadata, source_item_id=source_item_id)
+    store.flush()
+    service = clustering_service.ClusteringService(vector_store=store)
+    started_at = time.perf_counter()
+    service.precompute_and_cache_all_clusters()
+    return {"clustering": {"documents": documents, "precompute_seconds": round(time.perf_counter() - started_at, 3)}}
+
+
+def bench_anime_parsing(iterations: int) -> dict:
+    from services.anime_api_service import AnimeAPIService
+    service = AnimeAPIService()
+    results = {}
+    # The routes end to end (fetching from the recorded site, parsing and extraction)...
+    for name, call in (("anime_home", service.get_home_info), ("anime_details", lambda: service.get_anime_info("one-piece-100"))):
+        payload, status = call()  # Warm-up, and a check that the fixtures still parse.
+        assert status == 200, f"{name} returned {status}: {payload}"
+        timings = []
+        for _ in range(iterations):
+            started_at = time.perf_counter()
+            call()
+            timings.append(time.perf_counter() - started_at)
+        results[name] = latency_summary(timings)
+    # ...and building the parse tree alone for each recorded page.
+    fixtures = load_site_fixtures()
+    pages = {"home": fixtures["home.html"], "list": fixtures["list.html"], "watch": fixtures["watch.html"],
+             "episode_list": json.loads(fixtures["episode_list.json"])["html"]}
+    parse_results = {}
+    for page, html in pages.items():
+        timings = []
+        for _ in range(iterations):
+            started_at = time.perf_counter()
+            service._parse_html(html)
+            timings.append(time.perf_counter() - started_at)
+        parse_results[f"{page}_p50_ms"] = round(statistics.median(timings) * 1000, 3)
+    results["anime_html_parse"] = parse_results
+    return results
+
+
+def bench_m3u8_rewrite(media_url: str, iterations: int) -> dict:
+    from flask import Flask
+    from routes.proxy_api_routes import proxy_api_bp
+    app = Flask(__name__)
+    app.register_blueprint(proxy_api_bp)
+    client = app.test_client()
+    url = f"/api/proxy/m3u8?url={media_url}/master.m3u8"
+    assert client.get(url).status_code == 200
+    timings = []
+    for _ in range(iterations):
+        started_at = time.perf_counter()
+        client.get(url).get_data()
+        timings.append(time.perf_counter() - started_at)
+    return {"m3u8_rewrite": latency_summary(timings)}
+
+
+def bench_chat(documents: int, iterations: int, token_delay: float = 0.0) -> dict:
+    from flask import Flask
+    from globals import global_vector_store
+    from routes.llm_api_routes import llm_api_bp
+    # The chat path searches the global store; fill it with documents embedded like the queries.
+    for i in range(documents):
+        content = f"Anime {i % 500} is a series about pirates, swordsmen and rival number {i}."
+        global_vector_store.add_document(content, fake_embedding(content), metadata={"type": "anime", "title": f"Anime {i % 500}"},
+                                         source_item_id=f"chat_{i}")
+    global_vector_store.flush()
+    app = Flask(__name__)
+    app.register_blueprint(llm_api_bp)
+    client = app.test_client()
+    first_text_times, total_times = [], []
+    for i in range(iterations):
+        started_at, first_text = time.perf_counter(), None
+        response = client.post('/api/llm/chat', json={"query": f"Who is the swordsman of anime {i}?"}, buffered=False)
+        for line in response.response:
+            if first_text is None and b'"type": "text"' in line:
+                first_text = time.perf_counter() - started_at
+        total_times.append(time.perf_counter() - started_at)
+        if first_text is not None:
+            first_text_times.append(first_text)
+        response.close()
+    assert first_text_times, "No chat turn produced any text."
+    if token_delay > 0:
+        # The answer arrives over len(ANSWER_TOKENS) delays; text before the last of them means it streamed.
+        streamed_by = statistics.median(total_times) - token_delay
+        assert statistics.median(first_text_times) < streamed_by, \
+            "The first text only arrived with the complete answer; the chat path is not streaming."
+    return {"chat": {**latency_summary(first_text_times, "first_text_"), **latency_summary(total_times, "total_"),
+                     "failed_turns": iterations - len(first_text_times)}}
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> bool:
+    """Prints every shared metric with its relative change; returns True if any regressed beyond `threshold`."""
+    regressed = False
+    print(f"\nCompared with {baseline.get('commit')} ({baseline.get('timestamp')}), threshold {threshold:.0%}:")
+    print(f"{'case':<22}{'metric':<28}{'baseline':>12}{'current':>12}{'change':>10}")
+    for case, metrics in current["results"].items():
+        for metric, value in metrics.items():
+            old = baseline.get("results", {}).get(case, {}).get(metric)
+            if not isinstance(value, (int, float)) or not isinstance(old, (int, float)) or old == 0 or metric in ("documents", "failed_turns"):
+                continue
+            change = (value - old) / old
+            worse = -change if metric.endswith(HIGHER_IS_BETTER_SUFFIXES) else change
+            flag = "  REGRESSION" if worse > threshold else ""
+            regressed = regressed or bool(flag)
+            print(f"{case:<22}{metric:<28}{old:>12}{value:>12}{change:>+10.1%}{flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suite.")
+    parser.add_argument('--cases', default=",".join(CASES))
+    parser.add_argument('--sizes', default="1000,10000,100000", help="Document counts for the vector_store case.")
+    parser.add_argument('--dimension', type=int, default=256, help="Embedding size for the vector_store and clustering cases.")
+    parser.add_argument('--quick', action='store_true', help="Smaller sizes and fewer iterations, for a fast check.")
+    parser.add_argument('--embed-delay', type=float, default=0.0, help="Fake Ollama embedding latency in seconds.")
+    parser.add_argument('--first-token-delay', type=float, default=0.0, help="Fake Ollama time to first token in seconds.")
+    parser.add_argument('--token-delay', type=float, default=0.0, help="Fake Ollama delay between tokens in seconds.")
+    parser.add_argument('--playlist-segments', type=int, default=2000)
+    parser.add_argument('--output', help="Write the results as JSON to this file.")
+    parser.add_argument('--compare', help="A previous --output file to compare against.")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Relative change counted as a regression.")
+    parser.add_argument('--verbose', action='store_true', help="Show the backend's log output.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.ERROR)
+    cases = [case.strip() for case in args.cases.split(",") if case.strip()]
+    unknown = set(cases) - set(CASES)
+    if unknown:
+        parser.error(f"Unknown case(s): {', '.join(sorted(unknown))}")
+    sizes = [int(size) for size in args.sizes.split(",")] if not args.quick else [1000, 10000]
+    iterations = 5 if args.quick else 20
+
+    upstreams = start_upstreams(args)
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for case in cases:
+            print(f"Running {case}...", flush=True)
+            started_at = time.perf_counter()
+            if case == "vector_store":
+                results.update(bench_vector_store(sizes, args.dimension, searches=iterations * 10, workdir=workdir))
+            elif case == "clustering":
+                results.update(bench_clustering(1000 if args.quick else 5000, args.dimension, workdir))
+            elif case == "anime_parsing":
+                results.update(bench_anime_parsing(iterations))
+            elif case == "m3u8_rewrite":
+                results.update(bench_m3u8_rewrite(upstreams["media"], iterations))
+            elif case == "chat":
+                results.update(bench_chat(1000 if args.quick else 5000, iterations, args.token_delay))
+            print(f"  done in {time.perf_counter() - started_at:.1f}s", flush=True)
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "settings": {"sizes": sizes, "dimension": args.dimension, "iterations": iterations, "embed_delay": args.embed_delay,
+                     "first_token_delay": args.first_token_delay, "token_delay": args.token_delay},
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if compare(baseline, report, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,282 @@
+# backend/benchmarks/fake_servers.py
+"""
+Local stand-ins for the backend's upstreams, so the chat pipeline, the provider router,
+the anime routes and the video proxy can be exercised (and load-tested) offline.
+
+- Fake Ollama: /api/tags, /api/embeddings (deterministic vectors) and /api/generate
+  (streaming and not), with a configurable embedding latency, time-to-first-token and
+  per-token delay.
+- Fake Gemini: /v1beta/models/<model>:streamGenerateContent (SSE) and :generateContent.
+- Fake anime site: /home and the list pages it pulls its sections from; or, with
+  --recorded-site, the recorded pages in fixtures/hianime (home, list, watch page,
+  episode list AJAX and decryption key).
+- Fake media origin: /master.m3u8 and its /segment-<n>.ts files.
+
+Point the app at them with OLLAMA_BASE_URL=http://127.0.0.1:<ollama-port>,
+GEMINI_BASE_URL=http://127.0.0.1:<gemini-port> (plus any non-empty GEMINI_KEY) and
+ANIME_SOURCE_BASE_URL=http://127.0.0.1:<anime-port>.
+
+Usage:
+    python benchmarks/fake_servers.py [--ollama-port 11434] [--gemini-port 8089] [--anime-port 8090]
+                                      [--media-port 8091] [--first-token-delay 0.0] [--token-delay 0.0]
+                                      [--upstream-delay 0.0] [--fail-ollama] [--recorded-site]
+"""
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+EMBEDDING_DIMENSION = 1024
+ANSWER_TOKENS = ["<mood>happy</mood>", "Roronoa Zoro ", "is the ", "Straw Hat ", "Pirates' ", "swordsman."]
+
+
+def fake_embedding(text: str, dimension: int = EMBEDDING_DIMENSION):
+    """A deterministic, roughly unit-length embedding derived from the words of `text`."""
+    vector = [0.0] * dimension
+    for word in (text or "").lower().split():
+        digest = hashlib.md5(word.encode('utf-8')).digest()
+        vector[int.from_bytes(digest[:4], 'little') % dimension] += 1.0
+    norm = sum(v * v for v in vector) ** 0.5 or 1.0
+    return [v / norm for v in vector]
+
+
+class _JSONHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'{}') if length else {}
+
+    def _send_json(self, payload, status: int = 200):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _start_stream(self, content_type: str):
+        # Chunked, so clients see each line as it is written rather than once the body is complete.
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+    def _write_chunk(self, data: str):
+        payload = data.encode('utf-8')
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(payload), payload))
+        self.wfile.flush()
+
+    def _end_stream(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+def make_ollama_handler(first_token_delay: float = 0.0, token_delay: float = 0.0, fail_generate: bool = False,
+                        embed_delay: float = 0.0):
+    class FakeOllamaHandler(_JSONHandler):
+        def do_GET(self):
+            if self.path == '/api/tags':
+                return self._send_json({"models": [{"name": "snowflake-arctic-embed2:latest"}, {"name": "qwen3:latest"}]})
+            self._send_json({"error": "not found"}, 404)
+
+        def do_POST(self):
+            body = self._read_json()
+            if self.path == '/api/embeddings':
+                time.sleep(embed_delay)
+                return self._send_json({"embedding": fake_embedding(body.get('prompt', ''))})
+            if self.path != '/api/generate':
+                return self._send_json({"error": "not found"}, 404)
+            if fail_generate:
+                return self._send_json({"error": "model failed to load"}, 500)
+
+            prompt = body.get('prompt', '')
+            context = (body.get('context') or []) + list(range(len(prompt) // 4)) + [1] * len(ANSWER_TOKENS)
+            final_stats = {"done": True, "prompt_eval_count": len(prompt) // 4, "eval_count": len(ANSWER_TOKENS),
+                           "load_duration": 0, "context": context}
+            time.sleep(first_token_delay)
+            if not body.get('stream'):
+                return self._send_json({"response": "".join(ANSWER_TOKENS), **final_stats})
+
+            self._start_stream('application/x-ndjson')
+            for token in ANSWER_TOKENS:
+                self._write_chunk(json.dumps({"response": token, "done": False}) + "\n")
+                time.sleep(token_delay)
+            self._write_chunk(json.dumps({"response": "", **final_stats}) + "\n")
+            self._end_stream()
+
+    return FakeOllamaHandler
+
+
+def make_gemini_handler(first_token_delay: float = 0.0, token_delay: float = 0.0):
+    class FakeGeminiHandler(_JSONHandler):
+        def do_POST(self):
+            body = self._read_json()
+            prompt = "".join(part.get("text", "") for content in body.get("contents", []) for part in content.get("parts", []))
+            usage = {"promptTokenCount": len(prompt) // 4, "candidatesTokenCount": len(ANSWER_TOKENS)}
+            time.sleep(first_token_delay)
+
+            if ':streamGenerateContent' in self.path:
+                self._start_stream('text/event-stream')
+                for index, token in enumerate(ANSWER_TOKENS):
+                    event = {"candidates": [{"content": {"role": "model", "parts": [{"text": token}]}}]}
+                    if index == len(ANSWER_TOKENS) - 1:
+                        event["usageMetadata"] = usage
+                    self._write_chunk(f"data: {json.dumps(event)}\r\n\r\n")
+                    time.sleep(token_delay)
+                return self._end_stream()
+            if ':generateContent' in self.path:
+                return self._send_json({
+                    "candidates": [{"content": {"role": "model", "parts": [{"text": "".join(ANSWER_TOKENS)}]}}],
+                    "usageMetadata": usage,
+                })
+            self._send_json({"error": {"message": "not found"}}, 404)
+
+    return FakeGeminiHandler
+
+
+ANIME_HOME_HTML = """<html><body>
+<div id="slider"><div class="swiper-slide"><div class="deslide-item"><div class="desi-head-title dynamic-name">One Piece</div>
+<div class="desi-description">A pirate sets sail.</div>
+<div class="desi-buttons"><a class="btn-play" href="/watch/one-piece-100">Watch</a></div>
+<div class="deslide-cover-img"><img data-src="/poster/one-piece.jpg"></div></div></div></div>
+<div id="trending-home"><div class="swiper-slide"><div class="item"><div class="number"><span>01</span></div>
+<div class="film-title">Frieren</div><a class="film-poster" href="/frieren-18542"><img data-src="/poster/frieren.jpg"></a></div></div></div>
+</body></html>"""
+
+
+ANIME_LIST_HTML = """<html><body><div class="film_list-wrap">""" + "".join(
+    f"""<div class="flw-item"><div class="film-poster"><img data-src="/poster/{n}.jpg"></div>
+<div class="film-detail"><h3 class="film-name"><a href="/watch/anime-{n}">Anime {n}</a></h3></div></div>"""
+    for n in range(18)
+) + """</div></body></html>"""
+ANIME_LIST_PAGES = {"/recently-updated", "/completed", "/top-airing", "/most-popular", "/most-favorite"}
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'hianime')
+
+
+def load_site_fixtures(fixtures_dir: str = FIXTURES_DIR) -> dict:
+    """Recorded pages keyed by fixture name (home.html, list.html, watch.html, episode_list.json, key.txt)."""
+    fixtures = {}
+    for name in os.listdir(fixtures_dir):
+        with open(os.path.join(fixtures_dir, name), 'rb') as f:
+            fixtures[name] = f.read()
+    return fixtures
+
+
+def make_anime_site_handler(delay: float = 0.0, fixtures: dict = None):
+    """
+    Serves the homepage and its list pages. With `fixtures` (see load_site_fixtures) it
+    serves the recorded pages instead, including /watch/<id>, the episode list AJAX call
+    and the decryption key, so the details route works offline as well.
+    """
+    def lookup(path: str):
+        if fixtures is None:
+            if path == '/home':
+                return ANIME_HOME_HTML.encode('utf-8'), 'text/html; charset=utf-8'
+            if path in ANIME_LIST_PAGES:
+                return ANIME_LIST_HTML.encode('utf-8'), 'text/html; charset=utf-8'
+            return None, None
+        if path == '/home':
+            return fixtures['home.html'], 'text/html; charset=utf-8'
+        if path in ANIME_LIST_PAGES:
+            return fixtures.get(f"{path.strip('/')}.html", fixtures['list.html']), 'text/html; charset=utf-8'
+        if path.startswith('/watch/'):
+            return fixtures['watch.html'], 'text/html; charset=utf-8'
+        if path.startswith('/ajax/v2/episode/list/'):
+            return fixtures['episode_list.json'], 'application/json'
+        if path == '/key.txt':
+            return fixtures['key.txt'], 'text/plain'
+        return None, None
+
+    class FakeAnimeSiteHandler(_JSONHandler):
+        def do_GET(self):
+            time.sleep(delay)
+            body, content_type = lookup(self.path.split('?')[0])
+            if body is None:
+                return self._send_json({"error": "not found"}, 404)
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return FakeAnimeSiteHandler
+
+
+def make_media_origin_handler(delay: float = 0.0, segment_bytes: int = 256 * 1024, segments: int = 4):
+    segment = bytes(range(256)) * (segment_bytes // 256)
+
+    class FakeMediaOriginHandler(_JSONHandler):
+        def do_GET(self):
+            time.sleep(delay)
+            path = self.path.split('?')[0]
+            if path == '/master.m3u8':
+                lines = ["#EXTM3U", "#EXT-X-VERSION:3", "#EXT-X-TARGETDURATION:4"]
+                for index in range(segments):
+                    lines += ["#EXTINF:4.0,", f"segment-{index}.ts"]
+                body, content_type = ("\n".join(lines + ["#EXT-X-ENDLIST"]) + "\n").encode('utf-8'), 'application/vnd.apple.mpegurl'
+            elif path.startswith('/segment-') and path.endswith('.ts'):
+                body, content_type = segment, 'video/mp2t'
+            else:
+                return self._send_json({"error": "not found"}, 404)
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return FakeMediaOriginHandler
+
+
+def start_server(handler_class, port: int, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+    """Serves `handler_class` on a daemon thread and returns the server (call .shutdown() to stop)."""
+    server = ThreadingHTTPServer((host, port), handler_class)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run local stand-ins for Ollama and Gemini.")
+    parser.add_argument('--ollama-port', type=int, default=11434, help="0 disables the fake Ollama.")
+    parser.add_argument('--gemini-port', type=int, default=8089, help="0 disables the fake Gemini.")
+    parser.add_argument('--anime-port', type=int, default=8090, help="0 disables the fake anime site.")
+    parser.add_argument('--media-port', type=int, default=8091, help="0 disables the fake media origin.")
+    parser.add_argument('--upstream-delay', type=float, default=0.0, help="Seconds the anime site and media origin take to answer.")
+    parser.add_argument('--first-token-delay', type=float, default=0.0, help="Seconds before the first token.")
+    parser.add_argument('--token-delay', type=float, default=0.0, help="Seconds between streamed tokens.")
+    parser.add_argument('--fail-ollama', action='store_true', help="Make Ollama generations fail with HTTP 500.")
+    parser.add_argument('--recorded-site', action='store_true', help="Serve the recorded pages in fixtures/hianime.")
+    args = parser.parse_args()
+
+    servers = []
+    if args.ollama_port:
+        servers.append(start_server(make_ollama_handler(args.first_token_delay, args.token_delay, args.fail_ollama), args.ollama_port))
+        print(f"Fake Ollama listening on http://127.0.0.1:{args.ollama_port}")
+    if args.gemini_port:
+        servers.append(start_server(make_gemini_handler(args.first_token_delay, args.token_delay), args.gemini_port))
+        print(f"Fake Gemini listening on http://127.0.0.1:{args.gemini_port}")
+    if args.anime_port:
+        servers.append(start_server(make_anime_site_handler(args.upstream_delay, load_site_fixtures() if args.recorded_site else None), args.anime_port))
+        print(f"Fake anime site listening on http://127.0.0.1:{args.anime_port}")
+    if args.media_port:
+        servers.append(start_server(make_media_origin_handler(args.upstream_delay), args.media_port))
+        print(f"Fake media origin listening on http://127.0.0.1:{args.media_port}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        for server in servers:
+            server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+# backend/benchmarks/load_test.py
+"""
+Load test for the chat, anime and video proxy routes against local upstream stand-ins
+(see fake_servers.py), reporting requests/s, p50 and p99 latency per route.
+
+By default it starts the fake upstreams, launches the backend with serve.py on a free port
+pointed at them, runs each route for --duration seconds with --concurrency client threads,
+and stops the server with SIGTERM (exercising the graceful shutdown). `--server dev` runs
+Flask's development server instead for comparison; `--url` targets an already running
+server (its upstreams are then whatever it was started with).
+
+Usage:
+    python benchmarks/load_test.py [--server prod|dev] [--url URL] [--workers 1] [--threads 32]
+                                   [--concurrency 16] [--duration 10] [--routes chat,anime,proxy_m3u8,proxy_ts]
+                                   [--upstream-delay 0.05] [--token-delay 0.01] [--json]
+"""
+import argparse
+import itertools
+import json
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import quote
+
+import requests
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+from fake_servers import make_anime_site_handler, make_media_origin_handler, make_ollama_handler, start_server
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+ROUTES = ("chat", "anime", "proxy_m3u8", "proxy_ts")
+CHAT_QUESTION_NUMBERS = itertools.count()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_upstreams(upstream_delay: float, token_delay: float) -> dict:
+    ollama = start_server(make_ollama_handler(first_token_delay=upstream_delay, token_delay=token_delay), 0)
+    anime = start_server(make_anime_site_handler(upstream_delay), 0)
+    media = start_server(make_media_origin_handler(upstream_delay), 0)
+    url = lambda server: f"http://127.0.0.1:{server.server_address[1]}"
+    return {"servers": [ollama, anime, media], "ollama": url(ollama), "anime": url(anime), "media": url(media)}
+
+
+def launch_backend(mode: str, port: int, workers: int, threads: int, upstreams: dict) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        OLLAMA_BASE_URL=upstreams["ollama"],
+        ANIME_SOURCE_BASE_URL=upstreams["anime"],
+        OLLAMA_PRELOAD_MODELS="false",
+        # Measure the local path only: no cloud fallback and no extra suggestion generations.
+        LLM_FALLBACK_PROVIDER="",
+        CHAT_SUGGESTIONS_MODE="retrieval",
+    )
+    if mode == "prod":
+        command = [sys.executable, "serve.py", "--bind", f"127.0.0.1:{port}", "--workers", str(workers), "--threads", str(threads)]
+    else:
+        command = [sys.executable, "-c", f"from app import create_app; create_app().run(host='127.0.0.1', port={port}, threaded=True)"]
+    return subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def wait_until_ready(base_url: str, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f"{base_url}/", timeout=2).status_code == 200:
+                return
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"Backend at {base_url} did not become ready within {timeout:.0f}s.")
+
+
+def make_request(route: str, session: requests.Session, base_url: str, media_url: str) -> bool:
+    """Performs one request for `route` and reads the whole response. Returns whether it succeeded."""
+    if route == "chat":
+        # A distinct question each time, so the semantic response cache does not answer instead of the LLM.
+        query = f"Question {next(CHAT_QUESTION_NUMBERS)}: who trained swordsman number {next(CHAT_QUESTION_NUMBERS)}?"
+        response = session.post(f"{base_url}/api/llm/chat", json={"query": query, "history": []}, stream=True, timeout=120)
+        events = [json.loads(line) for line in response.iter_lines() if line]
+        return response.status_code == 200 and any(event.get("type") == "final" for event in events)
+    if route == "anime":
+        response = session.get(f"{base_url}/api/anime/home", timeout=60)
+    elif route == "proxy_m3u8":
+        response = session.get(f"{base_url}/api/proxy/m3u8?url={quote(media_url + '/master.m3u8')}", timeout=60)
+    else:
+        response = session.get(f"{base_url}/api/proxy/ts?url={quote(media_url + '/segment-0.ts')}", timeout=60)
+    response.content
+    return response.status_code == 200
+
+
+def run_route(route: str, base_url: str, media_url: str, concurrency: int, duration: float) -> dict:
+    latencies, failures, lock = [], [0], threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client():
+        session = requests.Session()
+        while time.monotonic() < deadline:
+            started_at = time.perf_counter()
+            try:
+                ok = make_request(route, session, base_url, media_url)
+            except requests.exceptions.RequestException:
+                ok = False
+            elapsed = time.perf_counter() - started_at
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    failures[0] += 1
+
+    started_at = time.perf_counter()
+    clients = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    wall_seconds = time.perf_counter() - started_at
+
+    ordered = sorted(latencies)
+    pick = lambda fraction: round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000, 1) if ordered else None
+    return {
+        "route": route,
+        "requests": len(latencies),
+        "errors": failures[0],
+        "requests_per_second": round(len(latencies) / wall_seconds, 1),
+        "p50_ms": pick(0.50),
+        "p99_ms": pick(0.99),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 1) if latencies else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the chat, anime and proxy routes.")
+    parser.add_argument('--server', choices=["prod", "dev"], default="prod", help="How to launch the backend.")
+    parser.add_argument('--url', help="Test an already running backend instead of launching one.")
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10.0, help="Seconds per route.")
+    parser.add_argument('--routes', default=",".join(ROUTES))
+    parser.add_argument('--upstream-delay', type=float, default=0.05, help="Simulated upstream latency in seconds.")
+    parser.add_argument('--token-delay', type=float, default=0.01, help="Simulated delay between LLM tokens.")
+    parser.add_argument('--json', action='store_true', help="Print the results as JSON.")
+    args = parser.parse_args()
+
+    upstreams = start_upstreams(args.upstream_delay, args.token_delay)
+    process = None
+    base_url = args.url
+    if not base_url:
+        port = free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        process = launch_backend(args.server, port, args.workers, args.threads, upstreams)
+    try:
+        wait_until_ready(base_url)
+        results = [run_route(route, base_url, upstreams["media"], args.concurrency, args.duration)
+                   for route in args.routes.split(",") if route in ROUTES]
+    finally:
+        if process:
+            process.send_signal(signal.SIGTERM)
+            try:
+                process.wait(timeout=60)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        for server in upstreams["servers"]:
+            server.shutdown()
+
+    if args.json:
+        print(json.dumps({"server": args.url or args.server, "concurrency": args.concurrency, "results": results}, indent=2))
+        return
+    print(f"Server: {args.url or args.server}  concurrency: {args.concurrency}  duration: {args.duration:.0f}s/route  "
+          f"upstream delay: {args.upstream_delay * 1000:.0f}ms")
+    print(f"{'route':<12}{'requests':>10}{'errors':>8}{'req/s':>9}{'p50 ms':>10}{'p99 ms':>10}")
+    for r in results:
+        print(f"{r['route']:<12}{r['requests']:>10}{r['errors']:>8}{r['requests_per_second']:>9}{str(r['p50_ms']):>10}{str(r['p99_ms']):>10}")
+
+
+if __name__ == '__main__':
+    main()
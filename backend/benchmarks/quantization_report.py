@@ -0,0 +1,195 @@
+# backend/benchmarks/quantization_report.py
+"""
+Compares the vector store's storage modes (VECTOR_INDEX_MODE and VECTOR_PCA_DIMENSION) on
+memory per vector, recall@k and query latency, to choose the trade-off per deployment.
+
+For each mode and PCA dimension, a store is built in a temporary directory and saved
+(which trains and applies the compression), then loaded by a fresh process that reports:
+- resident bytes/vector: anonymous memory the loaded store holds, divided by the vectors;
+- index bytes/vector and full-precision bytes/vector: the FAISS index in memory, and the
+  memory-mapped file of exact vectors used for re-ranking (on disk, paged in on demand);
+- recall@k against an exact search, and single-query latency p50/p99, for each re-rank
+  factor (the store re-ranks top_k * factor candidates exactly; 1 only re-orders top_k).
+
+The corpus is synthetic by default: vectors of low intrinsic dimension plus noise, which
+behaves like real text embeddings under PCA and PQ far better than uniform noise. Use
+--db to measure the real store's embeddings instead; queries are then held-out documents
+with a little noise. Flat mode keeps every embedding as a Python list, so at 1024
+dimensions allow about 1.5 GB per 20k documents.
+
+Usage:
+    python benchmarks/quantization_report.py [--documents 20000] [--dimension 256] [--queries 200] [--top-k 5]
+                                             [--modes flat,fp16,sq8,pq] [--pca 0,64] [--rerank-factors 1,4]
+                                             [--db path/to/vector_db.pkl.gz] [--json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+MIB = 1024 ** 2
+
+
+def anonymous_mb() -> float:
+    with open('/proc/self/smaps_rollup', 'r') as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] == 'Anonymous:':
+                return int(parts[1]) / 1024
+    return 0.0
+
+
+def percentile(samples, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def corpus(args) -> np.ndarray:
+    """`documents + queries` vectors; the last `queries` rows are the queries."""
+    rng = np.random.default_rng(0)
+    if args.db:
+        from embeddings.vector_store import VectorStore
+        store = VectorStore(db_path=args.db)
+        store.load()
+        vectors = np.array([doc['embedding'] for doc in store.get_all_documents_with_embeddings()], dtype=np.float32)
+        rng.shuffle(vectors)
+        queries = vectors[:args.queries] + rng.normal(0, 0.01, (args.queries, vectors.shape[1])).astype(np.float32)
+        return np.concatenate([vectors[args.queries:], queries])
+    total = args.documents + args.queries
+    basis = rng.normal(size=(args.intrinsic_dimension, args.dimension))
+    vectors = rng.normal(size=(total, args.intrinsic_dimension)) @ basis + 0.1 * rng.normal(size=(total, args.dimension))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def configure(store, mode: str, pca: int):
+    store.index_mode = mode
+    store.pca_dimension = pca
+    store.quantization_min_vectors = 1
+
+
+def build_store(db_path: str, vectors: np.ndarray, mode: str, pca: int) -> float:
+    from embeddings.vector_store import VectorStore
+    store = VectorStore(db_path=db_path)
+    store.snapshot_dir = os.path.join(os.path.dirname(db_path), 'snapshots')
+    configure(store, mode, pca)
+    for i, vector in enumerate(vectors):
+        store.add_document(f"Synthetic document {i}", vector.tolist(), metadata={"type": "anime"}, source_item_id=f"synthetic_{i}")
+    started_at = time.perf_counter()
+    store.save()
+    return time.perf_counter() - started_at
+
+
+def run_reader(args):
+    """Child process: load the store, report its memory, then time and score the queries."""
+    from embeddings.vector_store import VectorStore
+    baseline = anonymous_mb()
+    store = VectorStore(db_path=args.reader_db)
+    configure(store, args.reader_mode, args.reader_pca)
+    store.load()
+    resident = anonymous_mb() - baseline
+    workdir = os.path.dirname(args.reader_db)
+    queries = np.load(os.path.join(workdir, 'queries.npy'))
+    truth = np.load(os.path.join(workdir, 'truth.npy'))
+    results = []
+    for factor in [int(f) for f in args.rerank_factors.split(",")]:
+        store.rerank_factor = factor
+        store.search_batch(queries[:10], top_k=args.top_k)  # warm-up
+        times, hits = [], 0
+        for query, expected in zip(queries, truth):
+            started_at = time.perf_counter()
+            found = store.search_batch(query.reshape(1, -1), top_k=args.top_k)[0]
+            times.append(time.perf_counter() - started_at)
+            hits += len({hit.id for hit in found} & set(expected.tolist()))
+        results.append({
+            "rerank_factor": factor,
+            f"recall_at_{args.top_k}": round(hits / truth.size, 4),
+            "latency_p50_ms": round(statistics.median(times) * 1000, 3),
+            "latency_p99_ms": round(percentile(times, 0.99) * 1000, 3),
+        })
+        if store._view.compressed is None:
+            break  # Exact storage has nothing to re-rank.
+    print(json.dumps({"resident_mb": resident, "codec": store._view.codec, "results": results}), flush=True)
+
+
+def measure(args, workdir: str, vectors: np.ndarray, mode: str, pca: int) -> dict:
+    db_path = os.path.join(workdir, f"{mode}-pca{pca}", 'vector_db.pkl.gz')
+    os.makedirs(os.path.dirname(db_path))
+    np.save(os.path.join(os.path.dirname(db_path), 'queries.npy'), vectors[args.documents:])
+    np.save(os.path.join(os.path.dirname(db_path), 'truth.npy'), np.load(os.path.join(workdir, 'truth.npy')))
+    build_seconds = build_store(db_path, vectors[:args.documents], mode, pca)
+    command = [sys.executable, os.path.abspath(__file__), "--reader-db", db_path, "--reader-mode", mode,
+               "--reader-pca", str(pca), "--rerank-factors", args.rerank_factors, "--top-k", str(args.top_k)]
+    output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+    report = json.loads(output.strip().splitlines()[-1])
+    vectors_path = db_path.replace('.pkl.gz', '.vectors.npy')
+    return {
+        "mode": mode,
+        "pca": pca,
+        "codec": report["codec"] or "exact",
+        "build_seconds": round(build_seconds, 2),
+        "resident_bytes_per_vector": round(report["resident_mb"] * MIB / args.documents),
+        "index_bytes_per_vector": round(os.path.getsize(db_path.replace('.pkl.gz', '.faiss')) / args.documents, 1),
+        "full_precision_bytes_per_vector": round(os.path.getsize(vectors_path) / args.documents, 1) if os.path.exists(vectors_path) else 0,
+        "results": report["results"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory, recall and latency of the vector store's storage modes.")
+    parser.add_argument('--documents', type=int, default=20000)
+    parser.add_argument('--dimension', type=int, default=256)
+    parser.add_argument('--intrinsic-dimension', type=int, default=48, help="Rank of the synthetic corpus before noise.")
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--top-k', type=int, default=5)
+    parser.add_argument('--modes', default="flat,fp16,sq8,pq")
+    parser.add_argument('--pca', default="0,64", help="PCA output dimensions to try; 0 is no reduction.")
+    parser.add_argument('--rerank-factors', default="1,4")
+    parser.add_argument('--db', help="Use the embeddings of this vector store instead of a synthetic corpus.")
+    parser.add_argument('--json', action='store_true')
+    parser.add_argument('--reader-db', help=argparse.SUPPRESS)
+    parser.add_argument('--reader-mode', help=argparse.SUPPRESS)
+    parser.add_argument('--reader-pca', type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.reader_db:
+        run_reader(args)
+        return
+
+    import faiss
+    vectors = corpus(args)
+    args.documents, dimension = len(vectors) - args.queries, vectors.shape[1]
+    exact = faiss.IndexFlatL2(dimension)
+    exact.add(vectors[:args.documents])
+    _, truth = exact.search(vectors[args.documents:], args.top_k)
+
+    reports = []
+    with tempfile.TemporaryDirectory() as workdir:
+        np.save(os.path.join(workdir, 'truth.npy'), truth)
+        for pca in [int(p) for p in args.pca.split(",")]:
+            if pca >= dimension:
+                continue
+            for mode in args.modes.split(","):
+                reports.append(measure(args, workdir, vectors, mode, pca))
+
+    if args.json:
+        print(json.dumps({"documents": args.documents, "dimension": dimension, "top_k": args.top_k, "modes": reports}, indent=2))
+        return
+    print(f"{args.documents} documents x {dimension} dimensions, {args.queries} queries, recall@{args.top_k}")
+    print(f"{'codec':<20}{'resident B/vec':>15}{'index B/vec':>12}{'mmap B/vec':>11}{'rerank':>7}{'recall':>8}{'p50 ms':>8}{'p99 ms':>8}")
+    for report in reports:
+        for result in report["results"]:
+            print(f"{report['codec']:<20}{report['resident_bytes_per_vector']:>15}{report['index_bytes_per_vector']:>12}"
+                  f"{report['full_precision_bytes_per_vector']:>11}{result['rerank_factor']:>7}"
+                  f"{result[f'recall_at_{args.top_k}']:>8}{result['latency_p50_ms']:>8}{result['latency_p99_ms']:>8}")
+
+
+if __name__ == '__main__':
+    main()
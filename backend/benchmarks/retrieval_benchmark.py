@@ -0,0 +1,144 @@
+# backend/benchmarks/retrieval_benchmark.py
+"""
+Offline retrieval benchmark: measures quality (hit rate@k, MRR) and latency of the
+vector, lexical and hybrid retrieval modes over a fixed question set.
+
+It runs against a saved vector store and never touches the Flask app. Question
+embeddings are fetched from Ollama once and cached next to the question set, so later
+runs need no Ollama at all. Without any embeddings only the lexical mode is measured.
+
+Usage:
+    python benchmarks/retrieval_benchmark.py [--db PATH] [--questions PATH] [--top-k 5] [--repeat 3] [--json]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import Config
+from embeddings.vector_store import VectorStore
+from embeddings.lexical_index import BM25Index
+from services.retrieval_service import HybridRetriever
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_QUESTIONS_PATH = os.path.join(BENCHMARK_DIR, 'retrieval_questions.json')
+
+
+def load_question_embeddings(questions, cache_path):
+    """Returns {question: embedding}, embedding (and caching) any question not seen before."""
+    cached = {}
+    if os.path.exists(cache_path):
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+    missing = [q["question"] for q in questions if q["question"] not in cached]
+    if not missing:
+        return cached
+
+    try:
+        from embeddings.ollama_embedder import OllamaEmbedder
+        embedder = OllamaEmbedder()
+        if not embedder.verify_model():
+            raise ValueError(f"embedding model '{embedder.embedding_model}' is not available")
+    except Exception as e:
+        print(f"⚠️ Ollama embedder unavailable ({e}); {len(missing)} question(s) have no embedding.")
+        return cached
+
+    for question in missing:
+        embedding = embedder.embed_text(question)
+        if embedding:
+            cached[question] = embedding
+    with open(cache_path, 'w', encoding='utf-8') as f:
+        json.dump(cached, f)
+    return cached
+
+
+def first_relevant_rank(results, expected):
+    expected_lower = [e.lower() for e in expected]
+    for rank, doc in enumerate(results, start=1):
+        haystack = f"{doc.get('metadata', {}).get('title', '')} {doc.get('source_item_id') or ''}".lower()
+        if any(e in haystack for e in expected_lower):
+            return rank
+    return None
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def run_benchmark(db_path, questions_path, top_k=5, repeat=3):
+    with open(questions_path, 'r', encoding='utf-8') as f:
+        questions = json.load(f)["questions"]
+
+    vector_store = VectorStore(db_path=db_path)
+    lexical_index = BM25Index(k1=Config.BM25_K1, b=Config.BM25_B)
+    lexical_index.attach(vector_store)
+    vector_store.load()
+    if not vector_store.documents:
+        raise SystemExit(f"❌ No documents found in '{db_path}'. Build the vector store first.")
+
+    retriever = HybridRetriever(vector_store, lexical_index, candidates=Config.RETRIEVAL_CANDIDATES, rrf_k=Config.RETRIEVAL_RRF_K)
+    embeddings = load_question_embeddings(questions, os.path.splitext(questions_path)[0] + '.embeddings.json')
+    modes = ["lexical"] + (["vector", "hybrid"] if embeddings else [])
+
+    report = {"documents": len(vector_store.documents), "questions": len(questions), "top_k": top_k, "modes": {}}
+    for mode in modes:
+        hits, reciprocal_ranks, latencies_ms, by_kind = 0, [], [], {}
+        evaluated = 0
+        for question in questions:
+            embedding = embeddings.get(question["question"])
+            if mode != "lexical" and not embedding:
+                continue
+            evaluated += 1
+            for _ in range(repeat):
+                started_at = time.perf_counter()
+                results = retriever.retrieve(question["question"], embedding, top_k=top_k, mode=mode)
+                latencies_ms.append((time.perf_counter() - started_at) * 1000)
+            rank = first_relevant_rank(results, question["expected"])
+            kind_stats = by_kind.setdefault(question.get("kind", "other"), {"questions": 0, "hits": 0})
+            kind_stats["questions"] += 1
+            if rank:
+                hits += 1
+                kind_stats["hits"] += 1
+            reciprocal_ranks.append(1.0 / rank if rank else 0.0)
+
+        if not evaluated:
+            continue
+        report["modes"][mode] = {
+            "questions_evaluated": evaluated,
+            f"hit_rate@{top_k}": round(hits / evaluated, 3),
+            "mrr": round(statistics.mean(reciprocal_ranks), 3),
+            "latency_ms_p50": round(percentile(latencies_ms, 0.5), 3),
+            "latency_ms_p95": round(percentile(latencies_ms, 0.95), 3),
+            "by_kind": {kind: round(s["hits"] / s["questions"], 3) for kind, s in by_kind.items()},
+        }
+    return report
+
+
+def print_report(report):
+    print(f"📊 Retrieval benchmark: {report['questions']} questions over {report['documents']} documents (top_k={report['top_k']})")
+    print("-" * 78)
+    print(f"{'mode':<10}{'hit rate':>10}{'MRR':>8}{'p50 ms':>10}{'p95 ms':>10}   per kind")
+    for mode, stats in report["modes"].items():
+        hit_rate = stats[f"hit_rate@{report['top_k']}"]
+        kinds = ", ".join(f"{kind}={rate}" for kind, rate in stats["by_kind"].items())
+        print(f"{mode:<10}{hit_rate:>10}{stats['mrr']:>8}{stats['latency_ms_p50']:>10}{stats['latency_ms_p95']:>10}   {kinds}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline retrieval quality and latency benchmark.")
+    parser.add_argument("--db", default=Config.VECTOR_DB_PATH, help="Path to the vector store (.pkl.gz).")
+    parser.add_argument("--questions", default=DEFAULT_QUESTIONS_PATH, help="Path to the question set.")
+    parser.add_argument("--top-k", type=int, default=Config.RETRIEVAL_TOP_K)
+    parser.add_argument("--repeat", type=int, default=3, help="Timed repetitions per question.")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+    args = parser.parse_args()
+
+    benchmark_report = run_benchmark(args.db, args.questions, top_k=args.top_k, repeat=args.repeat)
+    if args.json:
+        print(json.dumps(benchmark_report, indent=2))
+    else:
+        print_report(benchmark_report)
@@ -0,0 +1,115 @@
+# backend/benchmarks/snapshot_memory_benchmark.py
+"""
+Measures how vector store memory grows with the number of worker processes, comparing
+'local' mode (every worker loads its own copy of the pickle) with 'shared' mode (every
+worker memory-maps the same published snapshot).
+
+A synthetic store is built in a temporary directory. For each worker count, that many
+reader processes are started at once; each loads the store, runs a few searches and
+reports its proportional set size (PSS, which splits shared pages between the processes
+mapping them) and its anonymous (private, non-file) memory. Linux only (/proc).
+
+Usage:
+    python benchmarks/snapshot_memory_benchmark.py [--documents 20000] [--dimension 1024] [--workers 1,2,4] [--json]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+def memory_usage_mb() -> dict:
+    usage = {}
+    with open('/proc/self/smaps_rollup', 'r') as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ('Rss:', 'Pss:', 'Anonymous:'):
+                usage[parts[0].rstrip(':').lower()] = round(int(parts[1]) / 1024, 1)
+    return usage
+
+
+def run_reader(mode: str, db_path: str, snapshot_dir: str, dimension: int):
+    """Child process: load the store, search, report memory, then wait until the parent is done."""
+    from embeddings.vector_store import VectorStore
+    store = VectorStore(db_path=db_path)
+    store.snapshot_dir = snapshot_dir
+    if mode == "shared":
+        assert store.load_snapshot(), "No published snapshot found."
+    else:
+        store.load()
+    rng = np.random.default_rng(os.getpid())
+    for _ in range(20):
+        store.similarity_search(rng.random(dimension, dtype=np.float32).tolist(), top_k=5)
+    print(json.dumps({"documents": len(store.documents), **memory_usage_mb()}), flush=True)
+    sys.stdin.read()
+
+
+def build_store(db_path: str, snapshot_dir: str, documents: int, dimension: int):
+    from embeddings.vector_store import VectorStore
+    store = VectorStore(db_path=db_path)
+    store.snapshot_dir = snapshot_dir
+    vectors = np.random.default_rng(0).random((documents, dimension), dtype=np.float32)
+    for i, vector in enumerate(vectors):
+        store.add_document(f"Synthetic document {i} about anime number {i % 500}.", vector.tolist(),
+                           metadata={"type": "anime", "title": f"Anime {i % 500}"}, source_item_id=f"synthetic_{i}")
+    store.save()  # Also publishes the snapshot (VECTOR_SNAPSHOT_PUBLISH_ON_SAVE).
+
+
+def measure(mode: str, workers: int, db_path: str, snapshot_dir: str, dimension: int) -> dict:
+    command = [sys.executable, os.path.abspath(__file__), "--reader", mode, "--db", db_path,
+               "--snapshot-dir", snapshot_dir, "--dimension", str(dimension)]
+    readers = [subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+               for _ in range(workers)]
+    # All readers are alive together while their memory is reported, so shared pages are split between them.
+    reports = [json.loads(reader.stdout.readline()) for reader in readers]
+    for reader in readers:
+        reader.stdin.close()
+        reader.wait()
+    return {
+        "mode": mode,
+        "workers": workers,
+        "total_pss_mb": round(sum(r["pss"] for r in reports), 1),
+        "total_anonymous_mb": round(sum(r["anonymous"] for r in reports), 1),
+        "per_worker_rss_mb": round(sum(r["rss"] for r in reports) / workers, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-worker memory of local and shared vector stores.")
+    parser.add_argument('--documents', type=int, default=20000)
+    parser.add_argument('--dimension', type=int, default=1024)
+    parser.add_argument('--workers', default="1,2,4")
+    parser.add_argument('--json', action='store_true')
+    parser.add_argument('--reader', choices=["local", "shared"], help=argparse.SUPPRESS)
+    parser.add_argument('--db', help=argparse.SUPPRESS)
+    parser.add_argument('--snapshot-dir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.reader:
+        run_reader(args.reader, args.db, args.snapshot_dir, args.dimension)
+        return
+
+    with tempfile.TemporaryDirectory() as workdir:
+        db_path = os.path.join(workdir, 'vector_db.pkl.gz')
+        snapshot_dir = os.path.join(workdir, 'vector_snapshots')
+        build_store(db_path, snapshot_dir, args.documents, args.dimension)
+        results = [measure(mode, int(workers), db_path, snapshot_dir, args.dimension)
+                   for mode in ("local", "shared") for workers in args.workers.split(",")]
+
+    if args.json:
+        print(json.dumps({"documents": args.documents, "dimension": args.dimension, "results": results}, indent=2))
+        return
+    print(f"{args.documents} documents x {args.dimension} dimensions")
+    print(f"{'mode':<8}{'workers':>8}{'total PSS MB':>14}{'total anon MB':>15}{'RSS/worker MB':>15}")
+    for r in results:
+        print(f"{r['mode']:<8}{r['workers']:>8}{r['total_pss_mb']:>14}{r['total_anonymous_mb']:>15}{r['per_worker_rss_mb']:>15}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+# backend/benchmarks/startup_benchmark.py
+"""
+Measures cold-start cost: importing globals.py, building the Flask app, and how long a
+freshly launched server (serve.py) takes to answer its first request and to report ready.
+
+Each measurement runs in a new interpreter so nothing is cached between runs; the bare
+interpreter start-up time is reported alongside for reference. By default Ollama is
+pointed at a closed port, to check that the app still starts while Ollama is down;
+pass --ollama-url to measure against a running instance (or benchmarks/fake_servers.py).
+
+Usage:
+    python benchmarks/startup_benchmark.py [--runs 5] [--ollama-url http://127.0.0.1:11434] [--json]
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import requests
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def time_command(code: str, env: dict) -> float:
+    """Wall-clock seconds for a fresh interpreter to run `code`, or None if it failed."""
+    started_at = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    elapsed = time.perf_counter() - started_at
+    return elapsed if result.returncode == 0 else None
+
+
+def time_server(env: dict, timeout: float = 30.0) -> dict:
+    """Seconds from launching serve.py until `/` answers, and until it reports ready."""
+    port = free_port()
+    url = f"http://127.0.0.1:{port}/"
+    started_at = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "serve.py", "--bind", f"127.0.0.1:{port}", "--workers", "1"],
+                               cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    first_response, ready = None, None
+    try:
+        while time.perf_counter() - started_at < timeout and ready is None:
+            try:
+                response = requests.get(url, timeout=1)
+                if first_response is None:
+                    first_response = time.perf_counter() - started_at
+                if response.status_code == 200 and response.json().get("ready", True):
+                    ready = time.perf_counter() - started_at
+            except requests.exceptions.RequestException:
+                pass
+            time.sleep(0.02)
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+    return {"first_response": first_response, "ready": ready}
+
+
+def summarise(samples) -> dict:
+    valid = [s for s in samples if s is not None]
+    if not valid:
+        return {"median_ms": None, "failures": len(samples)}
+    return {"median_ms": round(statistics.median(valid) * 1000, 1), "max_ms": round(max(valid) * 1000, 1),
+            "failures": len(samples) - len(valid)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import and startup time of the backend.")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--ollama-url', default=None, help="Defaults to a closed port (Ollama down).")
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    env = dict(os.environ, OLLAMA_BASE_URL=args.ollama_url or f"http://127.0.0.1:{free_port()}", OLLAMA_PRELOAD_MODELS="false")
+    samples = {"interpreter": [], "import_globals": [], "create_app": [], "server_first_response": [], "server_ready": []}
+    for _ in range(args.runs):
+        samples["interpreter"].append(time_command("pass", env))
+        samples["import_globals"].append(time_command("import globals", env))
+        samples["create_app"].append(time_command("import app; app.create_app()", env))
+        server = time_server(env)
+        samples["server_first_response"].append(server["first_response"])
+        samples["server_ready"].append(server["ready"])
+
+    results = {name: summarise(values) for name, values in samples.items()}
+    if args.json:
+        print(json.dumps({"ollama": "up" if args.ollama_url else "down", "runs": args.runs, "results": results}, indent=2))
+        return
+    print(f"Ollama: {'up at ' + args.ollama_url if args.ollama_url else 'down'}  runs: {args.runs}")
+    print(f"{'measurement':<24}{'median ms':>11}{'max ms':>10}{'failures':>10}")
+    for name, r in results.items():
+        print(f"{name:<24}{str(r['median_ms']):>11}{str(r.get('max_ms')):>10}{r['failures']:>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+# backend/benchmarks/vector_store_stress.py
+"""
+Stress test for the vector store under concurrent search and ingestion.
+
+Reader threads search a synthetic store non-stop while a writer thread keeps adding
+documents, and (with --clear-every / --save-every) periodically clears or saves it. Every
+search result is checked against the document it returned: the reported distance must be
+the real L2 distance between the query and that document's own embedding, distances must
+come back sorted, and no more than top_k results may be returned. A search that mixed
+the index of one version with the documents of another, or that raced a clear, fails
+those checks or raises. At the end, every document added since the last clear must be
+found by its own embedding.
+
+Reports searches/s, search p50/p99 and adds/s; exits with status 1 on any violation.
+
+Usage:
+    python benchmarks/vector_store_stress.py [--documents 5000] [--dimension 256] [--readers 8]
+                                             [--duration 10] [--clear-every 0] [--save-every 0]
+                                             [--omp-threads 1] [--json]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+def percentile(samples, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def run(args) -> dict:
+    import faiss
+    from embeddings.vector_store import VectorStore
+    if args.omp_threads > 0:
+        faiss.omp_set_num_threads(args.omp_threads)
+
+    workdir = tempfile.mkdtemp(prefix="vector_store_stress_")
+    store = VectorStore(db_path=os.path.join(workdir, 'stress_db.pkl.gz'))
+    store.snapshot_dir = os.path.join(workdir, 'snapshots')
+    rng = np.random.default_rng(0)
+    next_number = [0]
+
+    def add(count: int):
+        vectors = rng.random((count, args.dimension), dtype=np.float32)
+        for vector in vectors:
+            number = next_number[0]
+            next_number[0] += 1
+            store.add_document(f"Stress document {number}", vector.tolist(),
+                               metadata={"type": "anime" if number % 2 else "news"}, source_item_id=f"stress_{number}")
+
+    add(args.documents)
+    store.flush()
+
+    stop = threading.Event()
+    violations = []
+    search_times = [[] for _ in range(args.readers)]
+    adds, clears, saves = [0], [0], [0]
+
+    def record(message: str):
+        if len(violations) < 20:
+            violations.append(message)
+
+    def reader(slot: int):
+        local_rng = np.random.default_rng(slot + 1)
+        while not stop.is_set():
+            query = local_rng.random(args.dimension, dtype=np.float32)
+            filters = {"type": "anime"} if local_rng.random() < 0.25 else None
+            started_at = time.perf_counter()
+            try:
+                results = store.similarity_search(query.tolist(), top_k=args.top_k, filters=filters)
+            except Exception as e:
+                record(f"search raised {type(e).__name__}: {e}")
+                continue
+            search_times[slot].append(time.perf_counter() - started_at)
+            if len(results) > args.top_k:
+                record(f"{len(results)} results for top_k={args.top_k}")
+            distances = [result['distance'] for result in results]
+            if distances != sorted(distances):
+                record(f"unsorted distances {distances}")
+            for result in results:
+                expected = float(np.sum((np.asarray(result['embedding'], dtype=np.float32) - query) ** 2))
+                if abs(expected - result['distance']) > 1e-3 * max(1.0, expected):
+                    record(f"document {result['id']} returned with distance {result['distance']:.4f}, its embedding gives {expected:.4f}")
+                if filters and result['metadata'].get('type') != 'anime':
+                    record(f"document {result['id']} does not match the filter")
+
+    def writer():
+        started_at = last_clear = last_save = time.monotonic()
+        while not stop.is_set():
+            add(16)
+            adds[0] += 16
+            now = time.monotonic()
+            if args.clear_every and now - last_clear >= args.clear_every:
+                store.clear()
+                clears[0] += 1
+                last_clear = now
+            if args.save_every and now - last_save >= args.save_every:
+                store.save()
+                saves[0] += 1
+                last_save = now
+        adds.append(time.monotonic() - started_at)
+
+    threads = [threading.Thread(target=reader, args=(slot,), daemon=True) for slot in range(args.readers)]
+    threads.append(threading.Thread(target=writer, daemon=True))
+    started_at = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started_at
+
+    # Everything added since the last clear must be searchable once flushed.
+    store.flush()
+    missing = 0
+    documents = store.get_all_documents_with_embeddings()
+    for doc in documents[::max(1, len(documents) // 200)]:
+        hits = store.similarity_search(doc['embedding'], top_k=1)
+        if not hits or hits[0]['id'] != doc['id']:
+            missing += 1
+    if missing:
+        record(f"{missing} sampled documents were not found by their own embedding")
+
+    all_times = [t for times in search_times for t in times]
+    return {
+        "readers": args.readers,
+        "dimension": args.dimension,
+        "final_documents": len(store.documents),
+        "searches_per_second": round(len(all_times) / elapsed, 1),
+        "search_p50_ms": round(statistics.median(all_times) * 1000, 3) if all_times else None,
+        "search_p99_ms": round(percentile(all_times, 0.99) * 1000, 3) if all_times else None,
+        "adds_per_second": round(adds[0] / adds[1], 1) if len(adds) > 1 and adds[1] else None,
+        "clears": clears[0],
+        "saves": saves[0],
+        "violations": violations,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent search and ingest stress test for the vector store.")
+    parser.add_argument('--documents', type=int, default=5000, help="Documents in the store before the test starts.")
+    parser.add_argument('--dimension', type=int, default=256)
+    parser.add_argument('--readers', type=int, default=8, help="Concurrent search threads.")
+    parser.add_argument('--duration', type=float, default=10.0, help="Seconds to run.")
+    parser.add_argument('--top-k', type=int, default=5)
+    parser.add_argument('--clear-every', type=float, default=0.0, help="Clear the store every N seconds (0 never).")
+    parser.add_argument('--save-every', type=float, default=0.0, help="Save the store every N seconds (0 never).")
+    parser.add_argument('--omp-threads', type=int, default=1, help="FAISS OpenMP threads; 0 keeps FAISS's default.")
+    parser.add_argument('--json', action='store_true', help="Print the report as JSON.")
+    args = parser.parse_args()
+
+    report = run(args)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{report['final_documents']} documents x {report['dimension']} dimensions, {report['readers']} readers")
+        print(f"  searches/s: {report['searches_per_second']}  p50: {report['search_p50_ms']} ms  p99: {report['search_p99_ms']} ms")
+        print(f"  adds/s: {report['adds_per_second']}  clears: {report['clears']}  saves: {report['saves']}")
+        for violation in report["violations"]:
+            print(f"  VIOLATION: {violation}")
+        print("  OK" if not report["violations"] else f"  FAILED ({len(report['violations'])} violations shown)")
+    sys.exit(1 if report["violations"] else 0)
+
+
+if __name__ == '__main__':
+    main()
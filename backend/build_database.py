@@ -8,10 +8,12 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 # Import global services. This needs to be after logging is configured.
 from globals import (
     global_vector_store,
+    global_ollama_embedder,
     global_data_embedding_service,
     global_clustering_service
 )
 from services.clustering_service import CLUSTER_CACHE_PATH
+from config import Config
 
 def build_database():
     """
@@ -21,6 +23,11 @@ def build_database():
     """
     logging.info("--- Starting Database Build Process ---")
 
+    # The server tolerates Ollama being down, but a build without the embedding model is pointless.
+    if not global_ollama_embedder.verify_model():
+        logging.error("Aborting the build: the embedding model is not available.")
+        return
+
     # Step 1: Clear any existing data to ensure a fresh build.
     # This prevents partial updates and ensures consistency.
     logging.info("Clearing existing vector store and cache to ensure a fresh build...")
@@ -45,6 +52,8 @@ def build_database():
     logging.info("--- Database Build Process Completed Successfully! ---")
     logging.info(f"Vector store saved to: {global_vector_store.db_path} & {global_vector_store.index_path}")
     logging.info(f"Cluster cache saved to: {CLUSTER_CACHE_PATH}")
+    if Config.VECTOR_SNAPSHOT_PUBLISH_ON_SAVE:
+        logging.info(f"Shared snapshot published to: {global_vector_store.snapshot_dir} (used when VECTOR_STORE_MODE=shared)")
     logging.info("You can now start the Flask server with 'python3 app.py'")
 
 if __name__ == "__main__":
@@ -8,6 +8,10 @@ load_dotenv()
 class Config:
     # --- API Keys & External Service URLs ---
     GEMINI_API_KEY = os.getenv("GEMINI_KEY")
+    GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-pro-latest")
+    GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com")
+    GEMINI_TIMEOUT = int(os.getenv("GEMINI_TIMEOUT", 60))
+    GEMINI_POOL_MAXSIZE = int(os.getenv("GEMINI_POOL_MAXSIZE", 10))
 
     # Ollama Configuration
     OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
@@ -15,11 +19,27 @@ class Config:
     OLLAMA_QWEN3_MODEL_NAME = "qwen3:4b"
     OLLAMA_DEFAULT_GENERATION_MODEL = OLLAMA_QWEN3_MODEL_NAME
     OLLAMA_GEN_TIMEOUT = int(os.getenv("OLLAMA_GENERATION_TIMEOUT", 120))
+    OLLAMA_POOL_MAXSIZE = int(os.getenv("OLLAMA_POOL_MAXSIZE", 10))
+    OLLAMA_HEALTH_CHECK_INTERVAL_SECONDS = int(os.getenv("OLLAMA_HEALTH_CHECK_INTERVAL_SECONDS", 15))
+    OLLAMA_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("OLLAMA_CIRCUIT_FAILURE_THRESHOLD", 3))
+    OLLAMA_CIRCUIT_COOLDOWN_SECONDS = int(os.getenv("OLLAMA_CIRCUIT_COOLDOWN_SECONDS", 10))
+
+    # Ollama Model Residency (keep_alive accepts durations like "30m" or "-1" for forever)
+    OLLAMA_PRELOAD_MODELS = os.getenv("OLLAMA_PRELOAD_MODELS", "true").lower() == "true"
+    OLLAMA_CHAT_KEEP_ALIVE = os.getenv("OLLAMA_CHAT_KEEP_ALIVE", "30m")
+    OLLAMA_EMBED_KEEP_ALIVE = os.getenv("OLLAMA_EMBED_KEEP_ALIVE", "30m")
+    OLLAMA_BATCH_KEEP_ALIVE = os.getenv("OLLAMA_BATCH_KEEP_ALIVE", "5m")
+    OLLAMA_RELEASE_IDLE_MODELS_BETWEEN_PHASES = os.getenv("OLLAMA_RELEASE_IDLE_MODELS_BETWEEN_PHASES", "false").lower() == "true"
+    OLLAMA_COLD_START_THRESHOLD_MS = int(os.getenv("OLLAMA_COLD_START_THRESHOLD_MS", 500))
 
     # --- THIS LINE IS REMOVED (or commented out) ---
     # ANIWATCH_API_BASE_URL = os.getenv("ANIWATCH_API_BASE_URL", "http://localhost:4444")
 
     ONE_PIECE_API_BASE_URL = "https://api.api-onepiece.com/v2"
+    # Scraped anime sites; overridable so load tests can point them at local stand-ins.
+    ANIME_SOURCE_BASE_URL = os.getenv("ANIME_SOURCE_BASE_URL", "https://hianime.to")
+    ANIME_EMBED_BASE_URL = os.getenv("ANIME_EMBED_BASE_URL", "https://9animetv.to")
+    ANIME_DECRYPTION_KEY_URL = os.getenv("ANIME_DECRYPTION_KEY_URL", "https://raw.githubusercontent.com/itzzzme/megacloud-keys/refs/heads/main/key.txt")
 
     LLM_PROVIDERS = {
         "gemini": "Google Gemini (Cloud)",
@@ -33,8 +53,158 @@ class Config:
     PORT = int(os.getenv("FLASK_PORT", 8001))
     HOST = os.getenv("FLASK_HOST", "127.0.0.1")
 
+    # Production Server Configuration (serve.py)
+    # Every worker process holds its own vector store, caches and LLM scheduler, so prefer
+    # more threads over more workers; threads let slow upstream calls overlap.
+    SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", 1))
+    SERVER_THREADS = int(os.getenv("SERVER_THREADS", 32))
+    # Long enough for a queued chat answer to finish streaming.
+    SERVER_TIMEOUT_SECONDS = int(os.getenv("SERVER_TIMEOUT_SECONDS", 300))
+    # On SIGTERM, in-flight requests get this long before the worker is stopped and the vector store flushed.
+    SERVER_GRACEFUL_TIMEOUT_SECONDS = int(os.getenv("SERVER_GRACEFUL_TIMEOUT_SECONDS", 30))
+    SERVER_KEEPALIVE_SECONDS = int(os.getenv("SERVER_KEEPALIVE_SECONDS", 5))
+
+    # Upstream HTTP Configuration (scraping and the video proxy)
+    UPSTREAM_POOL_MAXSIZE = int(os.getenv("UPSTREAM_POOL_MAXSIZE", SERVER_THREADS))
+    UPSTREAM_CONNECT_TIMEOUT = float(os.getenv("UPSTREAM_CONNECT_TIMEOUT", 5))
+    SCRAPER_READ_TIMEOUT = float(os.getenv("SCRAPER_READ_TIMEOUT", 20))
+    SCRAPER_CONCURRENT_PAGES = int(os.getenv("SCRAPER_CONCURRENT_PAGES", 8))
+    PROXY_READ_TIMEOUT = float(os.getenv("PROXY_READ_TIMEOUT", 30))
+    PROXY_CHUNK_SIZE = int(os.getenv("PROXY_CHUNK_SIZE", 64 * 1024))
+
+    # Metrics Configuration (Prometheus text format on /metrics; each worker reports its own)
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    # Adds a Server-Timing header listing the stages finished before the response headers went out.
+    METRICS_TIMING_HEADER = os.getenv("METRICS_TIMING_HEADER", "false").lower() == "true"
+
+    # Profiling Configuration (stack samples as .folded flamegraph input, plus tracemalloc reports)
+    # Profiles every ingestion and clustering phase (build_database.py and the ingest endpoints).
+    PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+    PROFILING_DIR = os.getenv("PROFILING_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profiles'))
+    PROFILING_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILING_SAMPLE_INTERVAL_MS", 5))
+    PROFILING_TOP_ALLOCATIONS = int(os.getenv("PROFILING_TOP_ALLOCATIONS", 25))
+    # Any request can be profiled with ?profile=1 plus this token in X-Admin-Token; unset disables it.
+    PROFILING_ADMIN_TOKEN = os.getenv("PROFILING_ADMIN_TOKEN", "")
+
     # Vector Store Configuration
     VECTOR_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'vector_db.pkl.gz')
+    # 'local': every process loads its own writable copy of the store.
+    # 'shared': workers memory-map the latest published snapshot read-only and hot-swap to newer
+    # ones, so memory stays flat as workers are added; only the ingestion job writes.
+    VECTOR_STORE_MODE = os.getenv("VECTOR_STORE_MODE", "local")
+    VECTOR_SNAPSHOT_DIR = os.getenv("VECTOR_SNAPSHOT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), 'vector_snapshots'))
+    # Every successful save also publishes a snapshot for shared-mode workers.
+    VECTOR_SNAPSHOT_PUBLISH_ON_SAVE = os.getenv("VECTOR_SNAPSHOT_PUBLISH_ON_SAVE", "true").lower() == "true"
+    VECTOR_SNAPSHOT_POLL_SECONDS = int(os.getenv("VECTOR_SNAPSHOT_POLL_SECONDS", 10))
+    VECTOR_SNAPSHOT_KEEP = int(os.getenv("VECTOR_SNAPSHOT_KEEP", 3))
+    # Added documents are staged and become searchable in batches of this many, or this long
+    # after the oldest staged one, whichever comes first (saving publishes them at once).
+    VECTOR_STORE_PUBLISH_BATCH = int(os.getenv("VECTOR_STORE_PUBLISH_BATCH", 64))
+    VECTOR_STORE_PUBLISH_INTERVAL_SECONDS = float(os.getenv("VECTOR_STORE_PUBLISH_INTERVAL_SECONDS", 1.0))
+    # OpenMP threads FAISS may use per search; 0 keeps FAISS's default (one per core).
+    FAISS_OMP_THREADS = int(os.getenv("FAISS_OMP_THREADS", 1))
+    # Compressed vector storage: 'flat' (exact float32), 'fp16' or 'sq8' (scalar quantization), or 'pq'
+    # (product quantization). Compressed searches re-rank their top_k * VECTOR_RERANK_FACTOR candidates
+    # exactly, from a memory-mapped file of the full-precision vectors.
+    VECTOR_INDEX_MODE = os.getenv("VECTOR_INDEX_MODE", "flat").lower()
+    # Reduce vectors to this many dimensions with a trained PCA matrix before indexing (0 disables).
+    VECTOR_PCA_DIMENSION = int(os.getenv("VECTOR_PCA_DIMENSION", 0))
+    # Bytes per vector in 'pq' mode; 0 uses one byte per 8 dimensions.
+    VECTOR_PQ_SUBQUANTIZERS = int(os.getenv("VECTOR_PQ_SUBQUANTIZERS", 0))
+    VECTOR_RERANK_FACTOR = int(os.getenv("VECTOR_RERANK_FACTOR", 4))
+    # The store stays exact until it holds this many vectors; quantizers are trained on up to TRAIN_SIZE of them.
+    VECTOR_QUANTIZATION_MIN_VECTORS = int(os.getenv("VECTOR_QUANTIZATION_MIN_VECTORS", 1000))
+    VECTOR_QUANTIZATION_TRAIN_SIZE = int(os.getenv("VECTOR_QUANTIZATION_TRAIN_SIZE", 50000))
+
+    # Retrieval Configuration
+    RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")  # 'hybrid', 'vector' or 'lexical'
+    RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", 5))
+    RETRIEVAL_CANDIDATES = int(os.getenv("RETRIEVAL_CANDIDATES", 30))
+    RETRIEVAL_RRF_K = int(os.getenv("RETRIEVAL_RRF_K", 60))
+    # Maximal marginal relevance over the candidates: 1.0 ranks by relevance alone, lower values
+    # give more weight to documents unlike those already picked, so top_k is not five copies of one synopsis.
+    RETRIEVAL_MMR_LAMBDA = float(os.getenv("RETRIEVAL_MMR_LAMBDA", 0.7))
+    # Metadata fields the vector store keeps bitmap indexes for; filters on other fields scan the documents.
+    VECTOR_FILTER_INDEX_FIELDS = [f.strip() for f in os.getenv("VECTOR_FILTER_INDEX_FIELDS", "type,source").split(",") if f.strip()]
+    # Limits for POST /api/llm/search (bulk semantic search)
+    BULK_SEARCH_MAX_QUERIES = int(os.getenv("BULK_SEARCH_MAX_QUERIES", 64))
+    BULK_SEARCH_MAX_TOP_K = int(os.getenv("BULK_SEARCH_MAX_TOP_K", 50))
+    BM25_K1 = float(os.getenv("BM25_K1", 1.5))
+    BM25_B = float(os.getenv("BM25_B", 0.75))
+
+    # Prompt Budget Configuration
+    PROMPT_MAX_TOKENS = int(os.getenv("PROMPT_MAX_TOKENS", 3000))
+    PROMPT_MAX_DOCUMENT_TOKENS = int(os.getenv("PROMPT_MAX_DOCUMENT_TOKENS", 400))
+    PROMPT_RECENT_TURNS = int(os.getenv("PROMPT_RECENT_TURNS", 4))
+    PROMPT_MAX_TURN_TOKENS = int(os.getenv("PROMPT_MAX_TURN_TOKENS", 300))
+    PROMPT_SUMMARY_MAX_TOKENS = int(os.getenv("PROMPT_SUMMARY_MAX_TOKENS", 300))
+    CONVERSATION_SUMMARY_CACHE_SIZE = int(os.getenv("CONVERSATION_SUMMARY_CACHE_SIZE", 256))
+
+    # LLM Scheduler Configuration
+    LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", 2))
+    LLM_QUEUE_DEPTH_INTERACTIVE = int(os.getenv("LLM_QUEUE_DEPTH_INTERACTIVE", 16))
+    LLM_QUEUE_DEPTH_SUGGESTIONS = int(os.getenv("LLM_QUEUE_DEPTH_SUGGESTIONS", 8))
+    LLM_QUEUE_DEPTH_BACKGROUND = int(os.getenv("LLM_QUEUE_DEPTH_BACKGROUND", 1000))
+    LLM_QUEUE_TIMEOUT_SECONDS = int(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", 120))
+    LLM_QUEUE_HEARTBEAT_SECONDS = float(os.getenv("LLM_QUEUE_HEARTBEAT_SECONDS", 2))
+
+    # Follow-up Suggestion Configuration
+    CHAT_SUGGESTIONS_MODE = os.getenv("CHAT_SUGGESTIONS_MODE", "llm")  # 'llm', 'retrieval' or 'off'
+    CHAT_SUGGESTIONS_WAIT_SECONDS = float(os.getenv("CHAT_SUGGESTIONS_WAIT_SECONDS", 10))
+    CHAT_SUGGESTIONS_CACHE_SIZE = int(os.getenv("CHAT_SUGGESTIONS_CACHE_SIZE", 512))
+
+    # LLM Routing Configuration
+    # Provider used when the selected one is down, times out or is saturated ('' disables fallback).
+    LLM_FALLBACK_PROVIDER = os.getenv("LLM_FALLBACK_PROVIDER", "gemini")
+    # Interactive requests already queued locally before new ones overflow to the fallback provider.
+    LLM_OVERFLOW_QUEUE_DEPTH = int(os.getenv("LLM_OVERFLOW_QUEUE_DEPTH", 4))
+    # Overflow as well when the local provider's recent time-to-first-token exceeds this.
+    LLM_MAX_FIRST_TOKEN_SECONDS = float(os.getenv("LLM_MAX_FIRST_TOKEN_SECONDS", 20))
+    # While the local provider is that slow, one turn this often still goes to it, to find out when it has recovered.
+    LLM_SLOW_PROBE_SECONDS = float(os.getenv("LLM_SLOW_PROBE_SECONDS", 60))
+
+    # Chat Session Configuration
+    CHAT_SESSION_MAX_SESSIONS = int(os.getenv("CHAT_SESSION_MAX_SESSIONS", 500))
+    CHAT_SESSION_TTL_SECONDS = int(os.getenv("CHAT_SESSION_TTL_SECONDS", 3600))
+    CHAT_SESSION_MAX_TOTAL_CONTEXT_TOKENS = int(os.getenv("CHAT_SESSION_MAX_TOTAL_CONTEXT_TOKENS", 2000000))
+    CHAT_SESSION_MAX_CONTEXT_TOKENS = int(os.getenv("CHAT_SESSION_MAX_CONTEXT_TOKENS", 8192))
+
+    # Query & Response Cache Configuration
+    QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", 1024))
+    SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+    SEMANTIC_CACHE_MAX_DISTANCE = float(os.getenv("SEMANTIC_CACHE_MAX_DISTANCE", 0.08))
+    SEMANTIC_CACHE_TTL_SECONDS = int(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", 3600))
+    SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", 512))
+
+    # Title Resolution Index Configuration
+    TITLE_INDEX_MIN_SIMILARITY = float(os.getenv("TITLE_INDEX_MIN_SIMILARITY", 0.5))
+    TITLE_INDEX_UPSTREAM_CACHE_SIZE = int(os.getenv("TITLE_INDEX_UPSTREAM_CACHE_SIZE", 2048))
 
     # Scheduler Configuration
+    # How often the job runner queues an incremental refresh of the ingested data; 0 disables it.
     EMBEDDING_UPDATE_INTERVAL_MINUTES = int(os.getenv("EMBEDDING_UPDATE_INTERVAL_MINUTES", 1440))
+
+    # Offline Corpus Configuration (files ingested alongside the APIs)
+    # Comma-separated JSON or JSONL paths or globs, relative to the backend directory. A file may hold an
+    # array of records, one record per line, or one object whose arrays of objects are records of their own.
+    FILE_SOURCES = [p.strip() for p in os.getenv("FILE_SOURCES", "one_piece_news.json,data/cached_*.json,data/*.jsonl").split(",") if p.strip()]
+    # Long texts are embedded as passages of this many words, each overlapping the previous one.
+    FILE_SOURCE_PASSAGE_WORDS = int(os.getenv("FILE_SOURCE_PASSAGE_WORDS", 200))
+    FILE_SOURCE_PASSAGE_OVERLAP_WORDS = int(os.getenv("FILE_SOURCE_PASSAGE_OVERLAP_WORDS", 40))
+    # Each file's mtime, size and per-record hashes, so unchanged files and records are not embedded again.
+    FILE_SOURCE_STATE_PATH = os.getenv("FILE_SOURCE_STATE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'file_ingest_state.json'))
+
+    # Ingestion-time Deduplication Configuration
+    # Items whose normalised content is already stored, or whose MinHash signature estimates a
+    # Jaccard similarity of at least the threshold (word 3-shingles, same source), are not
+    # embedded but recorded as aliases of the existing document.
+    DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "true").lower() == "true"
+    DEDUP_NEAR_DUPLICATE_THRESHOLD = float(os.getenv("DEDUP_NEAR_DUPLICATE_THRESHOLD", 0.8))
+    DEDUP_MINHASH_PERMUTATIONS = int(os.getenv("DEDUP_MINHASH_PERMUTATIONS", 64))
+    DEDUP_LSH_BANDS = int(os.getenv("DEDUP_LSH_BANDS", 8))
+
+    # Background Job Configuration (ingestion runs as queued jobs instead of inside requests)
+    JOB_STORE_PATH = os.getenv("JOB_STORE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), 'jobs', 'jobs.json'))
+    JOB_HISTORY_LIMIT = int(os.getenv("JOB_HISTORY_LIMIT", 50))
+    # How often the executing process looks for jobs submitted by other worker processes.
+    JOB_POLL_INTERVAL_SECONDS = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", 2))
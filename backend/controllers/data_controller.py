@@ -1,21 +1,38 @@
 # backend/controllers/data_controller.py
 import logging
-from typing import Tuple, Dict, Any, List, Optional
+from typing import TYPE_CHECKING, Tuple, Dict, Any, List, Optional
 import json
 import os
-from services.clustering_service import ClusteringService, CLUSTER_CACHE_PATH
-from services.data_embedding_service import DataEmbeddingService
+from services.clustering_service import CLUSTER_CACHE_PATH
+from services.model_residency_service import ModelResidencyManager
+
+if TYPE_CHECKING:
+    from services.clustering_service import ClusteringService
+    from services.data_embedding_service import DataEmbeddingService
+    from services.job_service import JobProgress, JobRunner
 
 logger = logging.getLogger(__name__)
 
 class DataController:
-    _clustering_service: Optional[ClusteringService] = None
-    _data_embedding_service: Optional[DataEmbeddingService] = None
+    # Ingestion runs as background jobs of these kinds; the refresh is the scheduled one.
+    JOB_INGEST_ALL = "ingest_all_data"
+    JOB_INGEST_CATEGORIES = "ingest_anime_categories"
+    JOB_REFRESH = "refresh_data"
+
+    _clustering_service: Optional['ClusteringService'] = None
+    _data_embedding_service: Optional['DataEmbeddingService'] = None
+    _job_runner: Optional['JobRunner'] = None
 
     @classmethod
-    def initialize(cls, clustering_service: ClusteringService, data_embedding_service: DataEmbeddingService):
+    def initialize(cls, clustering_service: 'ClusteringService', data_embedding_service: 'DataEmbeddingService',
+                   job_runner: Optional['JobRunner'] = None):
         cls._clustering_service = clustering_service
         cls._data_embedding_service = data_embedding_service
+        if job_runner is not None:
+            cls._job_runner = job_runner
+            job_runner.register(cls.JOB_INGEST_ALL, cls._run_ingest_all)
+            job_runner.register(cls.JOB_INGEST_CATEGORIES, cls._run_ingest_categories)
+            job_runner.register(cls.JOB_REFRESH, cls._run_refresh)
         logger.debug("DataController: Services initialized.")
 
     @classmethod
@@ -47,29 +64,92 @@ class DataController:
             return {"error": "Failed to read cluster data from cache."}, 500
 
     @classmethod
-    def ingest_all_data(cls) -> Tuple[Dict[str, Any], int]:
-        if not cls._data_embedding_service or not cls._clustering_service:
+    def _submit_job(cls, kind: str, params: Optional[Dict[str, Any]], queued_message: str) -> Tuple[Dict[str, Any], int]:
+        if not cls._data_embedding_service or not cls._clustering_service or not cls._job_runner:
             logger.error("DataController: A required service is not initialized.")
             return {"error": "A required service is not available."}, 500
+        if cls._data_embedding_service.vector_store.read_only:
+            return {"error": "This server serves a read-only vector snapshot. Run build_database.py to ingest and publish new data."}, 409
         try:
-            logger.info("Triggering full data ingestion and cluster pre-computation via API...")
-            cls._data_embedding_service.embed_all_data()
-            cls._clustering_service.precompute_and_cache_all_clusters()
-            return {"message": "Full data ingestion and cluster pre-computation complete."}, 200
+            job, created = cls._job_runner.submit(kind, params)
         except Exception as e:
-            logger.error(f"Error during full data ingestion: {e}", exc_info=True)
-            return {"error": f"Failed to ingest all data: {str(e)}"}, 500
+            logger.error(f"Error queuing '{kind}' job: {e}", exc_info=True)
+            return {"error": f"Failed to queue the ingestion job: {str(e)}"}, 500
+        message = queued_message if created else "An identical ingestion job is already queued or running."
+        # 202: the work continues in the background; poll /api/data/jobs/<id> for its progress.
+        return {"message": message, "job": job}, 202
+
+    @classmethod
+    def ingest_all_data(cls) -> Tuple[Dict[str, Any], int]:
+        logger.info("Queuing full data ingestion and cluster pre-computation via API...")
+        return cls._submit_job(cls.JOB_INGEST_ALL, None, "Full data ingestion and cluster pre-computation queued.")
 
     @classmethod
     def ingest_anime_api_category_data(cls, categories: List[str], limit_per_category: int) -> Tuple[Dict[str, Any], int]:
-        if not cls._data_embedding_service or not cls._clustering_service:
-            logger.error("DataController: A required service is not initialized.")
-            return {"error": "A required service is not available."}, 500
-        try:
-            logger.info(f"Triggering category data ingestion for {categories} and re-computing clusters via API...")
-            cls._data_embedding_service.embed_anime_api_by_category(categories, limit_per_category)
-            cls._clustering_service.precompute_and_cache_all_clusters()
-            return {"message": "Category data ingested and clusters re-computed."}, 200
-        except Exception as e:
-            logger.error(f"Error during category ingestion controller logic: {e}", exc_info=True)
-            return {"error": f"Failed to ingest category data: {str(e)}"}, 500
+        logger.info(f"Queuing category data ingestion for {categories} and cluster re-computation via API...")
+        params = {"categories": categories, "limit_per_category": limit_per_category}
+        return cls._submit_job(cls.JOB_INGEST_CATEGORIES, params, "Category data ingestion and cluster re-computation queued.")
+
+    @classmethod
+    def list_jobs(cls, limit: int = 20) -> Tuple[Dict[str, Any], int]:
+        if not cls._job_runner:
+            return {"error": "The job runner is not available."}, 500
+        return {"jobs": cls._job_runner.list_jobs(limit), "runner": cls._job_runner.get_status()}, 200
+
+    @classmethod
+    def get_job(cls, job_id: str) -> Tuple[Dict[str, Any], int]:
+        if not cls._job_runner:
+            return {"error": "The job runner is not available."}, 500
+        job = cls._job_runner.get(job_id)
+        if job is None:
+            return {"error": f"No job with id '{job_id}'."}, 404
+        return job, 200
+
+    @classmethod
+    def cancel_job(cls, job_id: str) -> Tuple[Dict[str, Any], int]:
+        if not cls._job_runner:
+            return {"error": "The job runner is not available."}, 500
+        job = cls._job_runner.cancel(job_id)
+        if job is None:
+            return {"error": f"No job with id '{job_id}'."}, 404
+        if job["state"] not in cls._job_runner.ACTIVE_STATES and job["state"] != cls._job_runner.CANCELLED:
+            return {"error": f"Job '{job_id}' already finished ({job['state']}).", "job": job}, 409
+        return job, 200
+
+    # --- Job handlers (run on the job runner's thread) ---
+
+    @classmethod
+    def _check_writable(cls):
+        if cls._data_embedding_service.vector_store.read_only:
+            raise RuntimeError("The vector store is a read-only snapshot; ingest with build_database.py instead.")
+
+    @classmethod
+    def _run_ingest_all(cls, params: Dict[str, Any], progress: 'JobProgress') -> str:
+        cls._check_writable()
+        cls._data_embedding_service.embed_all_data(progress=progress)
+        cls._clustering_service.precompute_and_cache_all_clusters(progress=progress)
+        # Batch phases use short keep_alive hints; bring the interactive models back.
+        ModelResidencyManager.shared().warm_up_in_background()
+        return "Full data ingestion and cluster pre-computation complete."
+
+    @classmethod
+    def _run_ingest_categories(cls, params: Dict[str, Any], progress: 'JobProgress') -> str:
+        cls._check_writable()
+        cls._data_embedding_service.embed_anime_api_by_category(params["categories"], params["limit_per_category"], progress=progress)
+        cls._clustering_service.precompute_and_cache_all_clusters(progress=progress)
+        ModelResidencyManager.shared().warm_up_in_background()
+        return "Category data ingested and clusters re-computed."
+
+    @classmethod
+    def _run_refresh(cls, params: Dict[str, Any], progress: 'JobProgress') -> str:
+        """The scheduled incremental refresh: embeds only new items, and re-clusters only if there were any."""
+        cls._check_writable()
+        vector_store = cls._data_embedding_service.vector_store
+        documents_before = len(vector_store.documents)
+        cls._data_embedding_service.embed_all_data(progress=progress)
+        added = len(vector_store.documents) - documents_before
+        if added == 0 and os.path.exists(CLUSTER_CACHE_PATH):
+            return "No new documents; clusters left unchanged."
+        cls._clustering_service.precompute_and_cache_all_clusters(progress=progress)
+        ModelResidencyManager.shared().warm_up_in_background()
+        return f"Added {added} new documents and re-computed clusters."
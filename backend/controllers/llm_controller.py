@@ -1,12 +1,33 @@
 # backend/controllers/llm_controller.py
-import re
 import urllib.parse
 import json
+import time
+import numpy as np
 from typing import List, Dict, Any, Tuple, Optional, Generator
 
-from services.ollama_llm_service import OllamaLLMService
+from services.query_cache_service import SemanticResponseCache
+from services.chat_session_service import ChatSession
+from services.llm_scheduler import LLMSchedulerBusyError
+from services.model_residency_service import ModelResidencyManager
+from services.metrics_service import Metrics
+from utils.text_processing import StreamingResponseProcessor
 from config import Config
-from globals import global_vector_store, global_ollama_embedder, global_anime_controller
+from globals import (
+    global_vector_store,
+    global_ollama_embedder,
+    global_ollama_llm_service,
+    global_anime_controller,
+    global_title_linker,
+    global_title_index,
+    global_retriever,
+    global_prompt_builder,
+    global_conversation_summary_cache,
+    global_chat_session_store,
+    global_suggestion_service,
+    global_llm_router,
+    global_query_embedding_cache,
+    global_semantic_response_cache
+)
 
 class LLMController:
 
@@ -25,99 +46,388 @@ class LLMController:
     def get_current_llm_provider() -> Tuple[Dict[str, str], int]:
         return {"current_provider": Config.CURRENT_GENERATION_LLM}, 200
 
+    @staticmethod
+    def get_cache_stats() -> Tuple[Dict[str, Any], int]:
+        return {
+            "query_embedding_cache": global_query_embedding_cache.get_stats(),
+            "semantic_response_cache": global_semantic_response_cache.get_stats(),
+            "conversation_summaries": global_conversation_summary_cache.get_stats(),
+            "followup_suggestions": global_suggestion_service.get_stats(),
+            "title_index": global_title_index.get_stats()
+        }, 200
+
+    @staticmethod
+    def get_router_stats() -> Tuple[Dict[str, Any], int]:
+        return global_llm_router.get_stats(), 200
+
+    @staticmethod
+    def get_scheduler_stats() -> Tuple[Dict[str, Any], int]:
+        return global_ollama_llm_service.scheduler.get_stats(), 200
+
+    @staticmethod
+    def get_session_stats() -> Tuple[Dict[str, Any], int]:
+        return global_chat_session_store.get_stats(), 200
+
+    @staticmethod
+    def delete_session(session_id: str) -> Tuple[Dict[str, Any], int]:
+        if global_chat_session_store.delete(session_id):
+            return {"message": f"Session '{session_id}' deleted."}, 200
+        return {"error": f"Session '{session_id}' not found."}, 404
+
+    @staticmethod
+    def get_retrieval_stats() -> Tuple[Dict[str, Any], int]:
+        return global_retriever.get_stats(), 200
+
+    @staticmethod
+    def get_model_residency_metrics() -> Tuple[Dict[str, Any], int]:
+        return ModelResidencyManager.shared().get_metrics(), 200
+
+    @staticmethod
+    def _embed_query(user_query: str) -> Optional[List[float]]:
+        """Embeds a user query, serving repeated (normalised) queries from the LRU cache."""
+        cached_embedding = global_query_embedding_cache.get(user_query)
+        if cached_embedding is not None:
+            return cached_embedding
+        embedding = global_ollama_embedder.embed_text(user_query)
+        if embedding:
+            global_query_embedding_cache.put(user_query, embedding)
+        return embedding
+
+    @staticmethod
+    def bulk_search(queries: List[str], top_k: int = 5, filters: Optional[Dict[str, Any]] = None,
+                    include_content: bool = False) -> Tuple[Dict[str, Any], int]:
+        """
+        Semantic search for many queries at once: each query is embedded (through the query
+        embedding cache) and all of them are searched with one batched vector store call.
+        Hits carry the document id, distance, source id and metadata; content only on request.
+        """
+        metrics = Metrics.shared()
+        with metrics.span("bulk_search_embed"):
+            embeddings = {query: LLMController._embed_query(query) for query in dict.fromkeys(queries)}
+        embedded = [query for query, embedding in embeddings.items() if embedding]
+        if not embedded:
+            return {"error": "Could not embed the queries. Is Ollama running?"}, 503
+
+        try:
+            with metrics.span("bulk_search_retrieve"):
+                all_hits = global_vector_store.search_batch(
+                    np.array([embeddings[query] for query in embedded], dtype=np.float32), top_k=top_k, filters=filters
+                )
+        except ValueError as e:
+            return {"error": str(e)}, 409
+        hits_by_query = dict(zip(embedded, all_hits))
+
+        results = []
+        for query in queries:
+            if query not in hits_by_query:
+                results.append({"query": query, "error": "Could not embed this query.", "hits": []})
+                continue
+            hits = []
+            for hit in hits_by_query[query]:
+                document = hit.document
+                record = {"id": hit.id, "distance": hit.distance, "source_item_id": document.get("source_item_id"),
+                          "metadata": document.get("metadata") or {}}
+                if include_content:
+                    record["content"] = document.get("content")
+                hits.append(record)
+            results.append({"query": query, "hits": hits})
+        return {"results": results}, 200
+
     @staticmethod
     def resolve_link_data(anime_title: str) -> Tuple[Dict[str, Any], int]:
+        # 1. Serve from the local title index built over every ingested anime.
+        local_match = global_title_index.lookup(anime_title)
+        if local_match:
+            return {"title": local_match["title"], "url": f"/anime/details/{local_match['anime_id']}"}, 200
+
+        # 2. Previously resolved upstream (including misses that fell back to search).
+        cached_result = global_title_index.get_cached_upstream(anime_title)
+        if cached_result:
+            global_title_index.record("upstream_cached")
+            return cached_result, 200
+
+        # 3. Only now scrape the upstream search suggestions, and cache whatever we get.
+        global_title_index.record("upstream_fetched")
         suggestions_data, status_code = global_anime_controller.get_search_suggestions_data(anime_title)
         if status_code == 200 and suggestions_data.get("results"):
             top_suggestion = suggestions_data["results"][0]
             anime_id = top_suggestion.get("id")
             official_title = top_suggestion.get("title", anime_title)
             if anime_id:
-                return {"title": official_title, "url": f"/anime/details/{anime_id}"}, 200
+                result = {"title": official_title, "url": f"/anime/details/{anime_id}"}
+                global_title_index.cache_upstream(anime_title, result, anime_id=anime_id)
+                return result, 200
 
         encoded_title = urllib.parse.quote(anime_title)
-        return {"title": anime_title, "url": f"/search?keyword={encoded_title}"}, 200
+        result = {"title": anime_title, "url": f"/search?keyword={encoded_title}"}
+        # Only cache a definitive miss; a failed upstream call should be retried next time.
+        if status_code == 200:
+            global_title_index.cache_upstream(anime_title, result)
+        return result, 200
+
+    @staticmethod
+    def resolve_links_data(anime_titles: List[str]) -> Tuple[Dict[str, Any], int]:
+        """Resolves every title of one response in a single call, keyed by the requested title."""
+        results = {}
+        for anime_title in dict.fromkeys(t for t in anime_titles if isinstance(t, str) and t.strip()):
+            results[anime_title], _ = LLMController.resolve_link_data(anime_title)
+        return {"results": results}, 200
 
     @staticmethod
     def _find_and_verify_links(text: str) -> str:
-        pattern = re.compile(r'\b(?:[A-Z][\w\'\-.:!&]*\s+){1,6}[A-Z][\w\'\-.:!&]*\b')
-        matches = pattern.finditer(text)
-        ignore_list = {"The", "A", "An", "Is", "It", "Of", "And", "He", "She", "They", "One Piece", "Naruto Shippuden"}
-        replacements = []
-        for match in matches:
-            potential_title = match.group(0).strip()
-            if potential_title not in ignore_list and len(potential_title) > 3:
-                 replacements.append((potential_title, f'[LINK:{potential_title}]'))
-        replacements.sort(key=lambda x: len(x[0]), reverse=True)
-        processed_text = text
-        for old, new in replacements:
-            processed_text = re.sub(r'\b' + re.escape(old) + r'\b', new, processed_text)
-        return processed_text
-
-    @staticmethod
-    def generate_llm_response(user_query: str, history: Optional[List[Dict]] = None) -> Generator[str, None, None]:
+        """Links only real, known titles in one linear pass over the response."""
+        return global_title_linker.annotate(text)
+
+    @staticmethod
+    def prepare_chat_turn(user_query: str, history: Optional[List[Dict]] = None,
+                          filters: Optional[Dict[str, Any]] = None,
+                          conversation_id: Optional[str] = None,
+                          session_id: Optional[str] = None) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """
+        Everything a chat turn does before its response starts: retrieval, the semantic cache
+        lookup and, on a miss, reserving a provider. Returns (turn, None) for
+        generate_llm_response, or (None, busy message) when the local queue is full and there
+        is no fallback, so the route can answer 503 before streaming anything.
+
+        A returned turn may hold a scheduler ticket and the session lock; release_chat_turn
+        frees them, and must run even if the response is never iterated.
+        """
+        session = global_chat_session_store.get_or_create(session_id) if session_id else None
+        if session and not session.lock.acquire(blocking=False):
+            # A turn is already running for this session; answer this one statelessly.
+            session = None
+        turn: Dict[str, Any] = {"user_query": user_query, "session": session, "holds_session_lock": bool(session),
+                                "chat_route": {}, "error": None}
         try:
-            current_llm_key = Config.CURRENT_GENERATION_LLM
-            if current_llm_key == 'gemini':
-                yield json.dumps({"type": "error", "content": "Gemini provider is not fully implemented yet."}) + "\n"
-                return
-            elif current_llm_key == 'ollama_qwen3':
-                llm_service = OllamaLLMService(model_name=Config.OLLAMA_QWEN3_MODEL_NAME)
-            else:
-                 yield json.dumps({"type": "error", "content": f"No valid LLM provider configured. Current is '{current_llm_key}'"}) + "\n"
-                 return
-        except Exception as e:
-            yield json.dumps({"type": "error", "content": f"Error initializing LLM service: {e}"}) + "\n"
+            LLMController._prepare_chat_turn(turn, history, filters, conversation_id)
+        except LLMSchedulerBusyError as e:
+            LLMController.release_chat_turn(turn)
+            return None, str(e)
+        except BaseException:
+            LLMController.release_chat_turn(turn)
+            raise
+        return turn, None
+
+    @staticmethod
+    def _prepare_chat_turn(turn: Dict[str, Any], history: Optional[List[Dict]], filters: Optional[Dict[str, Any]],
+                           conversation_id: Optional[str]):
+        user_query, session = turn["user_query"], turn["session"]
+        if session:
+            # The server-side history is authoritative; a client history only seeds a new (or evicted) session.
+            if session.history:
+                history = session.history
+            elif history:
+                session.history = list(history)
+            conversation_id = session.session_id
+
+        metrics = Metrics.shared()
+        with metrics.span("chat_embed_query"):
+            user_query_embedding = LLMController._embed_query(user_query)
+        # Dense and BM25 results are fused, so exact names still find their document
+        # even when the embedding alone ranks it outside the top results.
+        with metrics.span("chat_retrieve"):
+            relevant_docs = global_retriever.retrieve(user_query, user_query_embedding, top_k=Config.RETRIEVAL_TOP_K, filters=filters)
+
+        # Answers only depend on the query and its RAG context when there is no history,
+        # so only those turns are served from (and stored in) the semantic response cache.
+        # They are looked up before a scheduler slot is reserved: a cached answer needs no LLM,
+        # so it is served even while the local queue is full.
+        use_response_cache = not history and bool(user_query_embedding)
+        built_prompt = None
+        cached_response = None
+        if use_response_cache:
+            with metrics.span("chat_prompt_build"):
+                built_prompt = global_prompt_builder.build(user_query, relevant_docs, None, conversation_id=conversation_id)
+            cached_response = LLMController._lookup_cached_response(user_query_embedding, built_prompt["context_ids"],
+                                                                    Config.CURRENT_GENERATION_LLM)
+        turn.update({"history": history, "conversation_id": conversation_id, "user_query_embedding": user_query_embedding,
+                     "relevant_docs": relevant_docs, "use_response_cache": use_response_cache, "built_prompt": built_prompt,
+                     "cached_response": cached_response})
+        if cached_response is not None:
+            return
+        try:
+            # LLMSchedulerBusyError propagates: the route answers it with a 503.
+            turn["chat_route"].update(global_llm_router.reserve_chat(Config.CURRENT_GENERATION_LLM))
+        except ValueError as e:
+            turn["error"] = str(e)
             return
+        if use_response_cache and turn["chat_route"]["provider"] != Config.CURRENT_GENERATION_LLM:
+            # Answers from the overflow provider are cached under its own scope.
+            turn["cached_response"] = LLMController._lookup_cached_response(user_query_embedding, built_prompt["context_ids"],
+                                                                            turn["chat_route"]["provider"])
+            if turn["cached_response"]:
+                LLMController._release_ticket(turn)
+
+    @staticmethod
+    def _release_ticket(turn: Dict[str, Any]):
+        ticket = turn["chat_route"].get("ticket")
+        if ticket:
+            ticket.release()  # Releasing twice is harmless.
+
+    @staticmethod
+    def release_chat_turn(turn: Dict[str, Any]):
+        """Frees a turn's scheduler ticket and session lock. Safe to call more than once."""
+        LLMController._release_ticket(turn)
+        if turn.pop("holds_session_lock", False):
+            turn["session"].lock.release()
 
-        user_query_embedding = global_ollama_embedder.embed_text(user_query)
-        rag_context = ""
-        if user_query_embedding:
-            relevant_docs = global_vector_store.similarity_search(user_query_embedding, top_k=5)
-            if relevant_docs:
-                rag_context = "\n\n---CONTEXT---\n" + "\n".join([doc.get('content', '') for doc in relevant_docs]) + "\n---END CONTEXT---\n"
+    @staticmethod
+    def generate_llm_response(turn: Dict[str, Any]) -> Generator[str, None, None]:
+        """Streams a turn prepared by prepare_chat_turn, releasing what it holds when done or closed."""
+        try:
+            yield from LLMController._generate_llm_response(turn)
+        finally:
+            # Covers errors and client disconnects. A response closed before its first chunk never
+            # runs this, so the route also releases the turn when the response is closed.
+            LLMController.release_chat_turn(turn)
 
-        history_context = ""
-        if history:
-            formatted_history = [f"{'User' if msg.get('sender') == 'user' else 'Mushi'}: {msg.get('text')}" for msg in history]
-            history_context = "\n\n---CONVERSATION HISTORY (FOR CONTEXT)---\n" + "\n".join(formatted_history) + "\n---END HISTORY---\n"
+    @staticmethod
+    def _lookup_cached_response(user_query_embedding: List[float], context_ids: List[Any], provider_key: str) -> Optional[Dict[str, Any]]:
+        context_key = SemanticResponseCache.make_context_key(context_ids, scope=provider_key)
+        return global_semantic_response_cache.lookup(user_query_embedding, context_key)
 
-        final_prompt_for_llm = f"{history_context}{rag_context}\n\nUser Query: {user_query}"
+    @staticmethod
+    def _generate_llm_response(turn: Dict[str, Any]) -> Generator[str, None, None]:
+        user_query, session, chat_route = turn["user_query"], turn["session"], turn["chat_route"]
+        if session:
+            yield json.dumps({"type": "session", "content": {"session_id": session.session_id}}) + "\n"
+        if turn["error"]:
+            yield json.dumps({"type": "error", "content": turn["error"]}) + "\n"
+            return
+        history, conversation_id = turn["history"], turn["conversation_id"]
+        user_query_embedding, relevant_docs = turn["user_query_embedding"], turn["relevant_docs"]
+        use_response_cache, built_prompt, cached_response = turn["use_response_cache"], turn["built_prompt"], turn["cached_response"]
+        provider_key = chat_route.get("provider", Config.CURRENT_GENERATION_LLM)
+        llm_service = global_llm_router.get(provider_key)
 
-        full_response_text = ""
+        if cached_response:
+            yield json.dumps({"type": "mood", "content": cached_response["mood"]}) + "\n"
+            yield json.dumps({"type": "text", "content": cached_response["text"]}) + "\n"
+            cached_questions = global_suggestion_service.get_cached(user_query, cached_response["text"])
+            if cached_questions:
+                yield json.dumps({"type": "suggestions", "content": cached_questions}) + "\n"
+            if session:
+                session.record_turn(user_query, cached_response["text"], None, llm_service.model_name)
+            return
+
+        ticket = chat_route.get("ticket")
+        if chat_route.get("reason") != "selected":
+            yield json.dumps({"type": "provider", "content": {"provider": provider_key, "reason": chat_route.get("reason")}}) + "\n"
+
+        metrics = Metrics.shared()
+        cached_context = None
+        if session and llm_service.supports_context:
+            cached_context = session.context_for(llm_service.model_name)
+        if built_prompt is None:
+            # The prompt is assembled within a fixed token budget, so its size stays flat as the conversation grows.
+            # With a cached Ollama context the earlier turns are already evaluated, so only the new turn is sent.
+            prompt_history = None if cached_context else history
+            with metrics.span("chat_prompt_build"):
+                built_prompt = global_prompt_builder.build(user_query, relevant_docs, prompt_history, conversation_id=conversation_id)
+        context_key = SemanticResponseCache.make_context_key(built_prompt["context_ids"], scope=provider_key)
+
+        # Follow-up suggestions are produced while the answer streams, not after it.
+        speculative_suggestions = global_suggestion_service.start_speculative(user_query, relevant_docs)
+        suggestions_sent = False
+
+        final_prompt_for_llm = built_prompt["prompt"]
+        usage = dict(built_prompt["usage"])
+        usage["reused_context_tokens"] = len(cached_context) if cached_context else 0
+        provider_stats: Dict[str, Any] = {}
+
+        def record_provider_usage(stats: Dict[str, Any]):
+            provider_stats.update(stats)
+            usage["llm_prompt_eval_count"] = stats.get("prompt_eval_count")
+            usage["llm_eval_count"] = stats.get("eval_count")
+
+        if ticket:
+            # While queued, tell the client where it stands. Writing these also surfaces a
+            # client disconnect, which closes this generator and drops the ticket from the queue.
+            waited = 0.0
+            while not ticket.wait(Config.LLM_QUEUE_HEARTBEAT_SECONDS):
+                waited += Config.LLM_QUEUE_HEARTBEAT_SECONDS
+                if waited >= Config.LLM_QUEUE_TIMEOUT_SECONDS:
+                    yield json.dumps({"type": "error", "content": "Mushi is too busy right now. Please try again shortly."}) + "\n"
+                    return
+                yield json.dumps({"type": "queued", "content": {"position": ticket.position()}}) + "\n"
+
+        # Clean the stream incrementally so the first text delta goes out with the first token,
+        # instead of waiting for the whole generation to finish.
+        processor = StreamingResponseProcessor()
         try:
-            for chunk in llm_service.stream_formatted_response(final_prompt_for_llm):
-                full_response_text += chunk
+            while True:
+                started_at = time.perf_counter()
+                stream = llm_service.stream_formatted_response(
+                    final_prompt_for_llm, on_complete=record_provider_usage, context=cached_context, ticket=ticket
+                )
+                failure = None
+                first_chunk = True
+                for chunk in stream:
+                    if not processor.text and chunk.startswith("Error:"):
+                        failure = chunk
+                        break
+                    if first_chunk:
+                        # One sample per turn, at the first raw chunk: <think> and mood chunks show no text yet,
+                        # but the model has started answering.
+                        first_chunk = False
+                        global_llm_router.record_first_token(provider_key, time.perf_counter() - started_at)
+                    for event_type, content in processor.feed(chunk):
+                        yield json.dumps({"type": event_type, "content": content}) + "\n"
+                    if speculative_suggestions and not suggestions_sent and speculative_suggestions.done() and processor.text:
+                        suggestions_sent = True
+                        yield json.dumps({"type": "suggestions", "content": speculative_suggestions.result()}) + "\n"
+                stream.close()
+                if failure is None:
+                    break
+
+                # Nothing has been shown yet, so the turn can move to the fallback provider once.
+                fallback_key = global_llm_router.record_failure(provider_key) if chat_route.get("reason") != "fallback" else None
+                if not fallback_key:
+                    yield json.dumps({"type": "error", "content": failure}) + "\n"
+                    return
+                if ticket:
+                    ticket.release()
+                chat_route.update({"provider": fallback_key, "reason": "fallback", "ticket": None})
+                provider_key, llm_service, ticket, cached_context = fallback_key, global_llm_router.get(fallback_key), None, None
+                yield json.dumps({"type": "provider", "content": {"provider": provider_key, "reason": "fallback"}}) + "\n"
+                # The fallback has none of the cached context, so it gets the full (budgeted) history.
+                final_prompt_for_llm = global_prompt_builder.build(
+                    user_query, relevant_docs, history, conversation_id=conversation_id
+                )["prompt"]
+            for event_type, content in processor.finish():
+                yield json.dumps({"type": event_type, "content": content}) + "\n"
         except Exception as e:
              yield json.dumps({"type": "error", "content": f"Error during LLM stream: {str(e)}"}) + "\n"
              return
 
-        if not full_response_text or full_response_text.startswith("Error:"):
-            yield json.dumps({"type": "error", "content": full_response_text or "LLM returned no response."}) + "\n"
+        if not processor.text:
+            yield json.dumps({"type": "error", "content": "LLM returned no response."}) + "\n"
             return
 
-        # --- START OF DEFINITIVE FIX ---
-        # Strip all unwanted tags before sending any part of the response.
-
-        # 1. Extract and remove the <mood> tag
-        mood_match = re.search(r'<mood>(.*?)</mood>', full_response_text, re.IGNORECASE)
-        mood = 'happy'
-        if mood_match:
-            mood = mood_match.group(1).strip().lower()
-            full_response_text = full_response_text.replace(mood_match.group(0), '', 1).strip()
+        # Link annotation needs the complete answer, so it follows as a final event
+        # that replaces the text streamed so far.
+        final_text = LLMController._find_and_verify_links(processor.text)
+        usage["provider"] = provider_key
+        yield json.dumps({"type": "final", "content": final_text}) + "\n"
+        yield json.dumps({"type": "usage", "content": usage}) + "\n"
 
-        # 2. Remove any <think> blocks completely.
-        full_response_text = re.sub(r'<think>.*?</think>', '', full_response_text, flags=re.DOTALL).strip()
+        if speculative_suggestions:
+            try:
+                suggested_questions = speculative_suggestions.result(timeout=Config.CHAT_SUGGESTIONS_WAIT_SECONDS)
+            except Exception:
+                suggested_questions = global_suggestion_service.from_documents(user_query, relevant_docs)
+            if not suggestions_sent:
+                yield json.dumps({"type": "suggestions", "content": suggested_questions}) + "\n"
+            # Lets /suggest-questions answer instantly if the client still asks for this turn.
+            global_suggestion_service.store(user_query, final_text, suggested_questions)
 
-        # 3. Remove any other stray tags that might have been generated.
-        full_response_text = re.sub(r'<[^>]+>', '', full_response_text).strip()
-        # --- END OF DEFINITIVE FIX ---
+        if session:
+            new_context = provider_stats.get("context") if llm_service.supports_context else None
+            session.record_turn(user_query, processor.text, new_context, llm_service.model_name)
+            global_chat_session_store.after_turn(session)
 
-        # Now we can safely yield the processed data
-        yield json.dumps({"type": "mood", "content": mood}) + "\n"
-
-        final_text = LLMController._find_and_verify_links(full_response_text)
-        yield json.dumps({"type": "text", "content": final_text}) + "\n"
+        if use_response_cache and final_text:
+            global_semantic_response_cache.store(user_query, user_query_embedding, context_key, {"mood": processor.mood, "text": final_text})
 
 
     @staticmethod
@@ -127,24 +437,17 @@ class LLMController:
         if not user_query or not mushi_response:
             return {"suggested_questions": []}, 200
 
-        question_generation_prompt = f"""
-        Based on the following conversation turn:
-        USER ASKED: "{user_query}"
-        MUSHI ANSWERED: "{mushi_response}"
+        # Usually already produced alongside the chat answer.
+        cached_questions = global_suggestion_service.get_cached(user_query, mushi_response)
+        if cached_questions:
+            return {"suggested_questions": cached_questions}, 200
 
-        Generate exactly 3 diverse and insightful follow-up questions a user might ask next.
-        RULES:
-        1. Output ONLY the 3 questions, separated by "|||".
-        2. DO NOT use any special tags, numbering, or bullet points.
-        EXAMPLE OUTPUT: What are some other anime with a complex magic system?|||How does the power scaling in that anime compare to others?|||Are there any characters who question the morality of the magic system?
-        """
-        llm_service = OllamaLLMService(model_name=Config.OLLAMA_QWEN3_MODEL_NAME)
-        llm_raw_response = llm_service.get_simple_response(question_generation_prompt)
-
-        if not llm_raw_response or llm_raw_response.startswith("Error:"):
-            return {"error": llm_raw_response or "Failed to generate suggestions."}, 500
-
-        questions = [q.strip().strip('"') for q in llm_raw_response.split('|||') if q.strip()]
-        final_questions = [re.sub(r'^\s*[-*]?\s*\d*\.\s*', '', q) for q in questions]
+        try:
+            final_questions = global_suggestion_service.generate_with_llm(user_query, answer=mushi_response)
+        except LLMSchedulerBusyError as e:
+            return {"error": str(e)}, 503
+        if not final_questions:
+            return {"error": "Failed to generate suggestions."}, 500
 
-        return {"suggested_questions": final_questions[:3]}, 200
+        global_suggestion_service.store(user_query, mushi_response, final_questions)
+        return {"suggested_questions": final_questions}, 200
@@ -1,16 +1,26 @@
 # backend/controllers/proxy_controller.py
 import requests
+import urllib3
 import logging
 import json
 import re
+import time
 from flask import Response, request
 from urllib.parse import urlparse, urljoin, quote
 
+from config import Config
+from services.metrics_service import Metrics
 # Using the globally initialized scraper for consistency
 from globals import global_anime_api_service
 
 logger = logging.getLogger(__name__)
 
+# Connection-level headers describe the upstream hop and must not be forwarded to the client.
+HOP_BY_HOP_HEADERS = {'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization',
+                      'te', 'trailers', 'transfer-encoding', 'upgrade'}
+PROXY_BYTES_METRIC = "mushi_proxy_bytes_total"
+PROXY_BYTES_HELP = "Bytes relayed from upstream media servers to clients."
+
 class ProxyController:
     """
     Handles proxying of M3U8 playlists and their corresponding TS segments/keys.
@@ -37,12 +47,16 @@ class ProxyController:
         except json.JSONDecodeError:
             return Response("Invalid 'headers' JSON in query parameter.", status=400, mimetype='text/plain')
 
+        metrics = Metrics.shared()
         try:
-            response = global_anime_api_service.scraper.get(target_url, headers=headers, timeout=20)
+            with metrics.span("proxy_m3u8_upstream"):
+                response = global_anime_api_service.scraper.get(target_url, headers=headers,
+                                                                timeout=(Config.UPSTREAM_CONNECT_TIMEOUT, Config.PROXY_READ_TIMEOUT))
             response.raise_for_status()
         except requests.exceptions.RequestException as e:
             logger.error(f"Proxy M3U8: Error fetching from {target_url}: {e}")
             return Response(f"Failed to fetch M3U8 playlist: {e}", status=502, mimetype='text/plain')
+        metrics.add(PROXY_BYTES_METRIC, len(response.content), help_text=PROXY_BYTES_HELP, route="m3u8")
 
         original_m3u8_content = response.text
         base_url = target_url  # Used for resolving relative paths within the playlist
@@ -102,22 +116,38 @@ class ProxyController:
         except json.JSONDecodeError:
             return Response("Invalid 'headers' JSON in query parameter.", status=400, mimetype='text/plain')
 
+        metrics = Metrics.shared()
+        started_at = time.perf_counter()
         try:
-            response = global_anime_api_service.scraper.get(target_url, headers=headers, stream=True, timeout=30)
+            # Time until the upstream response headers arrive; the body is timed while it streams.
+            with metrics.span("proxy_ts_upstream"):
+                response = global_anime_api_service.scraper.get(target_url, headers=headers, stream=True,
+                                                                timeout=(Config.UPSTREAM_CONNECT_TIMEOUT, Config.PROXY_READ_TIMEOUT))
             response.raise_for_status()
-
-            def generate():
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        yield chunk
-
-            # Pass through original headers but ensure CORS is set
-            response_headers = dict(response.headers)
-            response_headers['Access-Control-Allow-Origin'] = '*'
-            response_headers['Access-Control-Expose-Headers'] = 'Content-Length, Content-Type, Content-Range, Date, Server, Transfer-Encoding'
-
-            return Response(generate(), headers=response_headers, status=response.status_code)
-
         except requests.exceptions.RequestException as e:
             logger.error(f"Proxy TS: Error fetching from {target_url}: {e}")
             return Response(f"Failed to fetch segment/key: {e}", status=502, mimetype='text/plain')
+
+        def generate():
+            # The body is relayed as-is (still compressed if it was), so Content-Length and
+            # Content-Encoding stay valid. Closing on exit returns the upstream connection to
+            # the pool even when the player disconnects mid-segment.
+            relayed = 0
+            try:
+                for chunk in response.raw.stream(Config.PROXY_CHUNK_SIZE, decode_content=False):
+                    if chunk:
+                        relayed += len(chunk)
+                        yield chunk
+            except (requests.exceptions.RequestException, urllib3.exceptions.HTTPError) as e:
+                logger.warning(f"Proxy TS: Upstream stream from {target_url} ended early: {e}")
+            finally:
+                response.close()
+                metrics.observe("proxy_ts_total", time.perf_counter() - started_at)
+                metrics.add(PROXY_BYTES_METRIC, relayed, help_text=PROXY_BYTES_HELP, route="ts")
+
+        # Pass through original headers but ensure CORS is set
+        response_headers = {key: value for key, value in response.headers.items() if key.lower() not in HOP_BY_HOP_HEADERS}
+        response_headers['Access-Control-Allow-Origin'] = '*'
+        response_headers['Access-Control-Expose-Headers'] = 'Content-Length, Content-Type, Content-Range, Date, Server'
+
+        return Response(generate(), headers=response_headers, status=response.status_code)
@@ -0,0 +1,147 @@
+# backend/embeddings/dedup_index.py
+import hashlib
+import logging
+import threading
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from embeddings.lexical_index import tokenize
+
+logger = logging.getLogger(__name__)
+
+# MinHash permutations are (a * x + b) mod a Mersenne prime; with a < 2**31 and 32-bit shingle
+# hashes the product stays below 2**63, so uint64 arithmetic never overflows.
+MINHASH_PRIME = (1 << 31) - 1
+
+
+def normalize_content(content: str) -> str:
+    """Lowercased word tokens joined by single spaces: punctuation, case and spacing don't count."""
+    return " ".join(tokenize(content))
+
+
+def content_hash(content: str) -> str:
+    return hashlib.blake2b(normalize_content(content).encode('utf-8'), digest_size=16).hexdigest()
+
+
+class DuplicateIndex:
+    """
+    Spots documents that repeat content already in the vector store, so ingestion can skip
+    embedding them and record them as aliases of the existing (canonical) document.
+
+    - Exact duplicates: the same normalised content (see normalize_content) hashes the same.
+    - Near duplicates: MinHash signatures over word shingles, bucketed with LSH (the signature
+      is cut into `bands`; documents sharing any band are candidates). A candidate counts as a
+      duplicate when the signatures estimate a Jaccard similarity of at least `threshold`.
+
+    Documents are only compared with documents from the same metadata 'source'. Texts with
+    fewer than `min_shingles` shingles (a name and "Description: N/A") are too short to tell
+    apart reliably and are only matched exactly.
+
+    Only ingestion needs it, so it is built from the store on first use rather than on every
+    load, and then follows the store's change listener like the BM25 index.
+    """
+    def __init__(self, num_permutations: int = 64, bands: int = 8, threshold: float = 0.8,
+                 shingle_size: int = 3, min_shingles: int = 8):
+        if num_permutations % bands:
+            raise ValueError(f"num_permutations ({num_permutations}) must be a multiple of bands ({bands}).")
+        self.num_permutations = num_permutations
+        self.bands = bands
+        self.rows_per_band = num_permutations // bands
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.min_shingles = min_shingles
+        rng = np.random.default_rng(0)
+        self._a = rng.integers(1, MINHASH_PRIME, num_permutations, dtype=np.uint64)
+        self._b = rng.integers(0, MINHASH_PRIME, num_permutations, dtype=np.uint64)
+        self._lock = threading.RLock()
+        self._vector_store = None
+        self._built = False
+        self._reset()
+
+    def _reset(self):
+        self._exact: Dict[Tuple[Any, str], int] = {}            # (source, content hash) -> doc id
+        self._buckets: Dict[Tuple[Any, int, int], List[int]] = {}  # (source, band, band hash) -> doc ids
+        self._signatures = np.empty((0, self.num_permutations), dtype=np.uint32)
+        self._rows: Dict[int, int] = {}                          # doc id -> row in _signatures
+        self._count = 0
+
+    def attach(self, vector_store):
+        """Follows the store's changes; the index itself is built on the first lookup."""
+        self._vector_store = vector_store
+        vector_store.add_change_listener(self._on_store_changed)
+
+    def _on_store_changed(self, event: str, documents: List[Dict[str, Any]]):
+        with self._lock:
+            if event == "reset":
+                self._reset()
+                self._built = False
+            elif self._built:
+                for doc in documents:
+                    self.add(doc["id"], doc.get("content", ""), doc.get("metadata"))
+
+    def _ensure_built(self):
+        if self._built or self._vector_store is None:
+            return
+        documents = self._vector_store.documents
+        for doc in documents:
+            self.add(doc["id"], doc.get("content", ""), doc.get("metadata"))
+        self._built = True
+        logger.info(f"DuplicateIndex: Indexed {len(documents)} documents.")
+
+    def _signature(self, content: str) -> Optional[np.ndarray]:
+        tokens = tokenize(content)
+        shingles = {" ".join(tokens[i:i + self.shingle_size]) for i in range(len(tokens) - self.shingle_size + 1)}
+        if len(shingles) < self.min_shingles:
+            return None
+        hashes = np.fromiter((zlib.crc32(shingle.encode('utf-8')) for shingle in shingles), dtype=np.uint64, count=len(shingles))
+        return ((np.outer(hashes, self._a) + self._b) % MINHASH_PRIME).min(axis=0).astype(np.uint32)
+
+    def _band_keys(self, signature: np.ndarray):
+        for band in range(self.bands):
+            yield band, hash(signature[band * self.rows_per_band:(band + 1) * self.rows_per_band].tobytes())
+
+    def find_duplicate(self, content: str, metadata: Optional[Dict[str, Any]] = None) -> Optional[Tuple[int, str]]:
+        """(canonical doc id, "exact" or "near") for content already indexed, or None."""
+        source = (metadata or {}).get("source")
+        with self._lock:
+            self._ensure_built()
+            doc_id = self._exact.get((source, content_hash(content)))
+            if doc_id is not None:
+                return doc_id, "exact"
+            signature = self._signature(content)
+            if signature is None:
+                return None
+            candidates = set()
+            for band, key in self._band_keys(signature):
+                candidates.update(self._buckets.get((source, band, key), ()))
+            best_id, best_similarity = None, self.threshold
+            for candidate in candidates:
+                similarity = float(np.mean(self._signatures[self._rows[candidate]] == signature))
+                if similarity >= best_similarity:
+                    best_id, best_similarity = candidate, similarity
+            return (best_id, "near") if best_id is not None else None
+
+    def add(self, doc_id: int, content: str, metadata: Optional[Dict[str, Any]] = None):
+        source = (metadata or {}).get("source")
+        with self._lock:
+            if doc_id in self._rows or (source, content_hash(content)) in self._exact:
+                return
+            self._exact[(source, content_hash(content))] = doc_id
+            signature = self._signature(content)
+            if signature is None:
+                return
+            if self._count == len(self._signatures):
+                grown = np.empty((max(1024, 2 * self._count), self.num_permutations), dtype=np.uint32)
+                grown[:self._count] = self._signatures[:self._count]
+                self._signatures = grown
+            self._signatures[self._count] = signature
+            self._rows[doc_id] = self._count
+            self._count += 1
+            for band, key in self._band_keys(signature):
+                self._buckets.setdefault((source, band, key), []).append(doc_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"built": self._built, "exact_hashes": len(self._exact), "signatures": self._count}
@@ -0,0 +1,109 @@
+# backend/embeddings/lexical_index.py
+import logging
+import math
+import re
+import threading
+from collections import Counter
+from typing import List, Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"[^\W_]+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens; names like 'Gomu Gomu no Mi' keep every part."""
+    return TOKEN_PATTERN.findall((text or "").lower())
+
+
+def matches_filters(metadata: Dict[str, Any], filters: Optional[Dict[str, Any]]) -> bool:
+    """
+    True if the metadata satisfies every filter. A filter value may be a single value
+    or a list of accepted values, e.g. {"type": ["anime", "anime_details"], "source": "Anime API"}.
+    """
+    if not filters:
+        return True
+    for field, accepted in filters.items():
+        value = metadata.get(field)
+        if isinstance(accepted, (list, tuple, set)):
+            if value not in accepted:
+                return False
+        elif value != accepted:
+            return False
+    return True
+
+
+class BM25Index:
+    """
+    An in-process inverted index with Okapi BM25 scoring over the vector store's documents.
+
+    It is kept in step with FAISS through the vector store's change listener: every added
+    document is tokenised once and appended to the postings, so the index never needs a
+    full rebuild except after a load or clear.
+    """
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self._postings: Dict[str, Dict[int, int]] = {}   # term -> {doc id: term frequency}
+        self._doc_lengths: Dict[int, int] = {}
+        self._doc_metadata: Dict[int, Dict[str, Any]] = {}
+        self._total_length = 0
+
+    def attach(self, vector_store):
+        """Indexes the store's current documents and follows every later change."""
+        vector_store.add_change_listener(self._on_store_changed)
+        self._on_store_changed("reset", vector_store.documents)
+
+    def _on_store_changed(self, event: str, documents: List[Dict[str, Any]]):
+        with self._lock:
+            if event == "reset":
+                self._reset()
+            for doc in documents:
+                self.add_document(doc["id"], doc.get("content", ""), doc.get("metadata"))
+
+    def add_document(self, doc_id: int, content: str, metadata: Optional[Dict[str, Any]] = None):
+        metadata = metadata or {}
+        # The title is indexed alongside the content so exact-name queries hit it directly.
+        term_counts = Counter(tokenize(f"{metadata.get('title', '')} {content}"))
+        with self._lock:
+            if doc_id in self._doc_lengths:
+                return
+            for term, count in term_counts.items():
+                self._postings.setdefault(term, {})[doc_id] = count
+            length = sum(term_counts.values())
+            self._doc_lengths[doc_id] = length
+            self._doc_metadata[doc_id] = metadata
+            self._total_length += length
+
+    def search(self, query: str, top_k: int = 5, filters: Optional[Dict[str, Any]] = None) -> List[Tuple[int, float]]:
+        """Returns up to top_k (doc id, BM25 score) pairs, best first."""
+        query_terms = set(tokenize(query))
+        with self._lock:
+            doc_count = len(self._doc_lengths)
+            if not query_terms or doc_count == 0:
+                return []
+            average_length = self._total_length / doc_count
+            scores: Dict[int, float] = {}
+            for term in query_terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, frequency in postings.items():
+                    if filters and not matches_filters(self._doc_metadata[doc_id], filters):
+                        continue
+                    length_norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[doc_id] / average_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + length_norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "documents": len(self._doc_lengths),
+                "terms": len(self._postings),
+                "average_document_length": round(self._total_length / len(self._doc_lengths), 2) if self._doc_lengths else 0,
+            }
@@ -0,0 +1,98 @@
+# backend/embeddings/metadata_index.py
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from embeddings.lexical_index import matches_filters
+
+
+def bits_from_ids(ids: List[int]) -> int:
+    """A bitset with the given bits set, built in one go (setting bits one by one on a big int is quadratic)."""
+    if not ids:
+        return 0
+    bitmap = np.zeros(max(ids) + 1, dtype=bool)
+    bitmap[ids] = True
+    return int.from_bytes(np.packbits(bitmap, bitorder='little').tobytes(), 'little')
+
+
+def bits_to_bytes(bits: int) -> np.ndarray:
+    """The bitset as a little-endian uint8 array, the layout faiss.IDSelectorBitmap reads."""
+    return np.frombuffer(bits.to_bytes(max(1, (bits.bit_length() + 7) // 8), 'little'), dtype=np.uint8)
+
+
+def _is_hashable(value: Any) -> bool:
+    try:
+        hash(value)
+        return True
+    except TypeError:
+        return False
+
+
+class MetadataBitmaps:
+    """
+    Bitmap index over a few low-cardinality metadata fields (e.g. "type" and "source").
+
+    For every (field, value) pair it keeps a Python int used as a bitset: bit `i` is set when
+    the document with id `i` has that value (a missing field counts as None). Filters on
+    indexed fields are answered with ORs and ANDs of these bitsets instead of a scan; other
+    fields, or unhashable filter values, fall back to checking each document with
+    matches_filters. Instances are immutable: extended() returns a new one, so a published
+    store view can keep using its own.
+    """
+    __slots__ = ("fields", "bitmaps")
+
+    def __init__(self, fields: Tuple[str, ...], bitmaps: Optional[Dict[str, Dict[Any, int]]] = None):
+        self.fields = fields
+        self.bitmaps = bitmaps if bitmaps is not None else {field: {} for field in fields}
+
+    @classmethod
+    def build(cls, fields: Iterable[str], documents: List[Dict[str, Any]]) -> "MetadataBitmaps":
+        return cls(tuple(fields)).extended(documents)
+
+    def extended(self, documents: List[Dict[str, Any]]) -> "MetadataBitmaps":
+        """A copy that also covers `documents`; only the touched bitsets are rebuilt."""
+        additions: Dict[str, Dict[Any, List[int]]] = {field: {} for field in self.fields}
+        for doc in documents:
+            metadata = doc.get('metadata') or {}
+            for field in self.fields:
+                value = metadata.get(field)
+                if _is_hashable(value):
+                    additions[field].setdefault(value, []).append(doc['id'])
+        bitmaps = {}
+        for field in self.fields:
+            if additions[field]:
+                merged = dict(self.bitmaps[field])
+                for value, ids in additions[field].items():
+                    merged[value] = merged.get(value, 0) | bits_from_ids(ids)
+                bitmaps[field] = merged
+            else:
+                bitmaps[field] = self.bitmaps[field]
+        return MetadataBitmaps(self.fields, bitmaps)
+
+    def select(self, filters: Dict[str, Any], documents: List[Dict[str, Any]]) -> int:
+        """The bitset of document ids that satisfy every filter."""
+        selected: Optional[int] = None
+        scanned_filters = {}
+        for field, accepted in filters.items():
+            values = list(accepted) if isinstance(accepted, (list, tuple, set)) else [accepted]
+            if field not in self.bitmaps or not all(_is_hashable(value) for value in values):
+                scanned_filters[field] = accepted
+                continue
+            bits = 0
+            for value in values:
+                bits |= self.bitmaps[field].get(value, 0)
+            selected = bits if selected is None else selected & bits
+            if not selected:
+                return 0
+
+        if scanned_filters:
+            candidates = None
+            if selected is not None:
+                candidates = np.unpackbits(bits_to_bytes(selected), bitorder='little').astype(bool)
+            ids = [
+                doc['id'] for doc in documents
+                if (candidates is None or (doc['id'] < len(candidates) and candidates[doc['id']]))
+                and matches_filters(doc.get('metadata') or {}, scanned_filters)
+            ]
+            selected = bits_from_ids(ids)
+        return selected or 0
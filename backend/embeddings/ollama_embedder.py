@@ -3,6 +3,8 @@ import requests
 import json
 import logging
 from config import Config
+from services.ollama_client import OllamaClient
+from services.model_residency_service import ModelResidencyManager
 
 logger = logging.getLogger(__name__)
 
@@ -10,22 +12,27 @@ class OllamaEmbedder:
     """
     Handles generating embeddings using a local Ollama instance.
     """
-    def __init__(self):
-        self.base_url = Config.OLLAMA_BASE_URL
+    def __init__(self, client: OllamaClient = None):
+        self.client = client or OllamaClient.shared()
+        self.base_url = self.client.base_url
         self.embedding_model = Config.OLLAMA_EMBEDDING_MODEL
-        self.headers = {'Content-Type': 'application/json'}
-        if not self._verify_model_exists():
-            error_msg = (
-                f"FATAL: The specified embedding model '{self.embedding_model}' does not exist in your local Ollama instance. "
-                f"Please run 'ollama pull {self.embedding_model}' in your terminal to download it."
-            )
-            logger.critical(error_msg)
-            raise ValueError(error_msg)
+        # The model check is not run here, so the app can start while Ollama is down;
+        # start-up runs verify_model() in the background instead.
+
+    def verify_model(self) -> bool:
+        """Checks the embedding model is pulled, logging how to fix it if it is not."""
+        if self._verify_model_exists():
+            return True
+        logger.critical(
+            f"The specified embedding model '{self.embedding_model}' is not available in your local Ollama instance at {self.base_url}. "
+            f"Please run 'ollama pull {self.embedding_model}' in your terminal to download it."
+        )
+        return False
 
     def _verify_model_exists(self) -> bool:
         """Checks if the configured embedding model is available in the Ollama instance."""
         try:
-            response = requests.get(f"{self.base_url}/api/tags")
+            response = self.client.get("/api/tags", timeout=10)
             response.raise_for_status()
             models = response.json().get("models", [])
             for model in models:
@@ -37,21 +44,23 @@ class OllamaEmbedder:
             logger.error(f"OllamaEmbedder: Could not connect to Ollama at {self.base_url} to verify model existence. Error: {e}")
             return False
 
-    def embed_text(self, text: str) -> list[float] | None:
+    def embed_text(self, text: str, keep_alive: str | None = None) -> list[float] | None:
         """
         Generates an embedding for the given text using the configured Ollama model.
+        `keep_alive` overrides the residency hint (batch ingestion uses a shorter one).
         """
         # --- START OF DEFINITIVE FIX: Use correct endpoint AND payload key ---
         url = f"{self.base_url}/api/embeddings"
         payload = {
             "model": self.embedding_model,
-            "prompt": text  # The correct key for the embedding text is 'prompt'.
+            "prompt": text,  # The correct key for the embedding text is 'prompt'.
+            "keep_alive": keep_alive or ModelResidencyManager.shared().keep_alive_for("embed")
         }
         # --- END OF DEFINITIVE FIX ---
 
         logger.debug(f"OllamaEmbedder: Sending embedding request for text (first 50 chars): '{text[:50]}...'")
         try:
-            response = requests.post(url, headers=self.headers, data=json.dumps(payload), timeout=60)
+            response = self.client.post("/api/embeddings", data=json.dumps(payload), timeout=60)
             response.raise_for_status()
             embedding_data = response.json()
 
@@ -0,0 +1,168 @@
+# backend/embeddings/quantization.py
+"""
+Compressed FAISS indexes for the vector store, and the full-precision vectors kept beside them.
+
+A compressed index is built from a FAISS factory description such as "IVF1,SQ8" or
+"PCA256,IVF1,PQ32". The single-list IVF layer does no clustering (every vector lands in
+the one list and every search scans it); it is there because IVF indexes store ids and
+accept ID selectors, which IndexPQ behind an IndexIDMap does not. Distances from a
+compressed index are approximate, so the store re-ranks its candidates with the exact
+vectors held by FullPrecisionVectors, normally memory-mapped from disk.
+"""
+import logging
+from typing import List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INDEX_MODES = ("flat", "fp16", "sq8", "pq")
+# Rows copied into an index per add() call, to bound the temporary float32 copies of memory-mapped rows.
+ADD_BATCH = 65536
+
+
+def _pq_subquantizers(dimension: int, requested: int) -> int:
+    """`requested`, or one byte per 8 dimensions, lowered to a divisor of `dimension` as PQ requires."""
+    m = max(1, min(dimension, requested or dimension // 8))
+    while dimension % m:
+        m -= 1
+    return m
+
+
+def index_description(mode: str, dimension: int, pca_dimension: int = 0, pq_subquantizers: int = 0) -> Optional[str]:
+    """The factory description for a compressed index, or None when vectors are stored exactly."""
+    if mode not in INDEX_MODES:
+        raise ValueError(f"Unknown vector index mode '{mode}'. Expected one of {', '.join(INDEX_MODES)}.")
+    reduced = pca_dimension if 0 < pca_dimension < dimension else 0
+    if mode == "flat" and not reduced:
+        return None
+    out_dimension = reduced or dimension
+    codec = {"flat": "Flat", "fp16": "SQfp16", "sq8": "SQ8"}.get(mode) or f"PQ{_pq_subquantizers(out_dimension, pq_subquantizers)}"
+    return f"{f'PCA{reduced},' if reduced else ''}IVF1,{codec}"
+
+
+def train_index(description: str, dimension: int, training_vectors: np.ndarray):
+    """An empty, trained index for `description`."""
+    index = faiss.index_factory(dimension, description)
+    index.train(np.ascontiguousarray(training_vectors, dtype=np.float32))
+    return index
+
+
+def search_parameters(index, selector) -> Optional[faiss.SearchParameters]:
+    """Search parameters restricting a compressed index to `selector`; None when there is none."""
+    if selector is None:
+        return None
+    ivf_params = faiss.SearchParametersIVF(sel=selector, nprobe=1)
+    if isinstance(index, faiss.IndexPreTransform):
+        return faiss.SearchParametersPreTransform(index_params=ivf_params)
+    return ivf_params
+
+
+class FullPrecisionVectors:
+    """
+    The exact float32 vectors behind a compressed index, looked up by document id.
+
+    Rows are kept sorted by id, in one or more chunks: the memory-mapped file written by
+    the last save, then any rows compressed since. Instances are immutable; extended()
+    returns a new one sharing the existing chunks.
+    """
+    __slots__ = ("ids", "chunks", "offsets", "dimension")
+
+    def __init__(self, ids: np.ndarray, chunks: Tuple[np.ndarray, ...], dimension: int):
+        self.ids = ids
+        self.chunks = chunks
+        self.offsets = np.cumsum([0] + [len(chunk) for chunk in chunks])
+        self.dimension = dimension
+
+    @classmethod
+    def empty(cls, dimension: int) -> "FullPrecisionVectors":
+        return cls(np.empty(0, dtype=np.int64), (), dimension)
+
+    @classmethod
+    def open(cls, path: str, ids: np.ndarray) -> "FullPrecisionVectors":
+        """Memory-maps a file written by write(); pages are only read for the rows looked up."""
+        vectors = np.load(path, mmap_mode='r')
+        if len(vectors) != len(ids):
+            raise ValueError(f"{path} holds {len(vectors)} vectors, but {len(ids)} ids were saved for it.")
+        return cls(np.asarray(ids, dtype=np.int64), (vectors,), vectors.shape[1])
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def extended(self, ids: np.ndarray, vectors: np.ndarray) -> "FullPrecisionVectors":
+        if len(ids) == 0:
+            return self
+        order = np.argsort(ids, kind='stable')
+        ids, vectors = ids[order], np.ascontiguousarray(vectors[order], dtype=np.float32)
+        if len(self.ids) and ids[0] <= self.ids[-1]:
+            # Ids only grow between clears, so this never happens in practice; stay correct anyway.
+            all_ids = np.concatenate([self.ids, ids])
+            order = np.argsort(all_ids, kind='stable')
+            return FullPrecisionVectors(all_ids[order], (np.concatenate([self.rows(), vectors])[order],), self.dimension)
+        return FullPrecisionVectors(np.concatenate([self.ids, ids]), self.chunks + (vectors,), self.dimension)
+
+    def get(self, ids: np.ndarray) -> np.ndarray:
+        """The vectors of `ids`, shape (len(ids), dimension). Every id must be present."""
+        rows = np.searchsorted(self.ids, ids)
+        if len(self.chunks) == 1:
+            return np.asarray(self.chunks[0][rows], dtype=np.float32)
+        result = np.empty((len(rows), self.dimension), dtype=np.float32)
+        chunk_of_row = np.searchsorted(self.offsets, rows, side='right') - 1
+        for chunk_number in np.unique(chunk_of_row):
+            mask = chunk_of_row == chunk_number
+            result[mask] = self.chunks[chunk_number][rows[mask] - self.offsets[chunk_number]]
+        return result
+
+    def contains(self, doc_id: int) -> bool:
+        row = int(np.searchsorted(self.ids, doc_id))
+        return row < len(self.ids) and self.ids[row] == doc_id
+
+    def batches(self, size: int = ADD_BATCH):
+        """(ids, vectors) in id order, `size` rows at a time."""
+        for chunk, start in zip(self.chunks, self.offsets):
+            for begin in range(0, len(chunk), size):
+                end = min(begin + size, len(chunk))
+                yield self.ids[start + begin:start + end], np.ascontiguousarray(chunk[begin:end], dtype=np.float32)
+
+    def rows(self) -> np.ndarray:
+        return np.concatenate(self.chunks) if self.chunks else np.empty((0, self.dimension), dtype=np.float32)
+
+    def sample(self, count: int, seed: int = 0) -> np.ndarray:
+        """Up to `count` random rows, e.g. for training a quantizer."""
+        if len(self.ids) <= count:
+            return np.asarray(self.rows(), dtype=np.float32)
+        picked = np.sort(np.random.default_rng(seed).choice(len(self.ids), count, replace=False))
+        return self.get(self.ids[picked])
+
+    def write(self, path: str):
+        """Writes the rows as one .npy file, a batch at a time, so they are never all in memory at once."""
+        output = np.lib.format.open_memmap(path, mode='w+', dtype=np.float32, shape=(len(self.ids), self.dimension))
+        written = 0
+        for _, vectors in self.batches():
+            output[written:written + len(vectors)] = vectors
+            written += len(vectors)
+        output.flush()
+        del output
+
+
+def rerank(queries: np.ndarray, candidate_ids: np.ndarray, vectors: FullPrecisionVectors) -> np.ndarray:
+    """
+    Exact squared L2 distances between each query and its candidates (an (n, k) id array,
+    -1 for none). Missing candidates get +inf, so they sort last.
+    """
+    valid = candidate_ids != -1
+    distances = np.full(candidate_ids.shape, np.inf, dtype=np.float32)
+    if valid.any():
+        candidate_vectors = vectors.get(candidate_ids[valid])
+        query_rows = np.nonzero(valid)[0]
+        distances[valid] = np.sum((candidate_vectors - queries[query_rows]) ** 2, axis=1)
+    return distances
+
+
+def stack_vectors(batches: List[Tuple[np.ndarray, np.ndarray]], dimension: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Concatenates (ids, vectors) batches; empty inputs give correctly shaped empty arrays."""
+    if not batches:
+        return np.empty(0, dtype=np.int64), np.empty((0, dimension), dtype=np.float32)
+    return (np.concatenate([ids for ids, _ in batches]).astype(np.int64),
+            np.concatenate([vectors for _, vectors in batches]).astype(np.float32, copy=False))
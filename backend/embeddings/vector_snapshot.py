@@ -0,0 +1,153 @@
+# backend/embeddings/vector_snapshot.py
+"""
+Immutable, versioned snapshots of the vector store that many worker processes can share.
+
+A snapshot directory holds one sub-directory per published version plus a version file:
+
+    vector_snapshots/
+        CURRENT                  <- the live version number, replaced atomically
+        snapshot-000007/
+            index.faiss          <- read by workers with faiss' mmap flag, so its pages are shared
+            documents.pkl        <- documents without their embeddings (those live in the index)
+            source_ids.pkl       <- source_item_id -> document id, aliases of merged duplicates included
+            manifest.json
+            vectors.npy          <- compressed stores only: the exact vectors for re-ranking, memory-mapped
+            vector_ids.npy          the document id of each of those rows
+
+A single writer (build_database.py or an ingestion run) writes each version into a temporary
+directory, renames it into place, then points CURRENT at it. Readers only ever open complete,
+never-modified versions, and a version that is pruned while still mapped stays readable.
+"""
+import fcntl
+import json
+import logging
+import os
+import pickle
+import shutil
+import time
+from typing import Any, Dict, Optional
+
+import faiss
+import numpy as np
+
+from embeddings.quantization import FullPrecisionVectors
+
+logger = logging.getLogger(__name__)
+
+VERSION_FILE = "CURRENT"
+LOCK_FILE = ".publish.lock"
+SNAPSHOT_PREFIX = "snapshot-"
+INDEX_FILE = "index.faiss"
+DOCUMENTS_FILE = "documents.pkl"
+SOURCE_IDS_FILE = "source_ids.pkl"
+MANIFEST_FILE = "manifest.json"
+VECTORS_FILE = "vectors.npy"
+VECTOR_IDS_FILE = "vector_ids.npy"
+
+# IO_FLAG_MMAP_IFC maps flat vector storage straight from the file; older faiss builds only
+# know IO_FLAG_MMAP, which still avoids the copy for the index types that support it.
+MMAP_READ_FLAGS = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+
+
+def snapshot_path(snapshot_dir: str, version: int) -> str:
+    return os.path.join(snapshot_dir, f"{SNAPSHOT_PREFIX}{version:06d}")
+
+
+def read_current_version(snapshot_dir: str) -> Optional[int]:
+    """The published version number, or None if nothing has been published yet."""
+    try:
+        with open(os.path.join(snapshot_dir, VERSION_FILE), 'r', encoding='utf-8') as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def _published_versions(snapshot_dir: str):
+    versions = []
+    for name in os.listdir(snapshot_dir):
+        if name.startswith(SNAPSHOT_PREFIX) and name[len(SNAPSHOT_PREFIX):].isdigit():
+            versions.append(int(name[len(SNAPSHOT_PREFIX):]))
+    return sorted(versions)
+
+
+def _fsync_file(path: str):
+    with open(path, 'rb') as f:
+        os.fsync(f.fileno())
+
+
+def publish_snapshot(faiss_index, documents, metadata: Dict[str, Any], snapshot_dir: str, keep: int = 3,
+                     full_vectors: Optional[FullPrecisionVectors] = None,
+                     source_id_map: Optional[Dict[str, int]] = None) -> int:
+    """
+    Writes a new snapshot version and makes it the current one. Returns its version number.
+    Concurrent publishers are serialised by a lock file, so there is always a single writer.
+    `full_vectors` are the exact vectors behind a compressed index; `source_id_map` is the
+    store's lookup table, which also holds the aliases that no document's source_item_id names.
+    """
+    os.makedirs(snapshot_dir, exist_ok=True)
+    with open(os.path.join(snapshot_dir, LOCK_FILE), 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            versions = _published_versions(snapshot_dir)
+            version = max(versions + [read_current_version(snapshot_dir) or 0]) + 1
+            final_dir = snapshot_path(snapshot_dir, version)
+            tmp_dir = f"{final_dir}.tmp-{os.getpid()}"
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            os.makedirs(tmp_dir)
+
+            faiss.write_index(faiss_index, os.path.join(tmp_dir, INDEX_FILE))
+            slim_documents = [{key: value for key, value in doc.items() if key != 'embedding'} for doc in documents]
+            with open(os.path.join(tmp_dir, DOCUMENTS_FILE), 'wb') as f:
+                pickle.dump(slim_documents, f, protocol=pickle.HIGHEST_PROTOCOL)
+            manifest = {**metadata, "version": version, "documents": len(documents),
+                        "vectors": int(faiss_index.ntotal), "published_at": time.time()}
+            with open(os.path.join(tmp_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+                json.dump(manifest, f)
+            written = [INDEX_FILE, DOCUMENTS_FILE, MANIFEST_FILE]
+            if source_id_map is not None:
+                with open(os.path.join(tmp_dir, SOURCE_IDS_FILE), 'wb') as f:
+                    pickle.dump(source_id_map, f, protocol=pickle.HIGHEST_PROTOCOL)
+                written.append(SOURCE_IDS_FILE)
+            if full_vectors is not None:
+                full_vectors.write(os.path.join(tmp_dir, VECTORS_FILE))
+                np.save(os.path.join(tmp_dir, VECTOR_IDS_FILE), full_vectors.ids)
+                written += [VECTORS_FILE, VECTOR_IDS_FILE]
+            for name in written:
+                _fsync_file(os.path.join(tmp_dir, name))
+            os.rename(tmp_dir, final_dir)
+
+            version_tmp = os.path.join(snapshot_dir, f"{VERSION_FILE}.tmp")
+            with open(version_tmp, 'w', encoding='utf-8') as f:
+                f.write(str(version))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(version_tmp, os.path.join(snapshot_dir, VERSION_FILE))
+
+            # Readers still mapping a pruned version keep working; the files go once they let go.
+            for old_version in _published_versions(snapshot_dir)[:-keep]:
+                shutil.rmtree(snapshot_path(snapshot_dir, old_version), ignore_errors=True)
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    logger.info(f"VectorSnapshot: Published version {version} ({len(documents)} documents) to {snapshot_dir}.")
+    return version
+
+
+def load_snapshot(snapshot_dir: str, version: int) -> Dict[str, Any]:
+    """Opens a published version read-only. The index is memory-mapped rather than copied."""
+    path = snapshot_path(snapshot_dir, version)
+    faiss_index = faiss.read_index(os.path.join(path, INDEX_FILE), MMAP_READ_FLAGS)
+    with open(os.path.join(path, DOCUMENTS_FILE), 'rb') as f:
+        documents = pickle.load(f)
+    with open(os.path.join(path, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    # Snapshots published before the map was stored have none; the caller rebuilds it from the documents.
+    source_id_map = None
+    if os.path.exists(os.path.join(path, SOURCE_IDS_FILE)):
+        with open(os.path.join(path, SOURCE_IDS_FILE), 'rb') as f:
+            source_id_map = pickle.load(f)
+    full_vectors = None
+    if os.path.exists(os.path.join(path, VECTORS_FILE)):
+        full_vectors = FullPrecisionVectors.open(os.path.join(path, VECTORS_FILE), np.load(os.path.join(path, VECTOR_IDS_FILE)))
+    return {"faiss_index": faiss_index, "documents": documents, "manifest": manifest, "full_vectors": full_vectors,
+            "source_id_map": source_id_map}
@@ -5,147 +5,676 @@ import gzip
 import os
 import faiss
 import logging
-from typing import List, Dict, Optional, Any
+import threading
+import time
+from typing import List, Dict, Optional, Any, Callable, Tuple
+
+from config import Config
+from embeddings.metadata_index import MetadataBitmaps, bits_to_bytes
+from embeddings.quantization import FullPrecisionVectors, index_description, rerank, search_parameters, stack_vectors, train_index
+from embeddings import vector_snapshot
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Concurrent requests each search with a single query vector. Letting FAISS fan every one
+# of them out over OpenMP threads only oversubscribes the cores, so it is capped here.
+if Config.FAISS_OMP_THREADS > 0:
+    faiss.omp_set_num_threads(Config.FAISS_OMP_THREADS)
+
+
+class _StoreView:
+    """
+    One published, immutable state of the store. Nothing in it is modified after it is
+    published; writers build the next view and swap the reference, so a search that
+    picked up this view keeps a consistent index and document set to the end.
+
+    The vectors are split into segments (FAISS indexes searched one after another) so
+    that publishing a batch of new documents does not copy the vectors already indexed.
+    `bitmaps` indexes the documents' metadata for filtered searches.
+
+    With compressed storage, `compressed` is a quantized index (built from the FAISS
+    description `codec`) holding most vectors, and `full_vectors` their exact values for
+    re-ranking; those documents carry no 'embedding' of their own. Vectors added since
+    the last save still live in exact segments until the next one compresses them.
+    """
+    __slots__ = ("segments", "documents", "documents_by_id", "source_id_map", "dimension", "next_id", "ntotal", "bitmaps",
+                 "compressed", "codec", "full_vectors")
+
+    def __init__(self, segments: Tuple[Any, ...] = (), documents: Optional[List[Dict]] = None,
+                 documents_by_id: Optional[Dict[int, Dict]] = None, source_id_map: Optional[Dict[str, int]] = None,
+                 dimension: Optional[int] = None, next_id: int = 0, bitmaps: Optional[MetadataBitmaps] = None,
+                 compressed: Optional[Any] = None, codec: Optional[str] = None,
+                 full_vectors: Optional[FullPrecisionVectors] = None):
+        self.segments = segments
+        self.documents = documents if documents is not None else []
+        self.documents_by_id = documents_by_id if documents_by_id is not None else {doc['id']: doc for doc in self.documents}
+        self.source_id_map = source_id_map if source_id_map is not None else {}
+        self.dimension = dimension
+        self.next_id = next_id
+        self.ntotal = sum(segment.ntotal for segment in segments) + (compressed.ntotal if compressed is not None else 0)
+        self.bitmaps = bitmaps if bitmaps is not None else MetadataBitmaps.build(Config.VECTOR_FILTER_INDEX_FIELDS, self.documents)
+        self.compressed = compressed
+        self.codec = codec
+        self.full_vectors = full_vectors
+
+    def replace(self, **changes) -> "_StoreView":
+        """A new view with `changes` applied to this one's fields."""
+        fields = {name: getattr(self, name) for name in ("segments", "documents", "documents_by_id", "source_id_map",
+                                                         "dimension", "next_id", "bitmaps", "compressed", "codec", "full_vectors")}
+        fields.update(changes)
+        return _StoreView(**fields)
+
+    def embedding_of(self, doc: Dict) -> Optional[List[float]]:
+        """A document's embedding, from the document itself or from the full-precision vectors."""
+        if doc.get('embedding') is not None:
+            return doc['embedding']
+        if self.full_vectors is not None and self.full_vectors.contains(doc['id']):
+            return self.full_vectors.get(np.array([doc['id']], dtype=np.int64))[0].tolist()
+        return None
+
+
+class SearchHit:
+    """
+    One search result: a document id and its L2 distance to the query (lower is closer).
+    The document itself is only looked up when `document` is read, from the same view the
+    search ran against, so batch callers that only need ids never copy documents.
+    """
+    __slots__ = ("id", "distance", "_documents_by_id")
+
+    def __init__(self, doc_id: int, distance: float, documents_by_id: Dict[int, Dict]):
+        self.id = doc_id
+        self.distance = distance
+        self._documents_by_id = documents_by_id
+
+    @property
+    def document(self) -> Optional[Dict]:
+        return self._documents_by_id.get(self.id)
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        document = self._documents_by_id.get(self.id)
+        return (document.get('metadata') or {}) if document else {}
+
+
+def _new_segment(dimension: int):
+    return faiss.IndexIDMap(faiss.IndexFlatL2(dimension))
+
+
+def _segment_vectors(segment) -> Tuple[np.ndarray, np.ndarray]:
+    """The (ids, vectors) of an exact segment."""
+    return faiss.vector_to_array(segment.id_map).astype(np.int64), segment.index.reconstruct_n(0, segment.ntotal)
+
+
+def _merge_segments(segments: List[Any], dimension: int):
+    """Copies the vectors of `segments` into one new segment; the inputs are left untouched."""
+    merged = _new_segment(dimension)
+    for segment in segments:
+        if segment.ntotal == 0:
+            continue
+        ids, vectors = _segment_vectors(segment)
+        merged.add_with_ids(vectors, ids)
+    return merged
+
+
 class VectorStore:
     """
     A high-performance in-memory vector store using Faiss for efficient similarity search.
+
+    Searches never take a lock: they read the current immutable _StoreView. Writers are
+    serialised by a lock and stage new documents, which are published as a new view in
+    batches (VECTOR_STORE_PUBLISH_BATCH documents, or VECTOR_STORE_PUBLISH_INTERVAL_SECONDS
+    after the oldest staged one; flush() and save() publish at once). A staged document is
+    already known to get_document_by_source_id, so ingestion does not embed it twice, but
+    only searchable and reported to change listeners once published. Aliases (duplicates
+    merged into an existing document by add_alias) are staged and published the same way.
     """
     def __init__(self, db_path: str):
         self.db_path = db_path
         self.index_path = db_path.replace('.pkl.gz', '.faiss')
-        self.documents: List[Dict] = []
-        self.faiss_index: Optional[faiss.Index] = None
-        self.dimension: Optional[int] = None
-        self.next_id = 0
-        self.source_id_map: Dict[str, int] = {}
+        self._view = _StoreView()
+        self._write_lock = threading.RLock()
+        self._staged_documents: List[Dict] = []
+        self._staged_source_ids: Dict[str, Dict] = {}
+        self._staged_since: Optional[float] = None
+        self._staged_aliases: List[Tuple[str, int, Dict]] = []
+        self._next_id = 0
+        self.publish_batch = Config.VECTOR_STORE_PUBLISH_BATCH
+        self.publish_interval_seconds = Config.VECTOR_STORE_PUBLISH_INTERVAL_SECONDS
+        self.vectors_path = db_path.replace('.pkl.gz', '.vectors.npy')
+        # Compressed storage (see embeddings/quantization.py); applied when the store is consolidated on save.
+        self.index_mode = Config.VECTOR_INDEX_MODE
+        self.pca_dimension = Config.VECTOR_PCA_DIMENSION
+        self.pq_subquantizers = Config.VECTOR_PQ_SUBQUANTIZERS
+        self.rerank_factor = max(1, Config.VECTOR_RERANK_FACTOR)
+        self.quantization_min_vectors = Config.VECTOR_QUANTIZATION_MIN_VECTORS
+        self.quantization_train_size = Config.VECTOR_QUANTIZATION_TRAIN_SIZE
+        self._change_listeners: List[Callable[[str, List[Dict]], None]] = []
+        # True once documents were added since the last save or load, so shutdown only writes when needed.
+        self.has_unsaved_changes = False
+        # In shared mode the store serves a published, memory-mapped snapshot and cannot be modified.
+        self.snapshot_dir = Config.VECTOR_SNAPSHOT_DIR
+        self.read_only = False
+        self.snapshot_version: Optional[int] = None
+        self._snapshot_stop = threading.Event()
+        self._snapshot_thread: Optional[threading.Thread] = None
         logger.info(f"VectorStore: Initializing with DB path: {self.db_path} and Faiss index: {self.index_path}")
 
-    def _initialize_faiss_index(self, dimension: int):
-        """Initializes a new Faiss index."""
-        if self.dimension and self.dimension != dimension:
-            logger.warning(f"VectorStore: Dimension mismatch. Current: {self.dimension}, New: {dimension}. Re-initializing.")
-        self.dimension = dimension
-        self.faiss_index = faiss.IndexIDMap(faiss.IndexFlatL2(self.dimension))
-        logger.info(f"VectorStore: Initialized new Faiss index with dimension {self.dimension}.")
+    # The published state. These are read-only views: writes go through add_document().
 
-    def add_document(self, content: str, embedding: List[float], metadata: Optional[Dict] = None, source_item_id: Optional[str] = None):
-        if source_item_id and self.get_document_by_source_id(source_item_id):
-            logger.debug(f"Document with source_item_id '{source_item_id}' already exists. Skipping.")
-            return
+    @property
+    def documents(self) -> List[Dict]:
+        return self._view.documents
 
-        doc_id = self.next_id
-        embedding_np = np.array([embedding], dtype=np.float32)
+    @property
+    def source_id_map(self) -> Dict[str, int]:
+        return self._view.source_id_map
 
-        if self.faiss_index is None:
-            self._initialize_faiss_index(embedding_np.shape[1])
+    @property
+    def dimension(self) -> Optional[int]:
+        return self._view.dimension
 
-        if self.dimension != embedding_np.shape[1]:
-            logger.error(f"Dimension mismatch: Expected {self.dimension}, got {embedding_np.shape[1]}. Skipping document.")
-            return
+    @property
+    def next_id(self) -> int:
+        return self._next_id
+
+    def add_change_listener(self, listener: Callable[[str, List[Dict]], None]):
+        """
+        Registers a callback for derived indexes. It is called with ("added", [new documents])
+        after each published batch, and with ("reset", all documents) after a load or clear.
+        """
+        self._change_listeners.append(listener)
+
+    def _notify_listeners(self, event: str, documents: List[Dict]):
+        for listener in self._change_listeners:
+            try:
+                listener(event, documents)
+            except Exception as e:
+                logger.error(f"VectorStore: Change listener failed on '{event}': {e}", exc_info=True)
+
+    def add_document(self, content: str, embedding: List[float], metadata: Optional[Dict] = None,
+                     source_item_id: Optional[str] = None) -> Optional[int]:
+        """Stages a new document and returns its id, or None if it was not added."""
+        if self.read_only:
+            logger.error("VectorStore: Cannot add documents to a read-only snapshot. Run the ingestion job to publish a new one.")
+            return None
+        with self._write_lock:
+            if source_item_id and self.get_document_by_source_id(source_item_id):
+                logger.debug(f"Document with source_item_id '{source_item_id}' already exists. Skipping.")
+                return None
+
+            dimension = self._view.dimension or (len(self._staged_documents[0]["embedding"]) if self._staged_documents else len(embedding))
+            if len(embedding) != dimension:
+                logger.error(f"Dimension mismatch: Expected {dimension}, got {len(embedding)}. Skipping document.")
+                return None
+
+            document = {"id": self._next_id, "content": content, "embedding": embedding, "metadata": metadata or {}, "source_item_id": source_item_id}
+            self._staged_documents.append(document)
+            if source_item_id:
+                self._staged_source_ids[source_item_id] = document
+            self._next_id += 1
+            self._mark_staged()
+            return document["id"]
+
+    def add_alias(self, source_item_id: str, doc_id: int, metadata: Optional[Dict] = None) -> bool:
+        """
+        Records `source_item_id` as another name for document `doc_id`, for a duplicate that
+        was not embedded. Lookups by the alias then find the canonical document, which lists
+        it under metadata['aliases'] and gains any metadata keys it lacked from `metadata`
+        (filter-indexed fields excepted). Returns False if `doc_id` is unknown.
+        """
+        if self.read_only:
+            logger.error("VectorStore: Cannot add aliases to a read-only snapshot.")
+            return False
+        with self._write_lock:
+            if self.get_document_by_source_id(source_item_id):
+                return True
+            document = self._view.documents_by_id.get(doc_id)
+            if document is None:
+                document = next((doc for doc in self._staged_documents if doc["id"] == doc_id), None)
+            if document is None:
+                logger.warning(f"VectorStore: Cannot alias '{source_item_id}' to unknown document {doc_id}.")
+                return False
+            self._staged_aliases.append((source_item_id, doc_id, metadata or {}))
+            self._staged_source_ids[source_item_id] = document
+            self._mark_staged()
+            return True
+
+    def _mark_staged(self):
+        if self._staged_since is None:
+            self._staged_since = time.monotonic()
+        self.has_unsaved_changes = True
+        if (len(self._staged_documents) + len(self._staged_aliases) >= self.publish_batch
+                or time.monotonic() - self._staged_since >= self.publish_interval_seconds):
+            self.flush()
 
-        self.faiss_index.add_with_ids(embedding_np, np.array([doc_id]))
-        document = {"id": doc_id, "content": content, "embedding": embedding, "metadata": metadata or {}, "source_item_id": source_item_id}
-        self.documents.append(document)
+    def _reset_staging(self):
+        self._staged_documents, self._staged_source_ids, self._staged_since = [], {}, None
+        self._staged_aliases = []
 
-        if source_item_id:
-            self.source_id_map[source_item_id] = doc_id
-        self.next_id += 1
+    def flush(self):
+        """Publishes the staged documents and aliases as a new view, making them searchable."""
+        with self._write_lock:
+            staged, aliases = self._staged_documents, self._staged_aliases
+            if not staged and not aliases:
+                return
+            view = self._view
+            segments = list(view.segments)
+            dimension = view.dimension
+            if staged:
+                dimension = dimension or len(staged[0]["embedding"])
+                segment = _new_segment(dimension)
+                segment.add_with_ids(np.array([doc["embedding"] for doc in staged], dtype=np.float32),
+                                     np.array([doc["id"] for doc in staged], dtype=np.int64))
+                # Equal-sized neighbours are merged (like a binary counter), so there are only
+                # O(log n) segments and each vector is copied O(log n) times over a long ingestion.
+                segments.append(segment)
+                while len(segments) > 1 and segments[-2].ntotal <= segments[-1].ntotal:
+                    segments[-2:] = [_merge_segments(segments[-2:], dimension)]
+
+            documents = view.documents + staged
+            documents_by_id = dict(view.documents_by_id)
+            source_id_map = dict(view.source_id_map)
+            for doc in staged:
+                documents_by_id[doc["id"]] = doc
+                if doc["source_item_id"]:
+                    source_id_map[doc["source_item_id"]] = doc["id"]
+            if aliases:
+                documents = self._merge_aliases(aliases, documents, documents_by_id, source_id_map)
+            self._view = view.replace(segments=tuple(segments), documents=documents, documents_by_id=documents_by_id,
+                                      source_id_map=source_id_map, dimension=dimension, next_id=self._next_id,
+                                      bitmaps=view.bitmaps.extended(staged))
+            self._reset_staging()
+            self._notify_listeners("added", staged)
+
+    @staticmethod
+    def _merge_aliases(aliases: List[Tuple[str, int, Dict]], documents: List[Dict], documents_by_id: Dict[int, Dict],
+                       source_id_map: Dict[str, int]) -> List[Dict]:
+        """Applies staged aliases to new copies of their canonical documents; returns the new document list."""
+        merged: Dict[int, Dict] = {}
+        for source_item_id, doc_id, metadata in aliases:
+            document = merged.get(doc_id) or documents_by_id.get(doc_id)
+            if document is None:
+                continue
+            new_metadata = dict(document.get("metadata") or {})
+            for key, value in metadata.items():
+                if key not in new_metadata and key not in Config.VECTOR_FILTER_INDEX_FIELDS:
+                    new_metadata[key] = value
+            new_metadata["aliases"] = sorted(set(new_metadata.get("aliases", [])) | {source_item_id})
+            merged[doc_id] = {**document, "metadata": new_metadata}
+            source_id_map[source_item_id] = doc_id
+        documents_by_id.update(merged)
+        return [merged.get(doc["id"], doc) for doc in documents]
+
+    def _consolidate(self) -> Optional[Any]:
+        """
+        Publishes any staged documents and merges all vectors into one index, which it
+        returns. With compressed storage configured and enough vectors, that index is the
+        compressed one; otherwise it is a single exact segment.
+        """
+        with self._write_lock:
+            self.flush()
+            view = self._view
+            if view.ntotal == 0:
+                return None
+            codec = index_description(self.index_mode, view.dimension, self.pca_dimension, self.pq_subquantizers)
+            if codec and view.ntotal >= self.quantization_min_vectors:
+                if view.segments or view.codec != codec:
+                    view = self._compress(view, codec)
+                    self._view = view
+                return view.compressed
+            if view.compressed is not None:
+                view = self._decompress(view)
+                self._view = view
+            if len(view.segments) > 1:
+                view = view.replace(segments=(_merge_segments(list(view.segments), view.dimension),))
+                self._view = view
+            return view.segments[0]
+
+    def _compress(self, view: _StoreView, codec: str) -> _StoreView:
+        """A view with every vector in one `codec` index, and the exact vectors in full_vectors."""
+        new_ids, new_vectors = stack_vectors([_segment_vectors(segment) for segment in view.segments if segment.ntotal], view.dimension)
+        full_vectors = view.full_vectors if view.full_vectors is not None else FullPrecisionVectors.empty(view.dimension)
+        started_at = time.perf_counter()
+        if view.compressed is not None and view.codec == codec:
+            # Same codec: keep the trained quantizer and the existing codes, only encode the new vectors.
+            index = faiss.clone_index(view.compressed)
+        else:
+            training = full_vectors.sample(self.quantization_train_size)
+            if len(new_vectors):
+                training = np.concatenate([training, new_vectors[:max(0, self.quantization_train_size - len(training))]])
+            index = train_index(codec, view.dimension, training)
+            for ids, vectors in full_vectors.batches():
+                index.add_with_ids(vectors, ids)
+        if len(new_ids):
+            index.add_with_ids(new_vectors, new_ids)
+            full_vectors = full_vectors.extended(new_ids, new_vectors)
+        logger.info(f"VectorStore: Compressed {index.ntotal} vectors as '{codec}' in {time.perf_counter() - started_at:.2f}s.")
+
+        # The exact vectors now live in full_vectors; dropping the per-document copies is most of the saving.
+        documents = [{key: value for key, value in doc.items() if key != 'embedding'} if 'embedding' in doc else doc
+                     for doc in view.documents]
+        return view.replace(segments=(), documents=documents, documents_by_id={doc['id']: doc for doc in documents},
+                            compressed=index, codec=codec, full_vectors=full_vectors)
+
+    def _decompress(self, view: _StoreView) -> _StoreView:
+        """A view back on exact segments only, for when compressed storage was switched off."""
+        segment = _new_segment(view.dimension)
+        for ids, vectors in view.full_vectors.batches():
+            segment.add_with_ids(vectors, ids)
+        documents = [doc if doc.get('embedding') is not None else {**doc, 'embedding': view.embedding_of(doc)}
+                     for doc in view.documents]
+        logger.info(f"VectorStore: Restored {segment.ntotal} compressed vectors to exact storage.")
+        return view.replace(segments=view.segments + (segment,), documents=documents,
+                            documents_by_id={doc['id']: doc for doc in documents},
+                            compressed=None, codec=None, full_vectors=None)
 
     def get_document_by_source_id(self, source_item_id: str) -> Optional[Dict]:
-        """Efficiently retrieves a document by its unique source_item_id using a map."""
-        doc_id = self.source_id_map.get(source_item_id)
+        """Efficiently retrieves a document by its unique source_item_id, including staged ones."""
+        view = self._view
+        doc_id = view.source_id_map.get(source_item_id)
         if doc_id is not None:
-            # This is slightly inefficient but safer than assuming list index equals doc_id
-            for doc in self.documents:
-                if doc['id'] == doc_id:
-                    return doc
-        return None
+            return view.documents_by_id.get(doc_id)
+        return self._staged_source_ids.get(source_item_id)
+
+    def get_document_by_id(self, doc_id: int) -> Optional[Dict]:
+        return self._view.documents_by_id.get(doc_id)
+
+    def get_embedding(self, doc_id: int) -> Optional[List[float]]:
+        """A published document's embedding, wherever it is stored."""
+        view = self._view
+        document = view.documents_by_id.get(doc_id)
+        return view.embedding_of(document) if document else None
 
-    def similarity_search(self, query_embedding: List[float], top_k: int = 5) -> List[Dict[str, Any]]:
-        if self.faiss_index is None or self.faiss_index.ntotal == 0:
-            return []
+    def similarity_search(self, query_embedding: List[float], top_k: int = 5, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Copies of the `top_k` nearest documents (embeddings included), each with its 'distance'."""
+        view = self._view
+        hits = self._search_view(view, np.array([query_embedding], dtype=np.float32), top_k, filters)[0]
+        results = []
+        for hit in hits:
+            doc_copy = hit.document.copy()
+            if 'embedding' not in doc_copy and view.full_vectors is not None:
+                doc_copy['embedding'] = view.embedding_of(doc_copy)
+            doc_copy['distance'] = hit.distance
+            results.append(doc_copy)
+        return results
+
+    def search_batch(self, queries: np.ndarray, top_k: int = 5, filters: Optional[Dict[str, Any]] = None) -> List[List[SearchHit]]:
+        """
+        Searches an (n, d) float32 array of queries in one FAISS call per index segment and
+        returns, for each query, up to `top_k` SearchHits nearest first. `filters` applies
+        to every query.
+        """
+        # One read of the view: index segments and documents always come from the same version.
+        return self._search_view(self._view, queries, top_k, filters)
 
-        query_vector = np.array([query_embedding], dtype=np.float32)
-        distances, indices = self.faiss_index.search(query_vector, top_k)
+    def _search_view(self, view: _StoreView, queries: np.ndarray, top_k: int, filters: Optional[Dict[str, Any]]) -> List[List[SearchHit]]:
+        queries = np.ascontiguousarray(queries, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries.reshape(1, -1)
+        if view.ntotal == 0 or len(queries) == 0:
+            return [[] for _ in range(len(queries))]
+        if queries.shape[1] != view.dimension:
+            raise ValueError(f"Query dimension {queries.shape[1]} does not match the store's {view.dimension}.")
 
+        # Filters are resolved to the set of matching ids with the metadata bitmaps and handed
+        # to FAISS as an ID selector, so the top_k is exact among the matching documents
+        # rather than whatever survives post-filtering an over-fetched candidate list.
+        fetch_k, params, selector = top_k, None, None
+        if filters:
+            selected = view.bitmaps.select(filters, view.documents)
+            if not selected:
+                return [[] for _ in range(len(queries))]
+            fetch_k = min(top_k, selected.bit_count())
+            # FAISS only borrows the bitmap and the selector; the locals keep them alive.
+            bitmap = bits_to_bytes(selected)
+            selector = faiss.IDSelectorBitmap(len(bitmap), faiss.swig_ptr(bitmap))
+            params = faiss.SearchParameters(sel=selector)
+        found = [segment.search(queries, min(fetch_k, segment.ntotal), params=params)
+                 for segment in view.segments if segment.ntotal]
+        if view.compressed is not None:
+            # The compressed index only nominates candidates; their exact vectors decide the ranking.
+            candidates_k = min(view.compressed.ntotal, fetch_k * self.rerank_factor)
+            _, candidate_ids = view.compressed.search(queries, candidates_k, params=search_parameters(view.compressed, selector))
+            found.append((rerank(queries, candidate_ids, view.full_vectors), candidate_ids))
+        if len(found) == 1 and view.compressed is None:
+            distances, indices = found[0]
+        else:
+            distances = np.hstack([d for d, _ in found])
+            indices = np.hstack([i for _, i in found])
+            order = np.argsort(distances, axis=1, kind='stable')[:, :fetch_k]
+            distances, indices = np.take_along_axis(distances, order, axis=1), np.take_along_axis(indices, order, axis=1)
+
+        documents_by_id = view.documents_by_id
         results = []
-        doc_map = {doc['id']: doc for doc in self.documents}
-        for i, doc_id in enumerate(indices[0]):
-            if doc_id != -1: # Faiss returns -1 for no result
-                doc = doc_map.get(int(doc_id))
-                if doc:
-                    doc_copy = doc.copy()
-                    doc_copy['distance'] = float(distances[0][i])
-                    results.append(doc_copy)
+        for row_distances, row_ids in zip(distances.tolist(), indices.tolist()):
+            hits = []
+            for distance, doc_id in zip(row_distances, row_ids):
+                if doc_id == -1: # Faiss returns -1 for no result
+                    continue
+                if doc_id in documents_by_id:
+                    hits.append(SearchHit(doc_id, distance, documents_by_id))
+            results.append(hits)
         return results
 
     def save(self):
-        """Saves the Faiss index and the document data (including embeddings) to disk."""
-        logger.info(f"Attempting to save vector store to {self.db_path}")
-        if self.faiss_index is None:
-            logger.warning("Faiss index is not initialized. Nothing to save.")
+        """
+        Saves the Faiss index and the document data (including embeddings) to disk. With
+        compressed storage, the exact vectors go to a separate .vectors.npy file instead of
+        the documents, and are memory-mapped from it from then on.
+        """
+        if self.read_only:
+            logger.warning("VectorStore: Serving a read-only snapshot. Nothing to save.")
             return
-        try:
-            faiss.write_index(self.faiss_index, self.index_path)
-            # We save the full documents including their embeddings for reliability.
-            data_to_save = {
-                "documents": self.documents,
-                "next_id": self.next_id,
-                "dimension": self.dimension,
-                "source_id_map": self.source_id_map
-            }
-            with gzip.open(self.db_path, 'wb') as f:
-                pickle.dump(data_to_save, f)
-            logger.info(f"Successfully saved {len(self.documents)} documents and Faiss index with {self.faiss_index.ntotal} vectors.")
-        except Exception as e:
-            logger.error(f"Failed to save vector store: {e}", exc_info=True)
+        logger.info(f"Attempting to save vector store to {self.db_path}")
+        with self._write_lock:
+            faiss_index = self._consolidate()
+            if faiss_index is None:
+                logger.warning("Faiss index is not initialized. Nothing to save.")
+                return
+            view = self._view
+            try:
+                # Both files are written next to their targets and swapped in with os.replace, so a
+                # concurrent reader (or a crash mid-save) never sees a half-written store.
+                faiss.write_index(faiss_index, self.index_path + '.tmp')
+                if view.compressed is not None:
+                    view.full_vectors.write(self.vectors_path + '.tmp')
+                # We save the full documents including their embeddings for reliability.
+                data_to_save = {
+                    "documents": view.documents,
+                    "next_id": view.next_id,
+                    "dimension": view.dimension,
+                    "source_id_map": view.source_id_map,
+                    "codec": view.codec,
+                    "full_vector_ids": view.full_vectors.ids if view.compressed is not None else None
+                }
+                with gzip.open(self.db_path + '.tmp', 'wb') as f:
+                    pickle.dump(data_to_save, f)
+                os.replace(self.index_path + '.tmp', self.index_path)
+                if view.compressed is not None:
+                    os.replace(self.vectors_path + '.tmp', self.vectors_path)
+                os.replace(self.db_path + '.tmp', self.db_path)
+                if view.compressed is not None:
+                    # Vectors compressed since the last save were held in memory; map them from the file instead.
+                    self._view = view.replace(full_vectors=FullPrecisionVectors.open(self.vectors_path, view.full_vectors.ids))
+                elif os.path.exists(self.vectors_path):
+                    os.remove(self.vectors_path)
+                self.has_unsaved_changes = False
+                logger.info(f"Successfully saved {len(view.documents)} documents and Faiss index with {faiss_index.ntotal} vectors.")
+            except Exception as e:
+                logger.error(f"Failed to save vector store: {e}", exc_info=True)
+                return
+        if Config.VECTOR_SNAPSHOT_PUBLISH_ON_SAVE:
+            self.publish_snapshot()
 
     def load(self):
         """Loads the Faiss index and document data from disk."""
+        self.stop_snapshot_watcher()
+        self.read_only = False
+        self.snapshot_version = None
         if not os.path.exists(self.db_path) or not os.path.exists(self.index_path):
             logger.warning("Database or Faiss index file not found. Starting fresh.")
             self.clear()
             return
         try:
-            self.faiss_index = faiss.read_index(self.index_path)
+            faiss_index = faiss.read_index(self.index_path)
             with gzip.open(self.db_path, 'rb') as f:
                 data = pickle.load(f)
-            self.documents = data.get("documents", [])
-            self.next_id = data.get("next_id", len(self.documents))
-            self.dimension = data.get("dimension") or self.faiss_index.d
-            self.source_id_map = data.get("source_id_map", {})
-            # Verification step
-            if self.documents and 'embedding' not in self.documents[0]:
+            documents = data.get("documents", [])
+            codec = data.get("codec")
+            # Verification step (compressed stores keep the embeddings in the .vectors.npy file)
+            if documents and not codec and 'embedding' not in documents[0]:
                 logger.error("Loaded documents are missing embeddings! The pickle file might be from an old version. Clearing and starting fresh to prevent issues.")
                 self.clear()
                 return
-            logger.info(f"Successfully loaded {self.faiss_index.ntotal} vectors and {len(self.documents)} documents.")
+            with self._write_lock:
+                next_id = data.get("next_id", len(documents))
+                dimension = data.get("dimension") or faiss_index.d
+                if codec:
+                    self._view = _StoreView((), documents, None, data.get("source_id_map", {}), dimension, next_id,
+                                            compressed=faiss_index, codec=codec,
+                                            full_vectors=FullPrecisionVectors.open(self.vectors_path, data["full_vector_ids"]))
+                else:
+                    self._view = _StoreView((faiss_index,), documents, None, data.get("source_id_map", {}), dimension, next_id)
+                self._next_id = next_id
+                self._reset_staging()
+                self.has_unsaved_changes = False
+                logger.info(f"Successfully loaded {faiss_index.ntotal} vectors and {len(documents)} documents.")
+                self._notify_listeners("reset", documents)
         except Exception as e:
             logger.error(f"Failed to load vector store: {e}. Starting fresh.", exc_info=True)
             self.clear()
 
     def get_all_documents_with_embeddings(self) -> List[Dict[str, Any]]:
-        return [doc for doc in self.documents if 'embedding' in doc and doc['embedding'] is not None]
+        view = self._view
+        if view.full_vectors is None:
+            return [doc for doc in view.documents if 'embedding' in doc and doc['embedding'] is not None]
+        # Compressed documents get copies with their embedding read back from the full-precision vectors.
+        documents = []
+        for doc in view.documents:
+            embedding = view.embedding_of(doc)
+            if embedding is not None:
+                documents.append(doc if doc.get('embedding') is not None else {**doc, 'embedding': embedding})
+        return documents
 
     def clear(self):
         """Clears the in-memory store and deletes the corresponding files."""
-        self.documents = []
-        self.faiss_index = None
-        self.dimension = None
-        self.next_id = 0
-        self.source_id_map = {}
-        if os.path.exists(self.index_path):
-            try:
-                os.remove(self.index_path)
-            except OSError as e:
-                logger.error(f"Error removing Faiss index file: {e}")
-        if os.path.exists(self.db_path):
-            try:
-                os.remove(self.db_path)
-            except OSError as e:
-                logger.error(f"Error removing DB pickle file: {e}")
-        logger.info("Cleared all documents and Faiss index.")
+        if self.read_only:
+            logger.error("VectorStore: Cannot clear a read-only snapshot.")
+            return
+        with self._write_lock:
+            # Searches already running finish against the view they started with.
+            self._view = _StoreView()
+            self._next_id = 0
+            self._reset_staging()
+            self.has_unsaved_changes = False
+            if os.path.exists(self.index_path):
+                try:
+                    os.remove(self.index_path)
+                except OSError as e:
+                    logger.error(f"Error removing Faiss index file: {e}")
+            if os.path.exists(self.db_path):
+                try:
+                    os.remove(self.db_path)
+                except OSError as e:
+                    logger.error(f"Error removing DB pickle file: {e}")
+            if os.path.exists(self.vectors_path):
+                try:
+                    os.remove(self.vectors_path)
+                except OSError as e:
+                    logger.error(f"Error removing full-precision vectors file: {e}")
+            logger.info("Cleared all documents and Faiss index.")
+            self._notify_listeners("reset", [])
+
+    # --- Shared snapshots ---
+
+    def publish_snapshot(self) -> Optional[int]:
+        """Publishes the current contents as a new immutable snapshot for read-only workers."""
+        if self.read_only:
+            view = self._view
+            faiss_index = view.compressed if view.compressed is not None else (view.segments[0] if view.segments else None)
+        else:
+            faiss_index = self._consolidate()
+        if faiss_index is None:
+            logger.warning("VectorStore: Faiss index is not initialized. No snapshot to publish.")
+            return None
+        view = self._view
+        try:
+            return vector_snapshot.publish_snapshot(
+                faiss_index, view.documents, {"next_id": view.next_id, "dimension": view.dimension, "codec": view.codec},
+                self.snapshot_dir, keep=Config.VECTOR_SNAPSHOT_KEEP,
+                full_vectors=view.full_vectors if view.compressed is not None else None,
+                source_id_map=view.source_id_map
+            )
+        except Exception as e:
+            logger.error(f"VectorStore: Failed to publish snapshot: {e}", exc_info=True)
+            return None
+
+    def load_snapshot(self) -> bool:
+        """Switches to the published snapshot in read-only mode. Returns False if there is none."""
+        version = vector_snapshot.read_current_version(self.snapshot_dir)
+        if version is None:
+            return False
+        return self._swap_to_snapshot(version)
+
+    def refresh_snapshot(self) -> bool:
+        """Hot-swaps to a newer published snapshot, if there is one. Returns True if it swapped."""
+        version = vector_snapshot.read_current_version(self.snapshot_dir)
+        if version is None or version == self.snapshot_version:
+            return False
+        return self._swap_to_snapshot(version)
+
+    def _swap_to_snapshot(self, version: int) -> bool:
+        try:
+            snapshot = vector_snapshot.load_snapshot(self.snapshot_dir, version)
+        except Exception as e:
+            logger.error(f"VectorStore: Failed to load snapshot version {version}: {e}", exc_info=True)
+            return False
+        documents, manifest, faiss_index = snapshot["documents"], snapshot["manifest"], snapshot["faiss_index"]
+        with self._write_lock:
+            next_id = manifest.get("next_id", len(documents))
+            source_id_map = snapshot["source_id_map"]
+            if source_id_map is None:
+                source_id_map = self._source_id_map_from_documents(documents)
+            dimension = manifest.get("dimension") or faiss_index.d
+            if manifest.get("codec"):
+                self._view = _StoreView((), documents, None, source_id_map, dimension, next_id, compressed=faiss_index,
+                                        codec=manifest["codec"], full_vectors=snapshot["full_vectors"])
+            else:
+                self._view = _StoreView((faiss_index,), documents, None, source_id_map, dimension, next_id)
+            self._next_id = next_id
+            self.read_only = True
+            self.snapshot_version = version
+            self.has_unsaved_changes = False
+        logger.info(f"VectorStore: Serving snapshot version {version} ({len(documents)} documents, memory-mapped).")
+        self._notify_listeners("reset", documents)
+        return True
+
+    @staticmethod
+    def _source_id_map_from_documents(documents: List[Dict]) -> Dict[str, int]:
+        """Rebuilds the lookup table from the documents: their own source ids plus the aliases merged into them."""
+        source_id_map = {}
+        for doc in documents:
+            for alias in (doc.get('metadata') or {}).get('aliases', []):
+                source_id_map[alias] = doc['id']
+            if doc.get('source_item_id'):
+                source_id_map[doc['source_item_id']] = doc['id']
+        return source_id_map
+
+    def start_snapshot_watcher(self, interval_seconds: Optional[int] = None):
+        """Starts a daemon thread that picks up newly published snapshots. Safe to call more than once."""
+        if self._snapshot_thread and self._snapshot_thread.is_alive():
+            return
+        interval = interval_seconds or Config.VECTOR_SNAPSHOT_POLL_SECONDS
+        self._snapshot_stop.clear()
+
+        def watch_loop():
+            while not self._snapshot_stop.wait(interval):
+                self.refresh_snapshot()
+
+        self._snapshot_thread = threading.Thread(target=watch_loop, name="vector-snapshot-watcher", daemon=True)
+        self._snapshot_thread.start()
+        logger.info(f"VectorStore: Watching {self.snapshot_dir} for new snapshots (every {interval}s).")
+
+    def stop_snapshot_watcher(self):
+        self._snapshot_stop.set()
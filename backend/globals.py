@@ -1,29 +1,153 @@
 # backend/globals.py
 from embeddings.ollama_embedder import OllamaEmbedder
-from embeddings.vector_store import VectorStore
-from services.clustering_service import ClusteringService
-from services.data_embedding_service import DataEmbeddingService
-from services.anime_api_service import AnimeAPIService
-from controllers.anime_controller import AnimeController
+from embeddings.lexical_index import BM25Index
+from embeddings.dedup_index import DuplicateIndex
+from services.ollama_llm_service import OllamaLLMService
+from services.gemini_llm_service import GeminiLLMService
+from services.llm_router import LLMRouter
+from services.llm_scheduler import LLMScheduler
+from services.title_linker import TitleLinker
+from services.title_index_service import TitleIndex
+from services.retrieval_service import HybridRetriever
+from services.chat_session_service import ChatSessionStore
+from services.suggestion_service import FollowupSuggestionService
+from services.prompt_builder import ConversationSummaryCache, PromptBuilder
+from services.query_cache_service import QueryEmbeddingCache, SemanticResponseCache
+from services.startup_service import StartupTasks
+from services.job_service import JobRunner
+from utils.lazy_service import LazyService
 from config import Config
 
+# Services whose construction is slow (FAISS, BeautifulSoup and CloudScraper imports, network
+# calls) are LazyService proxies: they are built on first use, and their modules are only
+# imported then, so importing this module stays cheap and does not need Ollama to be up.
+
 # Initialize services and controllers in the correct order
 
 # 1. Core services that don't depend on others
-global_vector_store = VectorStore(db_path=Config.VECTOR_DB_PATH)
-global_ollama_embedder = OllamaEmbedder()
-global_anime_api_service = AnimeAPIService() # This is used by the controller
+global_startup_tasks = StartupTasks()
+# Ingestion runs as queued background jobs; the handlers are registered by DataController
+global_job_runner = JobRunner(
+    store_path=Config.JOB_STORE_PATH,
+    history_limit=Config.JOB_HISTORY_LIMIT,
+    poll_seconds=Config.JOB_POLL_INTERVAL_SECONDS,
+    update_interval_minutes=Config.EMBEDDING_UPDATE_INTERVAL_MINUTES
+)
+
+def _build_vector_store():
+    from embeddings.vector_store import VectorStore
+    vector_store = VectorStore(db_path=Config.VECTOR_DB_PATH)
+    # Derived indexes follow the store from the start, so they see its first load
+    global_lexical_index.attach(vector_store)
+    global_title_linker.attach(vector_store)
+    global_title_index.attach(vector_store)
+    global_duplicate_index.attach(vector_store)
+    return vector_store
+
+global_vector_store = LazyService("vector_store", _build_vector_store)
+global_ollama_embedder = OllamaEmbedder() # The model check runs as a background start-up task
+global_ollama_llm_service = OllamaLLMService(model_name=Config.OLLAMA_QWEN3_MODEL_NAME)
+global_gemini_llm_service = GeminiLLMService.shared()
+global_llm_router = LLMRouter(
+    providers={
+        OllamaLLMService.provider_key: global_ollama_llm_service,
+        GeminiLLMService.provider_key: global_gemini_llm_service,
+    },
+    fallback_key=Config.LLM_FALLBACK_PROVIDER,
+    overflow_queue_depth=Config.LLM_OVERFLOW_QUEUE_DEPTH,
+    max_first_token_seconds=Config.LLM_MAX_FIRST_TOKEN_SECONDS,
+    slow_probe_seconds=Config.LLM_SLOW_PROBE_SECONDS
+)
+def _build_anime_api_service():
+    from services.anime_api_service import AnimeAPIService
+    return AnimeAPIService()
+
+global_anime_api_service = LazyService("anime_api_service", _build_anime_api_service) # This is used by the controller
+global_query_embedding_cache = QueryEmbeddingCache(max_size=Config.QUERY_EMBEDDING_CACHE_SIZE)
+global_semantic_response_cache = SemanticResponseCache(
+    max_entries=Config.SEMANTIC_CACHE_MAX_ENTRIES,
+    ttl_seconds=Config.SEMANTIC_CACHE_TTL_SECONDS,
+    max_distance=Config.SEMANTIC_CACHE_MAX_DISTANCE,
+    enabled=Config.SEMANTIC_CACHE_ENABLED
+)
+
+# The BM25 index is built incrementally alongside FAISS and fused with it at query time
+global_lexical_index = BM25Index(k1=Config.BM25_K1, b=Config.BM25_B)
+global_retriever = HybridRetriever(
+    vector_store=global_vector_store,
+    lexical_index=global_lexical_index,
+    candidates=Config.RETRIEVAL_CANDIDATES,
+    rrf_k=Config.RETRIEVAL_RRF_K,
+    mmr_lambda=Config.RETRIEVAL_MMR_LAMBDA
+)
+# Ingestion skips items that repeat stored content (built from the store on first use)
+global_duplicate_index = DuplicateIndex(
+    num_permutations=Config.DEDUP_MINHASH_PERMUTATIONS,
+    bands=Config.DEDUP_LSH_BANDS,
+    threshold=Config.DEDUP_NEAR_DUPLICATE_THRESHOLD
+)
+
+# Chat prompts are assembled within a token budget; older turns collapse into rolling summaries
+global_conversation_summary_cache = ConversationSummaryCache(
+    summarize=lambda prompt: global_ollama_llm_service.get_simple_response(
+        prompt, system_prompt="You summarise conversations concisely. Output only the summary.",
+        priority=LLMScheduler.PRIORITY_BACKGROUND
+    ),
+    max_entries=Config.CONVERSATION_SUMMARY_CACHE_SIZE,
+    max_summary_tokens=Config.PROMPT_SUMMARY_MAX_TOKENS
+)
+global_prompt_builder = PromptBuilder(
+    summary_cache=global_conversation_summary_cache,
+    max_prompt_tokens=Config.PROMPT_MAX_TOKENS,
+    max_document_tokens=Config.PROMPT_MAX_DOCUMENT_TOKENS,
+    recent_turns=Config.PROMPT_RECENT_TURNS,
+    max_turn_tokens=Config.PROMPT_MAX_TURN_TOKENS,
+    max_summary_tokens=Config.PROMPT_SUMMARY_MAX_TOKENS
+)
+
+# Server-side chat sessions keep history and Ollama's context array between turns
+global_chat_session_store = ChatSessionStore(
+    max_sessions=Config.CHAT_SESSION_MAX_SESSIONS,
+    ttl_seconds=Config.CHAT_SESSION_TTL_SECONDS,
+    max_total_context_tokens=Config.CHAT_SESSION_MAX_TOTAL_CONTEXT_TOKENS,
+    max_context_tokens_per_session=Config.CHAT_SESSION_MAX_CONTEXT_TOKENS
+)
+
+# Follow-up questions are generated speculatively alongside each chat answer
+global_suggestion_service = FollowupSuggestionService(
+    llm_service=global_ollama_llm_service,
+    mode=Config.CHAT_SUGGESTIONS_MODE,
+    cache_size=Config.CHAT_SUGGESTIONS_CACHE_SIZE
+)
+
+# Title linker follows the vector store so newly ingested anime become linkable immediately
+global_title_linker = TitleLinker()
+global_title_index = TitleIndex(
+    min_similarity=Config.TITLE_INDEX_MIN_SIMILARITY,
+    upstream_cache_size=Config.TITLE_INDEX_UPSTREAM_CACHE_SIZE
+)
 
 # 2. Controllers that depend on core services
 # The AnimeController now correctly gets the anime_api_service it needs.
-global_anime_controller = AnimeController(anime_api_service=global_anime_api_service)
+def _build_anime_controller():
+    from controllers.anime_controller import AnimeController
+    return AnimeController(anime_api_service=global_anime_api_service)
+
+global_anime_controller = LazyService("anime_controller", _build_anime_controller)
 
 # 3. High-level services that depend on other services and controllers
-global_clustering_service = ClusteringService(vector_store=global_vector_store)
-global_data_embedding_service = DataEmbeddingService(
-    vector_store=global_vector_store,
-    embedder=global_ollama_embedder,
-    anime_controller=global_anime_controller # Pass the correctly instantiated controller
-)
+def _build_clustering_service():
+    from services.clustering_service import ClusteringService
+    return ClusteringService(vector_store=global_vector_store)
+
+def _build_data_embedding_service():
+    from services.data_embedding_service import DataEmbeddingService
+    return DataEmbeddingService(
+        vector_store=global_vector_store,
+        embedder=global_ollama_embedder,
+        anime_controller=global_anime_controller, # Pass the correctly instantiated controller
+        duplicate_index=global_duplicate_index if Config.DEDUP_ENABLED else None
+    )
 
-print("DEBUG: globals.py: All global services and controllers initialized correctly.")
+global_clustering_service = LazyService("clustering_service", _build_clustering_service)
+global_data_embedding_service = LazyService("data_embedding_service", _build_data_embedding_service)
@@ -24,8 +24,9 @@ def get_clusters():
 @data_api_bp.route('/ingest_all_data', methods=['POST'])
 def ingest_all_data_route():
     """
-    Triggers the ingestion of data from ALL configured sources.
+    Queues the ingestion of data from ALL configured sources as a background job.
     This will re-populate the vector store based on the logic in DataEmbeddingService.
+    Returns 202 with the job; follow it at /api/data/jobs/<job_id>.
     """
     logger.info("API Request: /api/data/ingest_all_data")
     response_data, status_code = DataController.ingest_all_data()
@@ -34,7 +35,7 @@ def ingest_all_data_route():
 @data_api_bp.route('/ingest_anime_api_category_data', methods=['POST'])
 def ingest_anime_api_category_data_route():
     """
-    Triggers ingestion for specific categories from the anime-api.
+    Queues ingestion for specific categories from the anime-api as a background job.
     Example: POST /api/data/ingest_anime_api_category_data?categories=action,comedy&limit_per_category=50
     """
     categories_str = request.args.get('categories')
@@ -52,3 +53,24 @@ def ingest_anime_api_category_data_route():
         categories=categories, limit_per_category=limit_per_category
     )
     return jsonify(response_data), status_code
+
+@data_api_bp.route('/jobs', methods=['GET'])
+def list_jobs_route():
+    limit = request.args.get('limit', 20, type=int)
+    if limit <= 0:
+        return jsonify({"error": "Limit must be a positive integer."}), 400
+    response_data, status_code = DataController.list_jobs(limit=limit)
+    return jsonify(response_data), status_code
+
+@data_api_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job_route(job_id):
+    """A job's state with processed/failed counts for each stage it has reached."""
+    response_data, status_code = DataController.get_job(job_id)
+    return jsonify(response_data), status_code
+
+@data_api_bp.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job_route(job_id):
+    """Cancels a queued job, or stops a running one at its next item."""
+    logger.info(f"API Request: Cancelling job {job_id}")
+    response_data, status_code = DataController.cancel_job(job_id)
+    return jsonify(response_data), status_code
@@ -1,5 +1,6 @@
 # backend/routes/llm_api_routes.py
 from flask import Blueprint, jsonify, request, Response, stream_with_context
+from config import Config
 from controllers.llm_controller import LLMController
 
 llm_api_bp = Blueprint('llm_api', __name__, url_prefix='/api/llm')
@@ -9,12 +10,29 @@ def chat_with_llm():
     data = request.get_json()
     user_query = data.get('query')
     history = data.get('history', [])
+    # Optional metadata filters, e.g. {"type": ["anime", "anime_details"], "source": "Anime API"}
+    filters = data.get('filters')
+    conversation_id = data.get('conversation_id')
+    # With a session id the server keeps the history and Ollama's context between turns.
+    session_id = data.get('session_id')
 
     if not user_query:
         return jsonify({"error": "Missing 'query' field in request body."}), 400
+    if filters is not None and not isinstance(filters, dict):
+        return jsonify({"error": "'filters' must be an object mapping metadata fields to values."}), 400
 
-    response_generator = LLMController.generate_llm_response(user_query, history)
-    return Response(stream_with_context(response_generator), mimetype='application/x-ndjson')
+    # Retrieval, the response cache and the provider choice happen before the response starts,
+    # so a saturated local queue (with no fallback to overflow to) gets a fast 503.
+    turn, busy_message = LLMController.prepare_chat_turn(
+        user_query, history, filters=filters, conversation_id=conversation_id, session_id=session_id
+    )
+    if busy_message:
+        return jsonify({"error": busy_message}), 503, {"Retry-After": "5"}
+
+    response = Response(stream_with_context(LLMController.generate_llm_response(turn)), mimetype='application/x-ndjson')
+    # The generator's own cleanup never runs if the response is closed before its first chunk.
+    response.call_on_close(lambda: LLMController.release_chat_turn(turn))
+    return response
 
 @llm_api_bp.route('/resolve-link', methods=['POST'])
 def resolve_link_route():
@@ -29,6 +47,44 @@ def resolve_link_route():
     response_data, status_code = LLMController.resolve_link_data(anime_title)
     return jsonify(response_data), status_code
 
+@llm_api_bp.route('/resolve-links', methods=['POST'])
+def resolve_links_route():
+    """
+    Batch variant of /resolve-link: resolves all titles from one response in a single call.
+    """
+    data = request.get_json()
+    anime_titles = data.get('titles') if data else None
+    if not isinstance(anime_titles, list) or not anime_titles:
+        return jsonify({"error": "Missing 'titles' list in request body."}), 400
+
+    response_data, status_code = LLMController.resolve_links_data(anime_titles)
+    return jsonify(response_data), status_code
+
+@llm_api_bp.route('/search', methods=['POST'])
+def bulk_search_route():
+    """
+    Bulk semantic search over the vector store, e.g.
+    {"queries": ["pirate swordsman", "cooking anime"], "top_k": 5, "filters": {"type": "anime"}}
+    """
+    data = request.get_json(silent=True) or {}
+    queries = data.get('queries')
+    top_k = data.get('top_k', 5)
+    filters = data.get('filters')
+
+    if not isinstance(queries, list) or not queries or not all(isinstance(q, str) and q.strip() for q in queries):
+        return jsonify({"error": "'queries' must be a non-empty list of non-empty strings."}), 400
+    if len(queries) > Config.BULK_SEARCH_MAX_QUERIES:
+        return jsonify({"error": f"At most {Config.BULK_SEARCH_MAX_QUERIES} queries per request."}), 400
+    if not isinstance(top_k, int) or isinstance(top_k, bool) or not 1 <= top_k <= Config.BULK_SEARCH_MAX_TOP_K:
+        return jsonify({"error": f"'top_k' must be an integer between 1 and {Config.BULK_SEARCH_MAX_TOP_K}."}), 400
+    if filters is not None and not isinstance(filters, dict):
+        return jsonify({"error": "'filters' must be an object mapping metadata fields to values."}), 400
+
+    response_data, status_code = LLMController.bulk_search(
+        queries, top_k=top_k, filters=filters, include_content=bool(data.get('include_content'))
+    )
+    return jsonify(response_data), status_code
+
 @llm_api_bp.route('/providers', methods=['GET'])
 def get_llm_providers_route():
     return jsonify(LLMController.get_llm_providers()), 200
@@ -45,6 +101,43 @@ def get_current_llm_provider_route():
     current_provider_data, status_code = LLMController.get_current_llm_provider()
     return jsonify(current_provider_data), status_code
 
+@llm_api_bp.route('/cache-stats', methods=['GET'])
+def get_cache_stats_route():
+    """Reports size and hit rates of the query embedding and semantic response caches."""
+    stats, status_code = LLMController.get_cache_stats()
+    return jsonify(stats), status_code
+
+@llm_api_bp.route('/scheduler-stats', methods=['GET'])
+def get_scheduler_stats_route():
+    response_data, status_code = LLMController.get_scheduler_stats()
+    return jsonify(response_data), status_code
+
+@llm_api_bp.route('/router-stats', methods=['GET'])
+def get_router_stats_route():
+    response_data, status_code = LLMController.get_router_stats()
+    return jsonify(response_data), status_code
+
+@llm_api_bp.route('/sessions', methods=['GET'])
+def get_session_stats_route():
+    response_data, status_code = LLMController.get_session_stats()
+    return jsonify(response_data), status_code
+
+@llm_api_bp.route('/sessions/<session_id>', methods=['DELETE'])
+def delete_session_route(session_id):
+    response_data, status_code = LLMController.delete_session(session_id)
+    return jsonify(response_data), status_code
+
+@llm_api_bp.route('/retrieval-stats', methods=['GET'])
+def get_retrieval_stats_route():
+    response_data, status_code = LLMController.get_retrieval_stats()
+    return jsonify(response_data), status_code
+
+@llm_api_bp.route('/model-residency', methods=['GET'])
+def get_model_residency_route():
+    """Reports keep_alive hints plus model load and cold-start timings."""
+    metrics, status_code = LLMController.get_model_residency_metrics()
+    return jsonify(metrics), status_code
+
 @llm_api_bp.route('/suggest-questions', methods=['POST'])
 def suggest_questions_route():
     conversation_context = request.get_json()
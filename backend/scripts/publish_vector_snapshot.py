@@ -0,0 +1,30 @@
+# backend/scripts/publish_vector_snapshot.py
+import sys
+import os
+
+# Add the backend directory to the Python path to import config
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import Config
+from embeddings.vector_store import VectorStore
+from embeddings.vector_snapshot import read_current_version
+
+def publish_vector_snapshot():
+    """
+    Publishes the saved vector database as a new shared snapshot, without re-running
+    ingestion. Workers in VECTOR_STORE_MODE=shared pick it up on their next poll.
+    """
+    store = VectorStore(db_path=Config.VECTOR_DB_PATH)
+    store.load()
+    if not store.documents:
+        print(f"❌ Error: No documents found in '{Config.VECTOR_DB_PATH}'. Run build_database.py first.")
+        return
+
+    print(f"📦 Publishing {len(store.documents)} documents (current version: {read_current_version(store.snapshot_dir)})...")
+    version = store.publish_snapshot()
+    if version is None:
+        print("❌ Error: Publishing failed. See the log above.")
+        return
+    print(f"✅ Published snapshot version {version} to {store.snapshot_dir}")
+
+if __name__ == "__main__":
+    publish_vector_snapshot()
@@ -0,0 +1,63 @@
+# backend/serve.py
+"""
+Production entry point. Runs the Flask app under gunicorn with threaded workers instead of
+Flask's development server, so a slow upstream (Ollama, a scraped site, a video segment)
+only ties up one thread while the others keep serving.
+
+Each worker loads the vector store after it is forked (nothing is preloaded, so the
+background threads started by the app are never shared across a fork). On SIGTERM or
+SIGINT gunicorn stops accepting connections, lets in-flight requests finish within the
+graceful timeout, and each worker then flushes unsaved vector store changes through the
+app's exit hook (app.on_shutdown).
+
+Usage:
+    python serve.py [--bind 127.0.0.1:8001] [--workers 1] [--threads 32]
+"""
+import argparse
+import logging
+
+from gunicorn.app.base import BaseApplication
+
+from config import Config
+
+
+class MushiServer(BaseApplication):
+    def __init__(self, options: dict):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from app import create_app, start_background_startup
+        app = create_app()
+        # Each worker starts serving at once and loads its data in the background (see /ready).
+        start_background_startup()
+        return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Mushi backend with gunicorn.")
+    parser.add_argument('--bind', default=f"{Config.HOST}:{Config.PORT}")
+    parser.add_argument('--workers', type=int, default=Config.SERVER_WORKERS)
+    parser.add_argument('--threads', type=int, default=Config.SERVER_THREADS)
+    args = parser.parse_args()
+
+    logging.info(f"🚀 Mushi is taking off! Listening on http://{args.bind} ({args.workers} worker(s) x {args.threads} threads)")
+    MushiServer({
+        'bind': args.bind,
+        'workers': args.workers,
+        'threads': args.threads,
+        'worker_class': 'gthread',
+        'timeout': Config.SERVER_TIMEOUT_SECONDS,
+        'graceful_timeout': Config.SERVER_GRACEFUL_TIMEOUT_SECONDS,
+        'keepalive': Config.SERVER_KEEPALIVE_SECONDS,
+        'accesslog': None,
+    }).run()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(module)s - %(message)s')
+    main()
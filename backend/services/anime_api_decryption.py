@@ -6,11 +6,12 @@ from Crypto.Util.Padding import unpad
 from hashlib import md5
 import json
 import logging
+from config import Config
 
 logger = logging.getLogger(__name__)
 
 # This key is fetched from the same source as the original Node.js app
-DECRYPTION_KEY_URL = "https://raw.githubusercontent.com/itzzzme/megacloud-keys/refs/heads/main/key.txt"
+DECRYPTION_KEY_URL = Config.ANIME_DECRYPTION_KEY_URL
 
 def _get_decryption_key() -> bytes:
     """Fetches the decryption key from the remote source."""
@@ -2,25 +2,43 @@
 import cloudscraper
 import logging
 import json
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from bs4 import BeautifulSoup, Tag
+from requests.adapters import HTTPAdapter
 from requests.exceptions import RequestException, HTTPError
+from config import Config
+from services.metrics_service import Metrics
 from services.anime_api_decryption import decrypt_source_url, _get_decryption_key
 from urllib.parse import quote
 
 logger = logging.getLogger(__name__)
 
-V1_BASE_URL = "https://hianime.to"
-V4_BASE_URL = "https://9animetv.to"
+V1_BASE_URL = Config.ANIME_SOURCE_BASE_URL.rstrip('/')
+V4_BASE_URL = Config.ANIME_EMBED_BASE_URL.rstrip('/')
 
 class AnimeAPIService:
     def __init__(self):
         self.scraper = cloudscraper.create_scraper(
             browser={'browser': 'chrome', 'platform': 'windows', 'mobile': False}
         )
+        # One pooled session is shared by every request thread (scraping and the video proxy),
+        # so the pools must be large enough that concurrent requests do not discard connections.
+        # The existing adapters are resized rather than replaced to keep CloudScraper's TLS setup.
+        for adapter in self.scraper.adapters.values():
+            if isinstance(adapter, HTTPAdapter):
+                adapter._pool_maxsize = Config.UPSTREAM_POOL_MAXSIZE
+                adapter.init_poolmanager(adapter._pool_connections, Config.UPSTREAM_POOL_MAXSIZE, block=adapter._pool_block)
+        # Independent pages (e.g. the homepage's list sections) are fetched concurrently.
+        self._page_executor = ThreadPoolExecutor(max_workers=Config.SCRAPER_CONCURRENT_PAGES, thread_name_prefix="anime-scraper")
         self.decryption_key = _get_decryption_key()
         logger.info("AnimeAPIService: Initialized with CloudScraper for direct website scraping.")
 
     def _make_request(self, url: str, params: dict = None, headers: dict = None) -> tuple[dict | str | None, int]:
+        with Metrics.shared().span("anime_upstream_request"):
+            return self._fetch(url, params, headers)
+
+    def _fetch(self, url: str, params: dict = None, headers: dict = None) -> tuple[dict | str | None, int]:
         logger.debug(f"Making scraping request to: {url} with params: {params}")
         try:
             final_headers = {
@@ -28,7 +46,8 @@ class AnimeAPIService:
                 'Referer': f"{V1_BASE_URL}/",
                 **(headers or {})
             }
-            response = self.scraper.get(url, params=params, headers=final_headers, timeout=20)
+            response = self.scraper.get(url, params=params, headers=final_headers,
+                                        timeout=(Config.UPSTREAM_CONNECT_TIMEOUT, Config.SCRAPER_READ_TIMEOUT))
             response.raise_for_status()
             try:
                 return response.json(), response.status_code
@@ -44,6 +63,15 @@ class AnimeAPIService:
             logger.error(f"An unexpected error occurred while scraping {url}: {e}", exc_info=True)
             return {"error": "An unexpected server error occurred during scraping"}, 500
 
+    def _submit_page(self, fn, *args, **kwargs):
+        # Runs in a copy of the caller's context, so page fetches still count towards the request's timings.
+        return self._page_executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+    @staticmethod
+    def _parse_html(html: str) -> BeautifulSoup:
+        with Metrics.shared().span("anime_html_parse"):
+            return BeautifulSoup(html, "lxml")
+
     def _safe_parse(self, element, selector, attribute=None, text=False):
         if not element: return None
         found = element.select_one(selector)
@@ -83,7 +111,7 @@ class AnimeAPIService:
             return {"error": "Could not fetch homepage HTML from source."}, status_code
 
         logger.info(f"Successfully fetched homepage HTML. Parsing all sections...")
-        soup = BeautifulSoup(html_content, "lxml")
+        soup = self._parse_html(html_content)
 
         def run_parser_on_soup(section_name: str, selector: str, parser_func, container=soup) -> list:
             elements = container.select(selector)
@@ -129,7 +157,7 @@ class AnimeAPIService:
                 logger.error(f"Failed to fetch page /{path}. Status: {status_code}")
                 return []
 
-            page_soup = BeautifulSoup(html_content, "lxml")
+            page_soup = self._parse_html(html_content)
             items = []
             selector = ".film_list-wrap .flw-item"
             elements = page_soup.select(selector)
@@ -147,14 +175,18 @@ class AnimeAPIService:
             return items
 
         try:
+            # The list sections live on separate pages; fetch them all at once rather than one after another.
+            pages = {
+                "latest_episode": self._submit_page(scrape_page, "recently-updated", self._parse_anime_card),
+                "latest_completed": self._submit_page(scrape_page, "completed", self._parse_anime_card),
+                "top_airing": self._submit_page(scrape_page, "top-airing", self._parse_anime_card, limit=7),
+                "most_popular": self._submit_page(scrape_page, "most-popular", self._parse_anime_card, limit=7),
+                "most_favorite": self._submit_page(scrape_page, "most-favorite", self._parse_anime_card, limit=7),
+            }
             results = {
                 "spotlights": run_parser_on_soup("Spotlights", "#slider .swiper-slide", parse_spotlight, container=soup),
                 "trending": run_parser_on_soup("Trending", "#trending-home .swiper-slide", parse_trending, container=soup),
-                "latest_episode": scrape_page("recently-updated", self._parse_anime_card),
-                "latest_completed": scrape_page("completed", self._parse_anime_card),
-                "top_airing": scrape_page("top-airing", self._parse_anime_card, limit=7),
-                "most_popular": scrape_page("most-popular", self._parse_anime_card, limit=7),
-                "most_favorite": scrape_page("most-favorite", self._parse_anime_card, limit=7),
+                **{section: future.result() for section, future in pages.items()},
                 "genres": [g.text.strip() for g in soup.select("#main-sidebar .sb-genre-list li a")]
             }
 
@@ -181,7 +213,7 @@ class AnimeAPIService:
             logger.error(f"Failed to fetch initial data for {anime_id}: {e}")
             return {"error": "Could not fetch data for this anime."}, 500
 
-        soup = BeautifulSoup(info_resp_text, "lxml")
+        soup = self._parse_html(info_resp_text)
         title_element = soup.select_one(".anisc-detail .film-name")
 
         main_info = {
@@ -207,7 +239,7 @@ class AnimeAPIService:
                         details[key] = name_element.text.strip()
         main_info.update(details)
 
-        ep_soup = BeautifulSoup(episodes_data.get('html', ''), "lxml")
+        ep_soup = self._parse_html(episodes_data.get('html', ''))
         episodes = [{
             "id": a_tag.get('href', '').split('/')[-1],
             "data_id": a_tag.get('data-id'),
@@ -229,7 +261,7 @@ class AnimeAPIService:
         data, status_code = self._make_request(url, params=params)
         if status_code != 200 or not isinstance(data, dict) or 'html' not in data:
             return {"error": "Failed to fetch server list"}, status_code
-        soup = BeautifulSoup(data.get('html'), "lxml")
+        soup = self._parse_html(data.get('html'))
         servers = [{"type": i.get("data-type"), "data_id": i.get("data-id"), "server_name": i.select_one("a").get_text(strip=True)} for i in soup.select(".server-item")]
         return {"servers": servers}, 200
 
@@ -271,7 +303,7 @@ class AnimeAPIService:
         url = f"{V1_BASE_URL}/{category}"
         html_content, status_code = self._make_request(url, params={"page": page})
         if status_code != 200 or not isinstance(html_content, str): return html_content, status_code
-        soup = BeautifulSoup(html_content, "lxml")
+        soup = self._parse_html(html_content)
         container = soup.select_one(".film_list-wrap")
         if not container: return {"error": "Could not find anime list container."}, 404
         anime_list = [self._parse_anime_card(el) for el in container.select(".flw-item")]
@@ -288,7 +320,7 @@ class AnimeAPIService:
         url = f"{V1_BASE_URL}/ajax/search/suggest"
         data, status_code = self._make_request(url, params={"keyword": keyword})
         if status_code != 200 or not isinstance(data, dict): return data, status_code
-        soup = BeautifulSoup(data.get('html', ''), "lxml")
+        soup = self._parse_html(data.get('html', ''))
         suggestions = []
         for a in soup.select(".nav-item a"):
             raw_href = a.get("href", "")
@@ -300,7 +332,7 @@ class AnimeAPIService:
         url = f"{V1_BASE_URL}/filter"
         html_content, status_code = self._make_request(url, params=filters)
         if status_code != 200 or not isinstance(html_content, str): return html_content, status_code
-        soup = BeautifulSoup(html_content, "lxml")
+        soup = self._parse_html(html_content)
         container = soup.select_one(".film_list-wrap")
         if not container: return {"error": "Could not find anime list container."}, 404
         anime_list = [self._parse_anime_card(el) for el in container.select(".flw-item")]
@@ -311,7 +343,7 @@ class AnimeAPIService:
         url = f"{V1_BASE_URL}/ajax/film/tooltip/{data_id}"
         html_content, status_code = self._make_request(url)
         if status_code != 200 or not isinstance(html_content, str): return html_content, status_code
-        soup = BeautifulSoup(html_content, "lxml")
+        soup = self._parse_html(html_content)
         data = { "title": soup.select_one(".film-name").text.strip(), "description": soup.select_one(".film-description").text.strip()}
         for detail in soup.select(".fd-infor .item-title"):
             key, value = detail.text.strip().lower().replace(":", ""), detail.find_next_sibling("span").text.strip()
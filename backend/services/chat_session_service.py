@@ -0,0 +1,128 @@
+# backend/services/chat_session_service.py
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ChatSession:
+    """
+    One server-side conversation: its message history plus the Ollama `context` token
+    array returned by the last generation. Sending that array back with the next turn
+    lets Ollama skip re-evaluating everything said so far.
+    """
+    def __init__(self, session_id: str, max_history_messages: int = 200):
+        self.session_id = session_id
+        self.max_history_messages = max_history_messages
+        self.history: List[Dict[str, Any]] = []
+        self.ollama_context: Optional[List[int]] = None
+        self.context_model: Optional[str] = None
+        self.created_at = time.time()
+        self.last_used_at = time.monotonic()
+        self.turns = 0
+        self.lock = threading.Lock()
+
+    @property
+    def context_tokens(self) -> int:
+        return len(self.ollama_context) if self.ollama_context else 0
+
+    def context_for(self, model_name: str) -> Optional[List[int]]:
+        """The cached context, but only if it was produced by the same model."""
+        return self.ollama_context if self.ollama_context and self.context_model == model_name else None
+
+    def record_turn(self, user_text: str, bot_text: str, ollama_context: Optional[List[int]], model_name: str):
+        self.history.append({"sender": "user", "text": user_text})
+        self.history.append({"sender": "bot", "text": bot_text})
+        del self.history[:-self.max_history_messages]
+        self.ollama_context = ollama_context or None
+        self.context_model = model_name if ollama_context else None
+        self.turns += 1
+
+    def drop_context(self):
+        self.ollama_context = None
+        self.context_model = None
+
+
+class ChatSessionStore:
+    """
+    Keeps chat sessions in memory, bounded three ways:
+
+    - `ttl_seconds`: sessions idle for longer are dropped.
+    - `max_sessions`: the least recently used session is dropped beyond this count.
+    - `max_total_context_tokens`: a memory cap on the cached Ollama context arrays. Over
+      it, the least recently used sessions lose their context (their history is kept,
+      so their next turn just falls back to a full prompt).
+    """
+    def __init__(self, max_sessions: int = 500, ttl_seconds: int = 3600,
+                 max_total_context_tokens: int = 2_000_000, max_context_tokens_per_session: int = 8192):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.max_total_context_tokens = max_total_context_tokens
+        self.max_context_tokens_per_session = max_context_tokens_per_session
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = {"ttl": 0, "lru": 0, "context_memory": 0, "context_too_long": 0}
+
+    def get_or_create(self, session_id: Optional[str] = None) -> ChatSession:
+        with self._lock:
+            self._evict_expired()
+            session = self._sessions.get(session_id) if session_id else None
+            if session is None:
+                session = ChatSession(session_id or uuid.uuid4().hex)
+                self._sessions[session.session_id] = session
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+                    self.evictions["lru"] += 1
+            session.last_used_at = time.monotonic()
+            self._sessions.move_to_end(session.session_id)
+            return session
+
+    def get(self, session_id: str) -> Optional[ChatSession]:
+        with self._lock:
+            self._evict_expired()
+            return self._sessions.get(session_id)
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def after_turn(self, session: ChatSession):
+        """Applies the per-session and total context caps once a turn has been recorded."""
+        with self._lock:
+            if session.context_tokens > self.max_context_tokens_per_session:
+                # Past the model's window the context would be truncated by Ollama anyway;
+                # the next turn starts a fresh prefix from the compacted history instead.
+                session.drop_context()
+                self.evictions["context_too_long"] += 1
+            total = sum(s.context_tokens for s in self._sessions.values())
+            for candidate in list(self._sessions.values()):
+                if total <= self.max_total_context_tokens:
+                    break
+                if candidate.context_tokens and candidate is not session:
+                    total -= candidate.context_tokens
+                    candidate.drop_context()
+                    self.evictions["context_memory"] += 1
+
+    def _evict_expired(self):
+        cutoff = time.monotonic() - self.ttl_seconds
+        expired = [sid for sid, s in self._sessions.items() if s.last_used_at < cutoff]
+        for session_id in expired:
+            del self._sessions[session_id]
+        self.evictions["ttl"] += len(expired)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._evict_expired()
+            return {
+                "sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "ttl_seconds": self.ttl_seconds,
+                "sessions_with_context": sum(1 for s in self._sessions.values() if s.ollama_context),
+                "total_context_tokens": sum(s.context_tokens for s in self._sessions.values()),
+                "max_total_context_tokens": self.max_total_context_tokens,
+                "evictions": dict(self.evictions),
+            }
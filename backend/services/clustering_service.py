@@ -1,7 +1,6 @@
 # backend/services/clustering_service.py
 import numpy as np
-import faiss
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Optional
 import logging
 from collections import Counter
 import re
@@ -9,22 +8,30 @@ import json
 import os
 from config import Config
 from services.ollama_llm_service import OllamaLLMService
+from services.llm_scheduler import LLMScheduler
+from services.model_residency_service import ModelResidencyManager
+from services.profiling_service import Profiler
+from services.job_service import NULL_PROGRESS
 
 logger = logging.getLogger(__name__)
 
 # Define a path for the pre-computed cluster cache file
 CLUSTER_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cluster_cache.json')
+# Documents nearest to each cluster's centroid, listed with the cluster as its exemplars
+EXEMPLARS_PER_CLUSTER = 3
 
 class ClusteringService:
     def __init__(self, vector_store):
         self.vector_store = vector_store
         self.llm_service = OllamaLLMService(model_name=Config.OLLAMA_DEFAULT_GENERATION_MODEL)
+        self.residency = ModelResidencyManager.shared()
         logger.info("ClusteringService: Initialized with LLM for titling.")
 
-    def precompute_and_cache_all_clusters(self, min_clusters=2, max_clusters=10):
+    def precompute_and_cache_all_clusters(self, min_clusters=2, max_clusters=10, progress=NULL_PROGRESS):
         """
         Performs clustering for a range of cluster numbers and saves the results to a file.
-        This is an expensive operation meant to be run in the background.
+        This is an expensive operation meant to be run in the background. A cancelled job
+        stops between runs and leaves the previous cache in place.
         """
         logger.info(f"Starting pre-computation of clusters from {min_clusters} to {max_clusters}...")
         all_documents = self.vector_store.get_all_documents_with_embeddings()
@@ -40,23 +47,53 @@ class ClusteringService:
         embeddings_array = np.array(embeddings, dtype='float32')
         full_cache = {}
 
-        for n_clusters in range(min_clusters, max_clusters + 1):
-            if n_clusters > len(embeddings):
-                logger.warning(f"Skipping n_clusters={n_clusters} as it's more than the number of documents.")
-                continue
-
-            logger.info(f"--- Computing for n_clusters = {n_clusters} ---")
-            try:
-                doc_id_to_label, cluster_info = self._perform_single_kmeans_run(embeddings_array, all_documents, n_clusters)
-                if doc_id_to_label and cluster_info:
-                    full_cache[str(n_clusters)] = {
-                        "doc_id_to_label": doc_id_to_label,
-                        "cluster_info": cluster_info
+        # Phase 1: run every K-Means variation. This needs no model at all, so all of it
+        # happens before any titling request reaches Ollama.
+        kmeans_runs = {}
+        progress.stage("clustering_kmeans", total=max_clusters - min_clusters + 1)
+        with Profiler.shared().phase("clustering_kmeans"):
+            for n_clusters in range(min_clusters, max_clusters + 1):
+                progress.check_cancelled()
+                if n_clusters > len(embeddings):
+                    logger.warning(f"Skipping n_clusters={n_clusters} as it's more than the number of documents.")
+                    continue
+
+                logger.info(f"--- Computing for n_clusters = {n_clusters} ---")
+                try:
+                    doc_id_to_label, cluster_keywords, centroids = self._perform_single_kmeans_run(embeddings_array, all_documents, n_clusters)
+                    if doc_id_to_label and cluster_keywords:
+                        kmeans_runs[n_clusters] = (doc_id_to_label, cluster_keywords, centroids)
+                        progress.advance(processed=1)
+                    else:
+                        logger.error(f"Failed to generate valid data for n_clusters = {n_clusters}")
+                        progress.advance(failed=1)
+                except Exception as e:
+                    logger.error(f"Error processing n_clusters={n_clusters}: {e}", exc_info=True)
+                    progress.advance(failed=1)
+
+        # Phase 2: title every cluster of every run in one pass with the generation model only.
+        # Identical keyword sets across runs share a single LLM call.
+        exemplars = self._find_cluster_exemplars(kmeans_runs)
+
+        progress.stage("clustering_titling", total=len(kmeans_runs))
+        with Profiler.shared().phase("clustering_titling"):
+            self.residency.begin_batch_phase(ModelResidencyManager.KIND_GENERATION)
+            title_cache: Dict[Tuple[str, ...], str] = {}
+            for n_clusters, (doc_id_to_label, cluster_keywords, _) in kmeans_runs.items():
+                progress.check_cancelled()
+                all_cluster_titles = self._get_llm_cluster_titles_iteratively(cluster_keywords, title_cache)
+                cluster_info = {}
+                for i in range(n_clusters):
+                    cluster_info[i] = {
+                        "title": all_cluster_titles.get(i, f"Cluster {i}"),
+                        "top_terms": cluster_keywords.get(i, []),
+                        "exemplars": exemplars.get(n_clusters, {}).get(i, []),
                     }
-                else:
-                    logger.error(f"Failed to generate valid data for n_clusters = {n_clusters}")
-            except Exception as e:
-                logger.error(f"Error processing n_clusters={n_clusters}: {e}", exc_info=True)
+                full_cache[str(n_clusters)] = {
+                    "doc_id_to_label": doc_id_to_label,
+                    "cluster_info": cluster_info
+                }
+                progress.advance(processed=1)
 
         try:
             with open(CLUSTER_CACHE_PATH, 'w') as f:
@@ -65,9 +102,13 @@ class ClusteringService:
         except Exception as e:
             logger.error(f"Failed to write cluster cache to file: {e}")
 
-    def _perform_single_kmeans_run(self, embeddings_array: np.ndarray, all_documents: List[Dict], n_clusters: int) -> Tuple[Dict[str, Any], Dict[int, Any]]:
-        """Performs a single K-Means run for a given number of clusters."""
+    def _perform_single_kmeans_run(self, embeddings_array: np.ndarray, all_documents: List[Dict], n_clusters: int) -> Tuple[Dict[str, Any], Dict[int, List[str]], np.ndarray]:
+        """
+        Performs a single K-Means run for a given number of clusters and extracts each
+        cluster's keywords. Also returns the (n_clusters, d) centroids.
+        """
         dimension = embeddings_array.shape[1]
+        import faiss  # Deferred: only clustering needs it, and it is slow to import
         kmeans = faiss.Kmeans(dimension, n_clusters, niter=20, verbose=False)
         kmeans.train(embeddings_array)
         _, labels = kmeans.index.search(embeddings_array, 1)
@@ -83,17 +124,40 @@ class ClusteringService:
                 label = int(labels.ravel()[i])
                 clustered_docs_by_label[label].append(doc)
 
-        all_cluster_keywords = self._get_top_terms_for_all_clusters(clustered_docs_by_label)
-        all_cluster_titles = self._get_llm_cluster_titles_iteratively(all_cluster_keywords)
+        return doc_id_to_label, self._get_top_terms_for_all_clusters(clustered_docs_by_label), kmeans.centroids
 
-        cluster_info = {}
-        for i in range(n_clusters):
-            cluster_info[i] = {
-                "title": all_cluster_titles.get(i, f"Cluster {i}"),
-                "top_terms": all_cluster_keywords.get(i, []),
-            }
+    def _find_cluster_exemplars(self, kmeans_runs: Dict[int, Tuple[Dict[str, Any], Dict[int, List[str]], np.ndarray]]) -> Dict[int, Dict[int, List[Dict[str, Any]]]]:
+        """
+        Finds the documents nearest to every centroid of every run with a single batched
+        search, keeping only those actually assigned to that cluster.
+        Returns {n_clusters: {label: [{"source_item_id", "title"}, ...]}}.
+        """
+        if not kmeans_runs:
+            return {}
+        runs = list(kmeans_runs.items())
+        centroids = np.vstack([centroids for _, (_, _, centroids) in runs])
+        try:
+            # Over-fetch: a document near a centroid can still belong to a neighbouring cluster.
+            all_hits = self.vector_store.search_batch(centroids, top_k=EXEMPLARS_PER_CLUSTER * 3)
+        except Exception as e:
+            logger.error(f"Failed to find cluster exemplars: {e}", exc_info=True)
+            return {}
 
-        return doc_id_to_label, cluster_info
+        exemplars, row = {}, 0
+        for n_clusters, (doc_id_to_label, _, _) in runs:
+            exemplars[n_clusters] = {}
+            for label in range(n_clusters):
+                picked = []
+                for hit in all_hits[row]:
+                    document = hit.document
+                    source_item_id = document.get("source_item_id")
+                    if source_item_id and doc_id_to_label.get(source_item_id) == label:
+                        picked.append({"source_item_id": source_item_id, "title": (document.get("metadata") or {}).get("title")})
+                        if len(picked) == EXEMPLARS_PER_CLUSTER:
+                            break
+                exemplars[n_clusters][label] = picked
+                row += 1
+        return exemplars
 
     def _get_top_terms_for_all_clusters(self, clustered_docs_by_label: List[List[Dict]], top_n: int = 5) -> Dict[int, List[str]]:
         stop_words = set(['a', 'an', 'and', 'the', 'is', 'it', 'in', 'on', 'of', 'for', 'with', 'to', 'n', 'd','s', 'as', 'by', 'title', 'synopsis', 'description', 'genres', 'type', 'anime', 'user', 'its','manga', 'movie', 'character', 'episode', 'series', 'story', 'one', 'two', 'can', 'airing', 'no','he', 'she', 'they', 'his', 'her', 'their', 'has', 'have', 'was', 'were', 'from', 'can','that', 'this', 'but', 'are', 'not', 'be', 'at', 'who', 'all', 'into', 'about', 'after'])
@@ -110,11 +174,14 @@ class ClusteringService:
                 cluster_keywords[i] = []
         return cluster_keywords
 
-    def _get_llm_cluster_titles_iteratively(self, all_keywords: Dict[int, List[str]]) -> Dict[int, str]:
+    def _get_llm_cluster_titles_iteratively(self, all_keywords: Dict[int, List[str]], title_cache: Optional[Dict[Tuple[str, ...], str]] = None) -> Dict[int, str]:
         """
         Generates cluster titles by making a separate, simpler LLM call for each cluster.
         This is more robust against timeouts and complex parsing errors.
+        Titles already generated for the same keywords are taken from `title_cache`.
         """
+        if title_cache is None:
+            title_cache = {}
         if not all_keywords:
             return {}
 
@@ -124,6 +191,11 @@ class ClusteringService:
                 all_titles[cluster_id] = f"Cluster {cluster_id}"
                 continue
 
+            cache_key = tuple(keywords)
+            if cache_key in title_cache:
+                all_titles[cluster_id] = title_cache[cache_key]
+                continue
+
             prompt = (
                 "You are an expert at creating concise, descriptive titles. "
                 f"Based on these keywords: {', '.join(keywords)}, "
@@ -133,7 +205,9 @@ class ClusteringService:
 
             try:
                 logger.info(f"Requesting title for Cluster {cluster_id} with keywords: {keywords}")
-                response_str = self.llm_service.get_simple_response(prompt)
+                response_str = self.llm_service.get_simple_response(
+                    prompt, keep_alive=self.residency.keep_alive_for("batch"), priority=LLMScheduler.PRIORITY_BACKGROUND
+                )
 
                 if response_str and not response_str.startswith("Error:"):
                     # --- START OF FIX: Robust Tag and Artifact Stripping ---
@@ -146,6 +220,7 @@ class ClusteringService:
                     # --- END OF FIX ---
 
                     all_titles[cluster_id] = title
+                    title_cache[cache_key] = title
                     logger.info(f"Successfully generated title for Cluster {cluster_id}: '{title}'")
                 else:
                     raise Exception(f"LLM returned an error or empty response: {response_str}")
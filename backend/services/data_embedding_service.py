@@ -7,16 +7,26 @@ from collections import defaultdict
 
 from controllers.anime_controller import AnimeController
 from services.one_piece_api_service import OnePieceAPIService
+from services.model_residency_service import ModelResidencyManager
+from services.profiling_service import Profiler
+from services.job_service import NULL_PROGRESS
+from services.metrics_service import Metrics
+from services import file_source_service
+from config import Config
 
 logger = logging.getLogger(__name__)
 ERROR_LOG_FILE = os.path.join(os.path.dirname(__file__), '..', 'embedding_errors.json')
 
 class DataEmbeddingService:
-    def __init__(self, vector_store, embedder, anime_controller: AnimeController):
+    def __init__(self, vector_store, embedder, anime_controller: AnimeController, duplicate_index=None):
         self.vector_store = vector_store
         self.embedder = embedder
         self.anime_controller = anime_controller
+        # When set, items repeating stored content become aliases instead of new embeddings.
+        self.duplicate_index = duplicate_index
+        self.duplicate_counts = defaultdict(int)
         self.one_piece_api_service = OnePieceAPIService()
+        self.residency = ModelResidencyManager.shared()
         self.error_summary = defaultdict(lambda: {'count': 0, 'examples': []})
         logger.debug("DataEmbeddingService: Initialized.")
 
@@ -45,13 +55,30 @@ class DataEmbeddingService:
         if raw_id is None: return None
         return str(raw_id).strip()
 
-    def embed_text_data(self, content: str, metadata: Dict[str, Any], source_item_id: str) -> bool:
+    def embed_text_data(self, content: str, metadata: Dict[str, Any], source_item_id: str, deduplicate: bool = True) -> bool:
+        """
+        Embeds and stages one document. With `deduplicate` False the duplicate check is skipped,
+        for a revised record whose new text would otherwise be merged into its own old version.
+        """
         if self.vector_store.get_document_by_source_id(source_item_id):
             return True
 
-        embedding = self.embedder.embed_text(content)
+        # The same show turns up in several home sections and as sub/dub/season variants;
+        # those are merged into the document already stored rather than embedded again.
+        if deduplicate and self.duplicate_index is not None:
+            duplicate = self.duplicate_index.find_duplicate(content, metadata)
+            if duplicate is not None:
+                canonical_id, kind = duplicate
+                if self.vector_store.add_alias(source_item_id, canonical_id, metadata):
+                    self.duplicate_counts[kind] += 1
+                    logger.debug(f"'{source_item_id}' is a {kind} duplicate of document {canonical_id}; merged as an alias.")
+                    return True
+
+        embedding = self.embedder.embed_text(content, keep_alive=self.residency.keep_alive_for("batch"))
         if embedding:
-            self.vector_store.add_document(content, embedding, metadata, source_item_id)
+            doc_id = self.vector_store.add_document(content, embedding, metadata, source_item_id)
+            if doc_id is not None and self.duplicate_index is not None:
+                self.duplicate_index.add(doc_id, content, metadata)
             return True
 
         self._log_error("Embedding Generation Failed", source_item_id, f"Ollama embedder returned None for title: {metadata.get('title')}")
@@ -83,6 +110,8 @@ class DataEmbeddingService:
             "anime_id": anime_id,
             "poster_url": poster_url,
         }
+        if item.get('jname'):
+            metadata["japanese_title"] = item['jname']
 
         if fetch_full_details:
             details, status_code = self.anime_controller.get_anime_details_data(anime_id)
@@ -96,6 +125,8 @@ class DataEmbeddingService:
                     f"Synopsis: {details.get('synopsis', 'No synopsis available.')}"
                 ]
                 metadata['type'] = 'anime_details'
+                if details.get('japanese_title') and details.get('japanese_title') != 'N/A':
+                    metadata['japanese_title'] = details['japanese_title']
             else:
                 self._log_error("Full Detail Fetch Failed", anime_id, f"Status: {status_code}, Source: {source_type}")
 
@@ -104,7 +135,7 @@ class DataEmbeddingService:
 
         return self.embed_text_data(content, metadata, source_item_id)
 
-    def embed_one_piece_data(self) -> Tuple[int, int]:
+    def embed_one_piece_data(self, progress=NULL_PROGRESS) -> Tuple[int, int]:
         logger.info("Starting One Piece data embedding...")
         processed, failed = 0, 0
 
@@ -114,9 +145,12 @@ class DataEmbeddingService:
         }
 
         for source_name, fetch_func in op_sources.items():
+            progress.check_cancelled()
+            progress.stage(f"one_piece_{source_name}")
             data, status = fetch_func()
             if status == 200: # We now check only for success status
                 for item in data:
+                    progress.check_cancelled()
                     item_id = self._clean_id(item.get('id'))
                     name = item.get('name')
                     if item_id and name:
@@ -124,86 +158,208 @@ class DataEmbeddingService:
                         metadata = {"source": "One Piece API", "type": f"one_piece_{source_name[:-1]}", "title": name}
                         if self.embed_text_data(content, metadata, f"one_piece_{source_name[:-1]}_{item_id}"):
                             processed += 1
+                            progress.advance(processed=1)
                         else:
                             failed += 1
+                            progress.advance(failed=1)
                     else:
                         failed += 1
+                        progress.advance(failed=1)
                         self._log_error("Missing ID or Name", f"op_{source_name}", str(item))
             else:
                 logger.error(f"Failed to fetch One Piece {source_name}. Status: {status}")
                 self._log_error(f"One Piece API Call Failed", source_name, f"Status code: {status}")
+                progress.advance(failed=1)
 
         logger.info(f"Finished One Piece data embedding. Processed: {processed}, Failed: {failed}.")
         return processed, failed
 
-    def embed_from_anime_api_list(self, section_name: str, items_list: List[Dict], fetch_full_details: bool) -> Tuple[int, int]:
+    def embed_file_sources(self, progress=NULL_PROGRESS) -> Tuple[int, int]:
+        """
+        Embeds the records of the files in FILE_SOURCES, streamed one at a time (see
+        services/file_source_service.py). A file whose mtime and size match the last run,
+        and whose records are all still in the store, is not read at all; in any other
+        file, records whose passages are unchanged cost a lookup and nothing more.
+        """
+        base_dir = os.path.join(os.path.dirname(__file__), '..')
+        paths = file_source_service.discover_files(Config.FILE_SOURCES, base_dir)
+        logger.info(f"Starting embedding of {len(paths)} local data files...")
+        state = file_source_service.FileIngestState(Config.FILE_SOURCE_STATE_PATH)
         processed, failed = 0, 0
+
+        for path in paths:
+            progress.check_cancelled()
+            source_name = os.path.relpath(path, base_dir)
+            progress.stage(f"file_{source_name}")
+            signature = state.file_signature(path)
+            previous = state.records(source_name)
+            if state.is_unchanged(source_name, signature) and all(
+                    self.vector_store.get_document_by_source_id(file_source_service.passage_source_id(source_name, key, record_hash, 0))
+                    for key, record_hash in previous.items()):
+                logger.info(f"'{source_name}' is unchanged since it was last ingested; skipped.")
+                continue
+
+            records: Dict[str, str] = {}
+            changed = 0
+            try:
+                for key, record, parent in file_source_service.iter_file_records(path):
+                    progress.check_cancelled()
+                    passages = file_source_service.record_passages(record, parent, Config.FILE_SOURCE_PASSAGE_WORDS,
+                                                                   Config.FILE_SOURCE_PASSAGE_OVERLAP_WORDS)
+                    if not passages:
+                        failed += 1
+                        progress.advance(failed=1)
+                        self._log_error("File Record Without Text", f"{source_name}:{key}", str(record)[:100])
+                        continue
+                    record_hash = file_source_service.passages_hash(passages)
+                    if previous.get(key) == record_hash and self.vector_store.get_document_by_source_id(
+                            file_source_service.passage_source_id(source_name, key, record_hash, 0)):
+                        records[key] = record_hash
+                        continue
+                    if self._embed_file_record(source_name, key, record, parent, passages, record_hash,
+                                               revised=previous.get(key, record_hash) != record_hash):
+                        records[key] = record_hash
+                        changed += 1
+                        processed += 1
+                        progress.advance(processed=1)
+                    else:
+                        failed += 1
+                        progress.advance(failed=1)
+            except ValueError as e:
+                # Records read before the error are kept; the file is read again on the next run.
+                logger.error(f"Failed to parse '{source_name}': {e}")
+                self._log_error("File Parse Failed", source_name, str(e))
+                failed += 1
+                progress.advance(failed=1)
+                continue
+            state.update(source_name, signature, records)
+            logger.info(f"'{source_name}': {changed} new or changed records embedded, {len(records) - changed} unchanged.")
+
+        logger.info(f"Finished local file embedding. Processed: {processed}, Failed: {failed}.")
+        return processed, failed
+
+    def _embed_file_record(self, source_name: str, key: str, record: Dict, parent: Optional[Dict], passages: List[str],
+                           record_hash: str, revised: bool) -> bool:
+        metadata = file_source_service.record_metadata(record, parent, source_name)
+        embedded = True
+        for number, passage in enumerate(passages):
+            passage_metadata = {**metadata, "passage": number + 1, "passages": len(passages)}
+            source_item_id = file_source_service.passage_source_id(source_name, key, record_hash, number)
+            embedded = self.embed_text_data(passage, passage_metadata, source_item_id, deduplicate=not revised) and embedded
+        return embedded
+
+    def embed_from_anime_api_list(self, section_name: str, items_list: List[Dict], fetch_full_details: bool,
+                                  progress=NULL_PROGRESS) -> Tuple[int, int]:
+        processed, failed = 0, 0
+        progress.stage(f"anime_{section_name}", total=len(items_list) if isinstance(items_list, list) else 0)
         if not isinstance(items_list, list):
             self._log_error("Invalid Item List", section_name, f"Expected a list, got {type(items_list)}")
             return 0, 0
 
         for item in items_list:
+            progress.check_cancelled()
             if self._process_and_embed_anime_item(item, section_name, fetch_full_details=fetch_full_details):
                 processed += 1
+                progress.advance(processed=1)
             else:
                 failed += 1
+                progress.advance(failed=1)
         return processed, failed
 
-    def embed_anime_api_by_category(self, categories: List[str], limit_per_category: int):
+    def embed_anime_api_by_category(self, categories: List[str], limit_per_category: int, progress=NULL_PROGRESS):
         logger.info(f"Starting embedding from Anime API for categories: {categories} with limit {limit_per_category}...")
+        self.residency.begin_batch_phase(ModelResidencyManager.KIND_EMBEDDING)
         total_processed, total_failed = 0, 0
-
-        for category in categories:
-            logger.info(f"--- Embedding Anime API Category: {category} ---")
-            cat_data, status = self.anime_controller.get_anime_by_category_data(category, page=1)
-            # The get_anime_by_category_data response is a dict with a 'data' key for the list
-            if status == 200 and isinstance(cat_data, dict):
-                items_to_process = cat_data.get('data', [])[:limit_per_category]
-                logger.info(f"Found {len(items_to_process)} items for category '{category}'.")
-                p, f = self.embed_from_anime_api_list(f"category_{category}", items_to_process, fetch_full_details=False)
-                total_processed += p
-                total_failed += f
-            else:
-                total_failed += 1
-                self._log_error("Category Fetch Failed", category, f"Status: {status}")
-
-        self._finalize_embedding_run(total_processed, total_failed)
-
-
-    def embed_all_data(self):
+        profiler = Profiler.shared()
+
+        with profiler.phase("ingest_anime_categories"):
+            for category in categories:
+                progress.check_cancelled()
+                logger.info(f"--- Embedding Anime API Category: {category} ---")
+                cat_data, status = self.anime_controller.get_anime_by_category_data(category, page=1)
+                # The get_anime_by_category_data response is a dict with a 'data' key for the list
+                if status == 200 and isinstance(cat_data, dict):
+                    items_to_process = cat_data.get('data', [])[:limit_per_category]
+                    logger.info(f"Found {len(items_to_process)} items for category '{category}'.")
+                    p, f = self.embed_from_anime_api_list(f"category_{category}", items_to_process, fetch_full_details=False,
+                                                          progress=progress)
+                    total_processed += p
+                    total_failed += f
+                else:
+                    total_failed += 1
+                    self._log_error("Category Fetch Failed", category, f"Status: {status}")
+                    progress.stage(f"anime_category_{category}")
+                    progress.advance(failed=1)
+
+        progress.stage("save")
+        with profiler.phase("ingest_save"):
+            self._finalize_embedding_run(total_processed, total_failed)
+
+
+    def embed_all_data(self, progress=NULL_PROGRESS):
+        """
+        Embeds every configured source. Items that are already in the store are skipped, so
+        running it again is an incremental refresh. `progress` (a job's JobProgress) receives
+        per-stage counts and stops the run between items once the job is cancelled.
+        """
         logger.info("Starting embedding of ALL data sources...")
         if os.path.exists(ERROR_LOG_FILE):
             os.remove(ERROR_LOG_FILE)
         self.error_summary.clear()
+        self.residency.begin_batch_phase(ModelResidencyManager.KIND_EMBEDDING)
 
         total_processed, total_failed = 0, 0
+        # Each phase is profiled separately when PROFILING_ENABLED is set.
+        profiler = Profiler.shared()
 
-        p, f = self.embed_one_piece_data()
+        with profiler.phase("ingest_one_piece"):
+            p, f = self.embed_one_piece_data(progress)
         total_processed += p; total_failed += f
 
-        home_data, status = self.anime_controller.get_home_page_data()
+        with profiler.phase("ingest_files"):
+            p, f = self.embed_file_sources(progress)
+        total_processed += p; total_failed += f
+
+        progress.check_cancelled()
+        progress.stage("anime_home_fetch")
+        with profiler.phase("ingest_anime_home_fetch"):
+            home_data, status = self.anime_controller.get_home_page_data()
 
         # --- DEFINITIVE FIX: Check status and type correctly, don't look for 'success' or 'results' keys ---
         if status == 200 and isinstance(home_data, dict):
-            logger.info("--- Embedding Anime API Section: Spotlights (Full Details) ---")
-            p, f = self.embed_from_anime_api_list('spotlights', home_data.get('spotlights', []), fetch_full_details=True)
-            total_processed += p; total_failed += f
-
-            for section in ['trending', 'top_airing', 'most_popular', 'most_favorite', 'latest_completed', 'latest_episode']:
-                logger.info(f"--- Embedding Anime API Section: {section} (Summary) ---")
-                p, f = self.embed_from_anime_api_list(section, home_data.get(section, []), fetch_full_details=False)
+            with profiler.phase("ingest_anime_sections"):
+                logger.info("--- Embedding Anime API Section: Spotlights (Full Details) ---")
+                p, f = self.embed_from_anime_api_list('spotlights', home_data.get('spotlights', []), fetch_full_details=True,
+                                                      progress=progress)
                 total_processed += p; total_failed += f
+
+                for section in ['trending', 'top_airing', 'most_popular', 'most_favorite', 'latest_completed', 'latest_episode']:
+                    logger.info(f"--- Embedding Anime API Section: {section} (Summary) ---")
+                    p, f = self.embed_from_anime_api_list(section, home_data.get(section, []), fetch_full_details=False,
+                                                          progress=progress)
+                    total_processed += p; total_failed += f
         else:
             total_failed += 1
             self._log_error("Home API Call Failed", "N/A", f"Status: {status}")
+            progress.advance(failed=1)
 
-        self._finalize_embedding_run(total_processed, total_failed)
+        progress.stage("save")
+        with profiler.phase("ingest_save"):
+            self._finalize_embedding_run(total_processed, total_failed)
 
     def _finalize_embedding_run(self, processed, failed):
         """Helper to log summary and save data."""
         logger.info("--- Data Embedding Summary ---")
         logger.info(f"Total Items Processed/Updated: {processed}")
         logger.info(f"Total Failed Items: {failed}")
+        if self.duplicate_counts:
+            logger.info(f"Duplicates merged as aliases instead of embedded: {dict(self.duplicate_counts)}")
+            for kind, count in self.duplicate_counts.items():
+                Metrics.shared().add("mushi_ingest_duplicates_total", count,
+                                     help_text="Ingested items merged into an existing document, by match kind.", kind=kind)
+            self.duplicate_counts.clear()
 
         self._write_error_log()
-        self.vector_store.save()
+        # A refresh that found nothing new has nothing to write.
+        if self.vector_store.has_unsaved_changes:
+            self.vector_store.save()
@@ -0,0 +1,330 @@
+# backend/services/file_source_service.py
+"""
+Offline corpora (JSON or JSONL files on disk) as a data source for DataEmbeddingService.
+
+Files are parsed incrementally, one record at a time, so memory use is bounded by the
+largest single record rather than by the file. Each record is turned into one or more
+passages: a short header (title, alternative titles, dates, what it belongs to) followed
+by a window of its long text, with consecutive windows overlapping. FileIngestState
+remembers each file's mtime and size and a hash of every record's passages, so a file
+that has not changed is skipped without being read, and in one that has, only the
+records whose passages changed are embedded again.
+"""
+import glob
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+READ_CHUNK_CHARS = 64 * 1024
+
+TITLE_FIELDS = ("title", "main_title", "name")
+TEXT_FIELDS = ("content", "description", "text", "body", "synopsis", "summary")
+KEY_FIELDS = ("id", "href", "url", "link", "title", "main_title", "name")
+URL_FIELDS = ("href", "url", "link")
+IMAGE_FIELDS = ("picture_url", "poster_url", "image_url", "image")
+DATE_FIELDS = ("datetime", "date", "published_at")
+ALIAS_FIELDS = ("alternative_titles", "aliases", "synonyms")
+# Alternative titles beyond this many add little to the embedding but crowd out the text.
+MAX_ALIASES_IN_HEADER = 12
+
+
+class _JsonReader:
+    """
+    Decodes a stream of JSON text piece by piece: the caller walks the structural
+    characters ('[', '{', ',', ':') and asks for complete values where it wants them.
+    The buffer only ever holds the unread part of the current read window, plus as much
+    of the file as the value being decoded needs.
+    """
+    def __init__(self, file, chunk_chars: int = READ_CHUNK_CHARS):
+        self._file = file
+        self._chunk_chars = chunk_chars
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+        self._consumed = 0  # Characters dropped from the front of the buffer, for error positions.
+
+    def _fill(self, chars: int) -> bool:
+        if self._eof:
+            return False
+        if self._pos > self._chunk_chars:
+            self._consumed += self._pos
+            self._buffer, self._pos = self._buffer[self._pos:], 0
+        data = self._file.read(chars)
+        if not data:
+            self._eof = True
+            return False
+        self._buffer += data
+        return True
+
+    def peek(self) -> str:
+        """The next non-whitespace character, without consuming it; '' at the end of the file."""
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in " \t\r\n":
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill(self._chunk_chars):
+                return ""
+
+    def expect(self, chars: str) -> str:
+        """Consumes the next non-whitespace character, which must be one of `chars`."""
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError(f"Expected one of {chars!r} at character {self._consumed + self._pos}, found {char or 'end of file'!r}.")
+        self._pos += 1
+        return char
+
+    def value(self) -> Any:
+        """Decodes the complete JSON value that starts at the next non-whitespace character."""
+        if not self.peek():
+            raise ValueError("Expected a JSON value, found the end of the file.")
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError as e:
+                # Most likely the value continues past the buffer; read on (in growing steps,
+                # so a large value is not re-decoded once per chunk) and try again.
+                if self._fill(max(self._chunk_chars, len(self._buffer) - self._pos)):
+                    continue
+                raise ValueError(f"Invalid JSON at character {self._consumed + e.pos}: {e.msg}.") from e
+            # A number or literal running up to the end of the buffer may be cut short.
+            if end == len(self._buffer) and self._fill(self._chunk_chars):
+                continue
+            self._pos = end
+            return value
+
+
+def iter_json_items(path: str, chunk_chars: int = READ_CHUNK_CHARS) -> Iterator[Tuple[Tuple[Any, ...], Any]]:
+    """
+    Streams the items of a JSON or JSONL file as (path, value) pairs:
+    - a top-level array yields ((index,), element) for each element;
+    - a top-level object yields ((key,), value) for each member, except that members
+      holding arrays are streamed too, as ((key, index), element);
+    - JSONL (or any sequence of whitespace-separated values) yields ((line,), value).
+    An empty file yields nothing. Malformed JSON raises ValueError.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        reader = _JsonReader(f, chunk_chars)
+        first = reader.peek()
+        if not first:
+            return
+        if path.endswith(('.jsonl', '.ndjson')) or first not in "[{":
+            position = 0
+            while reader.peek():
+                yield (position,), reader.value()
+                position += 1
+            return
+        if first == "[":
+            yield from (((index,), value) for index, value in _iter_array(reader))
+        else:
+            reader.expect("{")
+            if reader.peek() == "}":
+                reader.expect("}")
+            else:
+                while True:
+                    key = reader.value()
+                    reader.expect(":")
+                    if reader.peek() == "[":
+                        for index, value in _iter_array(reader):
+                            yield (key, index), value
+                    else:
+                        yield (key,), reader.value()
+                    if reader.expect(",}") == "}":
+                        break
+        if reader.peek():
+            raise ValueError(f"Unexpected data after the top-level JSON value in {path}.")
+
+
+def _iter_array(reader: _JsonReader) -> Iterator[Tuple[int, Any]]:
+    reader.expect("[")
+    if reader.peek() == "]":
+        reader.expect("]")
+        return
+    index = 0
+    while True:
+        yield index, reader.value()
+        index += 1
+        if reader.expect(",]") == "]":
+            return
+
+
+def iter_file_records(path: str) -> Iterator[Tuple[str, Dict[str, Any], Optional[Dict[str, Any]]]]:
+    """
+    (record key, record, parent) for every record in a file. Records are the objects of
+    a top-level array or of a JSONL file. A top-level object is one record itself (yielded
+    last, once all its members are known), and each object in one of its arrays is a
+    record of its own whose parent is the object's fields read so far. Arrays of plain
+    values (alternative titles, genres) stay on their record as lists.
+    """
+    root: Dict[str, Any] = {}
+    is_object = False
+    for item_path, value in iter_json_items(path):
+        if isinstance(item_path[0], int):
+            if isinstance(value, dict):
+                yield _record_key(value, str(item_path[0])), value, None
+            continue
+        is_object = True
+        if len(item_path) == 1:
+            root[item_path[0]] = value
+        elif isinstance(value, dict):
+            member, index = item_path
+            yield f"{member}/{_record_key(value, str(index))}", {**value, "_member": member}, root
+        else:
+            root.setdefault(item_path[0], []).append(value)
+    if is_object:
+        yield _record_key(root, "root"), root, None
+
+
+def _first(record: Dict[str, Any], fields: Tuple[str, ...]) -> Optional[Any]:
+    for field in fields:
+        value = record.get(field)
+        if value not in (None, "", []):
+            return value
+    return None
+
+
+def _record_key(record: Dict[str, Any], fallback: str) -> str:
+    """A key that survives records being inserted or reordered: the record's id, URL or title if it has one."""
+    value = _first(record, KEY_FIELDS)
+    return str(value).strip() if value is not None else fallback
+
+
+def chunk_passages(text: str, passage_words: int, overlap_words: int) -> List[str]:
+    """Splits `text` into windows of `passage_words` words, each repeating the last `overlap_words` of the one before."""
+    words = text.split()
+    if len(words) <= passage_words:
+        return [" ".join(words)] if words else []
+    step = max(1, passage_words - overlap_words)
+    passages = []
+    for start in range(0, len(words), step):
+        passages.append(" ".join(words[start:start + passage_words]))
+        if start + passage_words >= len(words):
+            break
+    return passages
+
+
+def record_title(record: Dict[str, Any]) -> Optional[str]:
+    title = _first(record, TITLE_FIELDS)
+    return str(title).strip() if title is not None else None
+
+
+def record_passages(record: Dict[str, Any], parent: Optional[Dict[str, Any]], passage_words: int,
+                    overlap_words: int) -> List[str]:
+    """The texts to embed for a record: its header, followed by each passage of its long text in turn."""
+    title = record_title(record)
+    header = [f"Title: {title}"] if title else []
+    parent_title = record_title(parent) if parent else None
+    if parent_title:
+        header.append(f"About: {parent_title}" + (f" ({record['_member']})" if record.get("_member") else ""))
+    aliases = _first(record, ALIAS_FIELDS)
+    if isinstance(aliases, list):
+        header.append(f"Also known as: {', '.join(str(alias) for alias in aliases[:MAX_ALIASES_IN_HEADER])}")
+    if isinstance(record.get("type"), str) and record["type"].strip():
+        header.append(f"Type: {record['type'].strip()}")
+    date = _first(record, DATE_FIELDS)
+    if date is not None:
+        header.append(f"Date: {date}")
+
+    text = _first(record, TEXT_FIELDS)
+    passages = chunk_passages(str(text), passage_words, overlap_words) if text is not None else []
+    if not passages:
+        return ["\n".join(header)] if title else []
+    if len(passages) == 1:
+        return ["\n".join(header + [passages[0]])]
+    return ["\n".join(header + [f"Part {number} of {len(passages)}: {passage}"]) for number, passage in enumerate(passages, 1)]
+
+
+def record_metadata(record: Dict[str, Any], parent: Optional[Dict[str, Any]], source_name: str) -> Dict[str, Any]:
+    """Search metadata for a record's passages; 'passage' and 'passages' are added per passage by the caller."""
+    member = record.get("_member")
+    metadata = {"source": "Local Files", "type": f"file_{member}" if member else "file_record", "file": source_name}
+    title = record_title(record)
+    if title:
+        metadata["title"] = title
+    if parent and record_title(parent):
+        metadata["parent_title"] = record_title(parent)
+    url = _first(record, URL_FIELDS)
+    if isinstance(url, str):
+        metadata["url"] = url
+    image = _first(record, IMAGE_FIELDS) or (_first(parent, IMAGE_FIELDS) if parent else None)
+    if isinstance(image, str):
+        metadata["poster_url"] = image
+    date = _first(record, DATE_FIELDS)
+    if date is not None:
+        metadata["date"] = str(date)
+    return metadata
+
+
+def passages_hash(passages: List[str]) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for passage in passages:
+        digest.update(passage.encode('utf-8'))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def passage_source_id(source_name: str, record_key: str, record_hash: str, number: int) -> str:
+    """
+    The source_item_id of one passage. It includes the record's passage hash, so a changed
+    record gets new documents instead of being skipped as already ingested.
+    """
+    return f"file_{source_name}_{record_key}_{record_hash[:12]}_{number}"
+
+
+def discover_files(patterns: List[str], base_dir: str) -> List[str]:
+    """The files matching the configured paths or globs (relative ones are relative to `base_dir`), in order."""
+    paths = []
+    for pattern in patterns:
+        full_pattern = pattern if os.path.isabs(pattern) else os.path.join(base_dir, pattern)
+        for path in sorted(glob.glob(full_pattern)):
+            if os.path.isfile(path) and path not in paths:
+                paths.append(path)
+    return paths
+
+
+class FileIngestState:
+    """
+    What was ingested from each file: its mtime and size at the time, and the passage
+    hash of every record that was embedded successfully. Kept in a JSON file beside the
+    data, written atomically after each file.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.files: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.files = json.load(f).get("files", {})
+            except (OSError, ValueError) as e:
+                logger.warning(f"FileIngestState: Could not read '{path}', every file will be re-read: {e}")
+
+    @staticmethod
+    def file_signature(path: str) -> Dict[str, int]:
+        stat = os.stat(path)
+        return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+    def is_unchanged(self, source_name: str, signature: Dict[str, int]) -> bool:
+        entry = self.files.get(source_name)
+        return entry is not None and entry.get("mtime_ns") == signature["mtime_ns"] and entry.get("size") == signature["size"]
+
+    def records(self, source_name: str) -> Dict[str, str]:
+        return (self.files.get(source_name) or {}).get("records", {})
+
+    def update(self, source_name: str, signature: Dict[str, int], records: Dict[str, str]):
+        self.files[source_name] = {**signature, "records": records}
+        self.save()
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({"files": self.files}, f)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            logger.error(f"FileIngestState: Failed to write '{self.path}': {e}")
@@ -1,13 +1,30 @@
 # backend/services/gemini_llm_service.py
-import google.generativeai as genai
+import json
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Generator, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
 from config import Config
-import os
+from services.llm_provider import LLMProvider
+
+logger = logging.getLogger(__name__)
+
 
-class GeminiLLMService:
+class GeminiLLMService(LLMProvider):
     """
     Service class for interacting with the Google Gemini LLM API.
-    Handles content generation based on prompts and user messages.
+
+    Talks to the Gemini REST API (`generateContent` / `streamGenerateContent` over SSE)
+    through one pooled `requests.Session`, so connections are reused across calls and the
+    base URL can point at a local stand-in for testing.
     """
+    provider_key = "gemini"
+    supports_context = False
+
     # System instruction/persona for Mushi. This guides the LLM's overall behavior.
     # This will be prepended to every user query to ensure consistent persona and style.
     MUSHI_SYSTEM_PROMPT = """
@@ -23,20 +40,125 @@ When you generate any text, follow these rules to sound like a real person, not
 - **Be direct:** Just say what you mean. No extra words needed.
 - **Natural flow:** It's totally fine to start sentences with "and," "but," or "so."
 - **Real voice:** Don't force enthusiasm.
+
+### FORMAT
+- Start your answer with a single mood tag: `<mood>happy</mood>`. Valid moods are: happy, excited, thinking, giggle, curious, error.
+- Just say the full, official titles of anime naturally. **DO NOT** add `[LINK:...]` tags yourself.
 """
 
-    _initialized = False
+    SPOILER_SHIELD_PROMPT = (
+        "\n\n**SPOILER ALERT:** If your response contains any major plot spoilers, "
+        "character deaths, significant reveals, or future events that might "
+        "ruin the experience for someone not caught up, you MUST wrap that specific "
+        "spoiler information within `<spoiler>...</spoiler>` tags. "
+        "For example: `Luffy's dream is to <spoiler>become Joyboy</spoiler>!` "
+        "Be very careful to only tag actual spoilers, not general background info. "
+        "Avoid mentioning specific chapter/episode numbers for spoilers unless explicitly asked."
+    )
+
+    # What callers (and through them the browser) see when a request fails; the details are only logged.
+    REQUEST_FAILED_MESSAGE = "Error: The Gemini request failed. Please try again later."
+
+    _shared_instance: Optional["GeminiLLMService"] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, model_name: Optional[str] = None, api_key: Optional[str] = None, base_url: Optional[str] = None):
+        self.model_name = model_name or Config.GEMINI_MODEL
+        self.api_key = api_key or Config.GEMINI_API_KEY
+        self.base_url = (base_url or Config.GEMINI_BASE_URL).rstrip('/')
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=Config.GEMINI_POOL_MAXSIZE, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        # The key goes in a header, never the query string: request URLs end up in exception
+        # messages and logs, and those must not carry it.
+        self.session.headers.update({'Content-Type': 'application/json'})
+        if self.api_key:
+            self.session.headers['x-goog-api-key'] = self.api_key
 
     @classmethod
-    def initialize_gemini(cls):
-        if not cls._initialized:
-            api_key = os.getenv("GEMINI_API_KEY") or Config.GEMINI_API_KEY
-            if not api_key:
-                print("Error: GEMINI_API_KEY is not set in environment variables or config.py.")
-                return False
-            genai.configure(api_key=api_key)
-            cls._initialized = True
-        return True
+    def shared(cls) -> "GeminiLLMService":
+        if cls._shared_instance is None:
+            with cls._shared_lock:
+                if cls._shared_instance is None:
+                    cls._shared_instance = cls()
+        return cls._shared_instance
+
+    def is_available(self) -> bool:
+        return bool(self.api_key)
+
+    def _redact(self, text: str) -> str:
+        """Strips the API key from text bound for the logs, in case a proxy or redirect echoed it back."""
+        return text.replace(self.api_key, "***") if self.api_key else text
+
+    def _endpoint(self, method: str) -> str:
+        return f"{self.base_url}/v1beta/models/{self.model_name}:{method}"
+
+    def _payload(self, prompt: str, system_prompt: Optional[str]) -> Dict[str, Any]:
+        return {
+            "systemInstruction": {"parts": [{"text": system_prompt or self.MUSHI_SYSTEM_PROMPT}]},
+            "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+        }
+
+    @staticmethod
+    def _candidate_text(response_json: Dict[str, Any]) -> str:
+        candidates = response_json.get("candidates") or []
+        if not candidates:
+            return ""
+        parts = (candidates[0].get("content") or {}).get("parts") or []
+        return "".join(part.get("text", "") for part in parts)
+
+    def stream_formatted_response(self, user_prompt_with_context: str,
+                                  on_complete: Optional[Callable[[Dict[str, Any]], None]] = None,
+                                  is_spoiler_shield_active: bool = False, **options) -> Generator[str, None, None]:
+        if not self.is_available():
+            yield "Error: Gemini API not configured due to missing API key."
+            return
+
+        system_prompt = self.MUSHI_SYSTEM_PROMPT + (self.SPOILER_SHIELD_PROMPT if is_spoiler_shield_active else "")
+        started_at = time.perf_counter()
+        usage = {}
+        try:
+            with self.session.post(self._endpoint("streamGenerateContent"), params={"alt": "sse"},
+                                   json=self._payload(user_prompt_with_context, system_prompt),
+                                   timeout=Config.GEMINI_TIMEOUT, stream=True) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if not line or not line.startswith(b"data:"):
+                        continue
+                    try:
+                        event = json.loads(line[5:].decode('utf-8'))
+                    except json.JSONDecodeError:
+                        continue
+                    usage = event.get("usageMetadata") or usage
+                    text = self._candidate_text(event)
+                    if text:
+                        yield text
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Gemini streaming request failed: {type(e).__name__}: {self._redact(str(e))}")
+            yield self.REQUEST_FAILED_MESSAGE
+            return
+
+        if on_complete:
+            on_complete({
+                "prompt_eval_count": usage.get("promptTokenCount"),
+                "eval_count": usage.get("candidatesTokenCount"),
+                "total_duration": int((time.perf_counter() - started_at) * 1e9),
+            })
+
+    def get_simple_response(self, prompt: str, system_prompt: Optional[str] = None, **options) -> Optional[str]:
+        if not self.is_available():
+            return "Error: Gemini API not configured due to missing API key."
+        try:
+            response = self.session.post(self._endpoint("generateContent"), json=self._payload(prompt, system_prompt), timeout=Config.GEMINI_TIMEOUT)
+            response.raise_for_status()
+            return self._candidate_text(response.json()).strip()
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Gemini request failed: {type(e).__name__}: {self._redact(str(e))}")
+            return self.REQUEST_FAILED_MESSAGE
+        except ValueError:
+            logger.error(f"Failed to decode JSON response from Gemini. Response: {response.text[:500]}")
+            return "Error: Gemini returned a response that could not be read."
 
     @staticmethod
     def generate_content(user_message: str, is_spoiler_shield_active: bool = False) -> str | None:
@@ -48,34 +170,8 @@ When you generate any text, follow these rules to sound like a real person, not
             is_spoiler_shield_active (bool): True if the spoiler shield is active, False otherwise.
 
         Returns:
-            str | None: The generated text from Gemini, or None if an error occurs.
+            str | None: The generated text from Gemini, or an error message.
         """
-        if not GeminiLLMService.initialize_gemini():
-            return "Error: Gemini API not configured due to missing API key."
-
-        # Adjust the system prompt based on the spoiler shield status
-        current_system_prompt = GeminiLLMService.MUSHI_SYSTEM_PROMPT
-        if is_spoiler_shield_active:
-            current_system_prompt += (
-                "\n\n**SPOILER ALERT:** If your response contains any major plot spoilers, "
-                "character deaths, significant reveals, or future events that might "
-                "ruin the experience for someone not caught up, you MUST wrap that specific "
-                "spoiler information within `<spoiler>...</spoiler>` tags. "
-                "For example: `Luffy's dream is to <spoiler>become Joyboy</spoiler>!` "
-                "Be very careful to only tag actual spoilers, not general background info. "
-                "Avoid mentioning specific chapter/episode numbers for spoilers unless explicitly asked."
-            )
-
-        full_prompt = f"{current_system_prompt}\n\nUser's request: {user_message}"
-
-        try:
-            model = genai.GenerativeModel('models/gemini-1.5-pro-latest')
-            response = model.generate_content(full_prompt)
-            return response.text
-
-        except genai.types.StopCandidateException as e:
-            print(f"Gemini API safety settings blocked content: {e}")
-            return "I'm sorry, I cannot generate a response for that request due to safety guidelines."
-        except Exception as e:
-            print(f"An unexpected error occurred during Gemini content generation: {e}")
-            return "An error occurred while generating content with Gemini. Please try again."
+        service = GeminiLLMService.shared()
+        system_prompt = service.MUSHI_SYSTEM_PROMPT + (service.SPOILER_SHIELD_PROMPT if is_spoiler_shield_active else "")
+        return service.get_simple_response(user_message, system_prompt=system_prompt)
@@ -0,0 +1,385 @@
+# backend/services/job_service.py
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the development server runs there, in a single process.
+    fcntl = None
+
+from services.metrics_service import Metrics
+
+logger = logging.getLogger(__name__)
+
+
+class JobCancelled(Exception):
+    """Raised inside a running job's handler once its cancellation has been requested."""
+
+
+class JobProgress:
+    """
+    Handed to a running job's handler. The handler names the stage it is in and counts the
+    items it processed or failed there; check_cancelled() raises JobCancelled once somebody
+    has cancelled the job, so handlers call it between items.
+    """
+    # Progress is written to the job file at most this often.
+    FLUSH_INTERVAL_SECONDS = 1.0
+
+    def __init__(self, runner: "JobRunner", job_id: str):
+        self._runner = runner
+        self.job_id = job_id
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self.current_stage: Optional[str] = None
+        self.cancel_requested = False
+        self._last_flush = 0.0
+
+    def stage(self, name: str, total: Optional[int] = None):
+        """Starts stage `name`; the previous stage counts as done."""
+        self._close_stage("done")
+        self.stages[name] = {"state": "running", "processed": 0, "failed": 0, "total": total}
+        self.current_stage = name
+        self._flush(force=True)
+
+    def advance(self, processed: int = 0, failed: int = 0):
+        if self.current_stage is None:
+            self.stage("main")
+        counts = self.stages[self.current_stage]
+        counts["processed"] += processed
+        counts["failed"] += failed
+        self._flush()
+
+    def check_cancelled(self):
+        self._flush()
+        if self.cancel_requested:
+            raise JobCancelled(f"Job {self.job_id} was cancelled.")
+
+    def _close_stage(self, state: str):
+        if self.current_stage is not None and self.stages[self.current_stage]["state"] == "running":
+            self.stages[self.current_stage]["state"] = state
+        self.current_stage = None
+
+    def _flush(self, force: bool = False):
+        now = time.monotonic()
+        if force or now - self._last_flush >= self.FLUSH_INTERVAL_SECONDS:
+            self._last_flush = now
+            # The write also picks up a cancellation requested from another worker process.
+            if self._runner._save_progress(self.job_id, self.stages):
+                self.cancel_requested = True
+
+
+class _NullProgress:
+    """Stands in for JobProgress when ingestion runs outside the job runner (e.g. build_database.py)."""
+    def stage(self, name: str, total: Optional[int] = None):
+        pass
+
+    def advance(self, processed: int = 0, failed: int = 0):
+        pass
+
+    def check_cancelled(self):
+        pass
+
+
+NULL_PROGRESS = _NullProgress()
+
+
+class JobRunner:
+    """
+    A small persistent job queue for work too slow to run inside a request (ingestion,
+    cluster pre-computation).
+
+    Jobs live in a JSON file (JOB_STORE_PATH), so queued work and the job history survive
+    restarts; a job that was running when its process died is queued again, which is safe
+    because ingestion skips documents that are already embedded. Jobs run one at a time on
+    a background thread. Under gunicorn every worker can submit, list and cancel jobs
+    through the file, while a lock file makes exactly one process execute them.
+
+    With `update_interval_minutes`, a scheduler submits `scheduled_kind` whenever that long
+    has passed since it last ran (or since any kind in `resets_schedule` last succeeded).
+    """
+    QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = "queued", "running", "succeeded", "failed", "cancelled"
+    ACTIVE_STATES = (QUEUED, RUNNING)
+
+    def __init__(self, store_path: str, history_limit: int = 50, poll_seconds: float = 2.0,
+                 update_interval_minutes: int = 0):
+        self.store_path = store_path
+        self.history_limit = history_limit
+        self.poll_seconds = poll_seconds
+        self.update_interval_seconds = update_interval_minutes * 60
+        self._handlers: Dict[str, Callable[[Dict[str, Any], JobProgress], Optional[str]]] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._runner_lock_file = None
+        self._threads: List[threading.Thread] = []
+        self._running_progress: Optional[JobProgress] = None
+        self.scheduled_kind: Optional[str] = None
+        self.resets_schedule: Tuple[str, ...] = ()
+
+    def register(self, kind: str, handler: Callable[[Dict[str, Any], JobProgress], Optional[str]]):
+        """`handler(params, progress)` does the work and may return a summary message."""
+        self._handlers[kind] = handler
+
+    # --- Job file ---
+
+    @contextmanager
+    def _locked_state(self):
+        """Yields the parsed job file and writes it back afterwards, under a cross-process lock."""
+        with self._lock:
+            directory = os.path.dirname(self.store_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(f"{self.store_path}.lock", 'w') as lock_file:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                state = self._read_state()
+                yield state
+                tmp_path = f"{self.store_path}.tmp"
+                with open(tmp_path, 'w') as f:
+                    json.dump(state, f, indent=2)
+                os.replace(tmp_path, self.store_path)
+
+    def _read_state(self) -> Dict[str, Any]:
+        try:
+            with open(self.store_path, 'r') as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            state = {}
+        except json.JSONDecodeError:
+            logger.error(f"JobRunner: Job file {self.store_path} is corrupted; starting with an empty queue.")
+            state = {}
+        state.setdefault("jobs", [])
+        state.setdefault("schedule", {})
+        return state
+
+    def _prune(self, state: Dict[str, Any]):
+        finished = [job for job in state["jobs"] if job["state"] not in self.ACTIVE_STATES]
+        excess = len(finished) - self.history_limit
+        if excess > 0:
+            dropped = {job["id"] for job in finished[:excess]}
+            state["jobs"] = [job for job in state["jobs"] if job["id"] not in dropped]
+
+    @staticmethod
+    def _find(state: Dict[str, Any], job_id: str) -> Optional[Dict[str, Any]]:
+        return next((job for job in state["jobs"] if job["id"] == job_id), None)
+
+    # --- Public API ---
+
+    def submit(self, kind: str, params: Optional[Dict[str, Any]] = None, trigger: str = "api") -> Tuple[Dict[str, Any], bool]:
+        """
+        Queues a job and returns it with True. If an identical job (same kind and params) is
+        already queued or running, that job is returned with False instead.
+        """
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind '{kind}'.")
+        params = params or {}
+        with self._locked_state() as state:
+            for job in state["jobs"]:
+                if job["kind"] == kind and job["params"] == params and job["state"] in self.ACTIVE_STATES:
+                    return dict(job), False
+            job = {
+                "id": uuid.uuid4().hex,
+                "kind": kind,
+                "params": params,
+                "trigger": trigger,
+                "state": self.QUEUED,
+                "created_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "attempts": 0,
+                "cancel_requested": False,
+                "stages": {},
+                "result": None,
+                "error": None,
+            }
+            state["jobs"].append(job)
+        logger.info(f"JobRunner: Queued job {job['id']} ({kind}, trigger: {trigger}).")
+        self._wake.set()
+        return dict(job), True
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self._find(self._read_state(), job_id)
+
+    def list_jobs(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """The most recent jobs first."""
+        return list(reversed(self._read_state()["jobs"]))[:limit]
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Cancels a queued job at once; a running job is asked to stop and ends as cancelled at
+        its next check. Finished jobs are returned unchanged.
+        """
+        with self._locked_state() as state:
+            job = self._find(state, job_id)
+            if job is None:
+                return None
+            if job["state"] == self.QUEUED:
+                job["state"], job["finished_at"] = self.CANCELLED, time.time()
+            elif job["state"] == self.RUNNING:
+                job["cancel_requested"] = True
+            job = dict(job)
+        progress = self._running_progress
+        if progress is not None and progress.job_id == job_id:
+            progress.cancel_requested = True
+        return job
+
+    def get_status(self) -> Dict[str, Any]:
+        state = self._read_state()
+        counts: Dict[str, int] = {}
+        for job in state["jobs"]:
+            counts[job["state"]] = counts.get(job["state"], 0) + 1
+        return {
+            "executing_here": self._runner_lock_file is not None,
+            "jobs": counts,
+            "schedule": {
+                "kind": self.scheduled_kind,
+                "interval_minutes": self.update_interval_seconds / 60 if self.scheduled_kind else None,
+                "next_run_at": self._next_scheduled_run(state),
+            },
+        }
+
+    # --- Execution ---
+
+    def start(self, is_ready: Callable[[], bool] = lambda: True, scheduled_kind: Optional[str] = None,
+              resets_schedule: Tuple[str, ...] = ()):
+        """
+        Starts executing jobs in this process, unless another process already does. Jobs
+        wait until `is_ready()` (e.g. the vector store has loaded). Starting twice is a no-op.
+        """
+        with self._lock:
+            if self._runner_lock_file is not None:
+                return
+            if not self._acquire_runner_lock():
+                logger.info("JobRunner: Another process executes the job queue; this one only submits jobs.")
+                return
+        self.scheduled_kind = scheduled_kind if self.update_interval_seconds > 0 else None
+        self.resets_schedule = resets_schedule
+
+        with self._locked_state() as state:
+            for job in state["jobs"]:
+                if job["state"] == self.RUNNING:
+                    logger.warning(f"JobRunner: Job {job['id']} ({job['kind']}) was interrupted by a restart; queuing it again.")
+                    job["state"] = self.CANCELLED if job["cancel_requested"] else self.QUEUED
+            if self.scheduled_kind:
+                # Without any history, the first scheduled run is one interval after the first start.
+                state["schedule"].setdefault(self.scheduled_kind, time.time())
+
+        self._stop.clear()
+        self._threads = [threading.Thread(target=self._worker_loop, args=(is_ready,), name="job-runner", daemon=True)]
+        if self.scheduled_kind:
+            self._threads.append(threading.Thread(target=self._scheduler_loop, name="job-scheduler", daemon=True))
+        for thread in self._threads:
+            thread.start()
+        logger.info(f"JobRunner: Executing jobs from {self.store_path}"
+                    + (f"; '{self.scheduled_kind}' runs every {self.update_interval_seconds / 60:g} minutes." if self.scheduled_kind else "."))
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _acquire_runner_lock(self) -> bool:
+        directory = os.path.dirname(self.store_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        lock_file = open(f"{self.store_path}.runner.lock", 'w')
+        if fcntl:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                return False
+        # Held for the life of the process; the OS releases it if the process dies.
+        self._runner_lock_file = lock_file
+        return True
+
+    def _claim_next(self) -> Optional[Dict[str, Any]]:
+        with self._locked_state() as state:
+            job = next((job for job in state["jobs"] if job["state"] == self.QUEUED), None)
+            if job is None:
+                return None
+            job.update(state=self.RUNNING, started_at=time.time(), attempts=job["attempts"] + 1, stages={})
+            return dict(job)
+
+    def _worker_loop(self, is_ready: Callable[[], bool]):
+        while not self._stop.is_set():
+            self._wake.wait(self.poll_seconds)
+            self._wake.clear()
+            if self._stop.is_set() or not is_ready():
+                continue
+            while not self._stop.is_set():
+                job = self._claim_next()
+                if job is None:
+                    break
+                self._run(job)
+
+    def _run(self, job: Dict[str, Any]):
+        progress = JobProgress(self, job["id"])
+        self._running_progress = progress
+        logger.info(f"JobRunner: Starting job {job['id']} ({job['kind']}, attempt {job['attempts']}).")
+        started_at = time.monotonic()
+        result, error = None, None
+        try:
+            handler = self._handlers.get(job["kind"])
+            if handler is None:
+                raise ValueError(f"No handler is registered for job kind '{job['kind']}'.")
+            progress.check_cancelled()
+            result = handler(job["params"], progress)
+            final_state, stage_state = self.SUCCEEDED, "done"
+        except JobCancelled:
+            final_state, stage_state = self.CANCELLED, "cancelled"
+        except Exception as e:
+            logger.error(f"JobRunner: Job {job['id']} ({job['kind']}) failed: {e}", exc_info=True)
+            final_state, stage_state, error = self.FAILED, "failed", str(e)
+        finally:
+            self._running_progress = None
+        progress._close_stage(stage_state)
+
+        with self._locked_state() as state:
+            stored = self._find(state, job["id"])
+            if stored is not None:
+                stored.update(state=final_state, finished_at=time.time(), stages=progress.stages, result=result, error=error)
+            # A failed scheduled run also waits a full interval before the next attempt.
+            if job["kind"] == self.scheduled_kind or (final_state == self.SUCCEEDED and job["kind"] in self.resets_schedule):
+                state["schedule"][self.scheduled_kind] = time.time()
+            self._prune(state)
+        Metrics.shared().add("mushi_jobs_total", help_text="Background jobs finished, by kind and final state.",
+                             kind=job["kind"], state=final_state)
+        logger.info(f"JobRunner: Job {job['id']} ({job['kind']}) {final_state} after {time.monotonic() - started_at:.1f}s.")
+
+    def _save_progress(self, job_id: str, stages: Dict[str, Dict[str, Any]]) -> bool:
+        """Stores a running job's stage counts; returns whether its cancellation was requested."""
+        with self._locked_state() as state:
+            job = self._find(state, job_id)
+            if job is None:
+                return False
+            job["stages"] = stages
+            return job["cancel_requested"]
+
+    # --- Scheduling ---
+
+    def _next_scheduled_run(self, state: Dict[str, Any]) -> Optional[float]:
+        if not self.scheduled_kind:
+            return None
+        last_run = state["schedule"].get(self.scheduled_kind)
+        return last_run + self.update_interval_seconds if last_run is not None else None
+
+    def _scheduler_loop(self):
+        check_seconds = min(60.0, max(1.0, self.update_interval_seconds / 10))
+        while not self._stop.wait(check_seconds):
+            try:
+                state = self._read_state()
+                next_run = self._next_scheduled_run(state)
+                if next_run is None or time.time() < next_run:
+                    continue
+                if any(job["kind"] == self.scheduled_kind and job["state"] in self.ACTIVE_STATES for job in state["jobs"]):
+                    continue
+                self.submit(self.scheduled_kind, trigger="schedule")
+            except Exception as e:
+                logger.error(f"JobRunner: Scheduler check failed: {e}", exc_info=True)
@@ -0,0 +1,33 @@
+# backend/services/llm_provider.py
+from typing import Any, Callable, Dict, Generator, Optional
+
+
+class LLMProvider:
+    """
+    The interface every generation backend (local Ollama, cloud Gemini) implements, so the
+    chat pipeline and the router can treat them interchangeably.
+
+    Provider-specific options (Ollama's `keep_alive`, `context` or scheduler `ticket`) are
+    passed as keyword arguments and ignored by providers that do not support them.
+    """
+    provider_key: str = ""
+    # Whether stream_formatted_response accepts a previous conversation `context` to continue from.
+    supports_context: bool = False
+    model_name: str = ""
+
+    def stream_formatted_response(self, user_prompt_with_context: str,
+                                  on_complete: Optional[Callable[[Dict[str, Any]], None]] = None,
+                                  **options) -> Generator[str, None, None]:
+        """
+        Yields the raw response text chunk by chunk. Failures are yielded as a single chunk
+        starting with "Error:". `on_complete` receives provider usage stats when done.
+        """
+        raise NotImplementedError
+
+    def get_simple_response(self, prompt: str, system_prompt: Optional[str] = None, **options) -> Optional[str]:
+        """Returns the whole response at once, or a string starting with "Error:"."""
+        raise NotImplementedError
+
+    def is_available(self) -> bool:
+        """A cheap, non-blocking check that the provider can take requests right now."""
+        raise NotImplementedError
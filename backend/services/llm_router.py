@@ -0,0 +1,144 @@
+# backend/services/llm_router.py
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from config import Config
+from services.llm_provider import LLMProvider
+from services.llm_scheduler import LLMScheduler, LLMSchedulerBusyError
+
+logger = logging.getLogger(__name__)
+
+
+class LLMRouter:
+    """
+    Chooses which provider serves a chat turn.
+
+    The selected provider (Config.CURRENT_GENERATION_LLM) is used whenever it can answer
+    promptly. A request goes to the fallback provider instead when:
+    - the selected provider is unreachable (e.g. Ollama's circuit is open);
+    - its local queue already holds `overflow_queue_depth` interactive requests, or would reject this one;
+    - its recent time-to-first-token (an exponentially weighted average) is above `max_first_token_seconds`.
+      While it is, one turn every `slow_probe_seconds` still goes to the selected provider, so a
+      single slow turn (a cold model load) does not keep it excluded: the probe's sample brings
+      the average back down once it answers promptly again.
+    The controller also retries on the fallback when a stream fails before its first token.
+    """
+    EWMA_WEIGHT = 0.3
+
+    def __init__(self, providers: Dict[str, LLMProvider], fallback_key: Optional[str] = None,
+                 overflow_queue_depth: int = 4, max_first_token_seconds: float = 20.0, slow_probe_seconds: float = 60.0):
+        self.providers = providers
+        self.fallback_key = fallback_key or None
+        self.overflow_queue_depth = overflow_queue_depth
+        self.max_first_token_seconds = max_first_token_seconds
+        self.slow_probe_seconds = slow_probe_seconds
+        self._lock = threading.Lock()
+        self._first_token_ewma: Dict[str, float] = {}
+        self._last_slow_probe: Dict[str, float] = {}
+        self._stats: Dict[str, Dict[str, int]] = {key: {} for key in providers}
+
+    def get(self, provider_key: str) -> Optional[LLMProvider]:
+        return self.providers.get(provider_key)
+
+    def fallback_for(self, provider_key: str) -> Optional[str]:
+        """The available fallback for a provider, or None."""
+        fallback = self.providers.get(self.fallback_key) if self.fallback_key else None
+        if fallback is None or self.fallback_key == provider_key or not fallback.is_available():
+            return None
+        return self.fallback_key
+
+    def _count(self, provider_key: str, reason: str):
+        with self._lock:
+            counts = self._stats.setdefault(provider_key, {})
+            counts[reason] = counts.get(reason, 0) + 1
+
+    def _route(self, provider_key: str, reason: str, ticket=None) -> Dict[str, Any]:
+        self._count(provider_key, reason)
+        if reason != "selected":
+            logger.info(f"LLMRouter: Routing chat to '{provider_key}' ({reason}).")
+        return {"provider": provider_key, "reason": reason, "ticket": ticket}
+
+    def reserve_chat(self, preferred_key: str) -> Dict[str, Any]:
+        """
+        Returns {"provider", "reason", "ticket"} for one chat turn. The ticket is a reserved
+        local scheduler slot (None for providers that are not scheduled locally).
+        Raises ValueError for an unknown provider and LLMSchedulerBusyError when the
+        selected provider is saturated and there is no fallback.
+        """
+        provider = self.providers.get(preferred_key)
+        if provider is None:
+            raise ValueError(f"No valid LLM provider configured. Current is '{preferred_key}'")
+        fallback_key = self.fallback_for(preferred_key)
+
+        if not provider.is_available() and fallback_key:
+            return self._route(fallback_key, "selected_unavailable")
+
+        scheduler: Optional[LLMScheduler] = getattr(provider, "scheduler", None)
+        if scheduler is None:
+            return self._route(preferred_key, "selected")
+
+        if fallback_key:
+            if scheduler.queue_depth(LLMScheduler.PRIORITY_INTERACTIVE) >= self.overflow_queue_depth:
+                return self._route(fallback_key, "overflow")
+            if self._is_slow(preferred_key):
+                return self._route(fallback_key, "slow")
+        try:
+            ticket = scheduler.submit(LLMScheduler.PRIORITY_INTERACTIVE)
+        except LLMSchedulerBusyError:
+            if fallback_key:
+                return self._route(fallback_key, "overflow")
+            raise
+        return self._route(preferred_key, "selected", ticket)
+
+    def _is_slow(self, provider_key: str) -> bool:
+        """True while the provider's first tokens are too slow, except for the periodic probe turn."""
+        with self._lock:
+            if self._first_token_ewma.get(provider_key, 0.0) <= self.max_first_token_seconds:
+                return False
+            now = time.monotonic()
+            # The interval starts when the provider is first found slow.
+            last_probe = self._last_slow_probe.setdefault(provider_key, now)
+            if now - last_probe < self.slow_probe_seconds:
+                return True
+            self._last_slow_probe[provider_key] = now
+        self._count(provider_key, "slow_probe")
+        return False
+
+    def record_first_token(self, provider_key: str, seconds: float):
+        """Records one turn's time to its first chunk."""
+        with self._lock:
+            previous = self._first_token_ewma.get(provider_key)
+            self._first_token_ewma[provider_key] = seconds if previous is None else (
+                self.EWMA_WEIGHT * seconds + (1 - self.EWMA_WEIGHT) * previous
+            )
+            if self._first_token_ewma[provider_key] <= self.max_first_token_seconds:
+                self._last_slow_probe.pop(provider_key, None)
+
+    def record_failure(self, provider_key: str) -> Optional[str]:
+        """Records a stream that failed before its first token; returns the provider to retry on, if any."""
+        self._count(provider_key, "failed_before_first_token")
+        fallback_key = self.fallback_for(provider_key)
+        if fallback_key:
+            self._route(fallback_key, "fallback")
+        return fallback_key
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "selected": Config.CURRENT_GENERATION_LLM,
+                "fallback": self.fallback_key,
+                "overflow_queue_depth": self.overflow_queue_depth,
+                "max_first_token_seconds": self.max_first_token_seconds,
+                "slow_probe_seconds": self.slow_probe_seconds,
+                "providers": {
+                    key: {
+                        "available": provider.is_available(),
+                        "model": provider.model_name,
+                        "first_token_seconds_ewma": round(self._first_token_ewma[key], 3) if key in self._first_token_ewma else None,
+                        "routes": dict(self._stats.get(key, {})),
+                    }
+                    for key, provider in self.providers.items()
+                },
+            }
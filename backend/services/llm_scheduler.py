@@ -0,0 +1,190 @@
+# backend/services/llm_scheduler.py
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class LLMSchedulerBusyError(Exception):
+    """Raised when a request is rejected because its queue is full, or it waited too long."""
+
+
+class LLMTicket:
+    """One request's place in the scheduler: queued, then running, then done (or cancelled)."""
+    QUEUED, RUNNING, DONE, CANCELLED = "queued", "running", "done", "cancelled"
+
+    def __init__(self, scheduler: "LLMScheduler", priority: int, sequence: int):
+        self.scheduler = scheduler
+        self.priority = priority
+        self.sequence = sequence
+        self.state = self.QUEUED
+        self.enqueued_at = time.monotonic()
+        self.granted_at: Optional[float] = None
+        self._granted = threading.Event()
+
+    def __lt__(self, other: "LLMTicket") -> bool:
+        return (self.priority, self.sequence) < (other.priority, other.sequence)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until the request may run; returns False if `timeout` passed first."""
+        return self._granted.wait(timeout)
+
+    def position(self) -> int:
+        return self.scheduler.queue_position(self)
+
+    def release(self):
+        """Frees the slot once the generation is over, or leaves the queue if it never started. Idempotent."""
+        self.scheduler.release(self)
+
+
+class LLMScheduler:
+    """
+    A single admission point for every Ollama generation in the process.
+
+    At most `max_in_flight` generations run at once; the rest wait in one priority queue
+    (interactive chat before follow-up suggestions before background titling, FIFO within
+    a class). Each class has its own queue-depth limit, past which new requests are
+    rejected immediately so the API can answer 503 instead of timing out. Releasing a
+    ticket that is still queued (e.g. the client disconnected) simply drops it.
+    """
+    PRIORITY_INTERACTIVE = 0
+    PRIORITY_SUGGESTIONS = 1
+    PRIORITY_BACKGROUND = 2
+    PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_SUGGESTIONS: "suggestions", PRIORITY_BACKGROUND: "background"}
+
+    LATENCY_SAMPLES = 1000
+
+    _shared_instance: Optional["LLMScheduler"] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, max_in_flight: Optional[int] = None, max_queue_depth: Optional[Dict[int, int]] = None):
+        self.max_in_flight = max_in_flight or Config.LLM_MAX_IN_FLIGHT
+        self.max_queue_depth = max_queue_depth or {
+            self.PRIORITY_INTERACTIVE: Config.LLM_QUEUE_DEPTH_INTERACTIVE,
+            self.PRIORITY_SUGGESTIONS: Config.LLM_QUEUE_DEPTH_SUGGESTIONS,
+            self.PRIORITY_BACKGROUND: Config.LLM_QUEUE_DEPTH_BACKGROUND,
+        }
+        self._lock = threading.Lock()
+        self._queue = []
+        self._sequence = itertools.count()
+        self._in_flight = 0
+        self._queued_by_priority = {priority: 0 for priority in self.PRIORITY_NAMES}
+        self._stats = {
+            priority: {
+                "admitted": 0, "rejected": 0, "cancelled": 0, "completed": 0,
+                "wait_seconds": deque(maxlen=self.LATENCY_SAMPLES),
+                "run_seconds": deque(maxlen=self.LATENCY_SAMPLES),
+            }
+            for priority in self.PRIORITY_NAMES
+        }
+
+    @classmethod
+    def shared(cls) -> "LLMScheduler":
+        if cls._shared_instance is None:
+            with cls._shared_lock:
+                if cls._shared_instance is None:
+                    cls._shared_instance = cls()
+        return cls._shared_instance
+
+    # --- Admission ---
+
+    def submit(self, priority: int) -> LLMTicket:
+        """Queues a request and returns its ticket. Raises LLMSchedulerBusyError if its queue is full."""
+        with self._lock:
+            ticket = LLMTicket(self, priority, next(self._sequence))
+            if self._queued_by_priority[priority] >= self.max_queue_depth[priority]:
+                self._stats[priority]["rejected"] += 1
+                raise LLMSchedulerBusyError(
+                    f"Too many queued {self.PRIORITY_NAMES[priority]} requests. Please try again shortly."
+                )
+            heapq.heappush(self._queue, ticket)
+            self._queued_by_priority[priority] += 1
+            self._stats[priority]["admitted"] += 1
+            self._dispatch()
+            return ticket
+
+    @contextmanager
+    def slot(self, priority: int, timeout: Optional[float] = None):
+        """Runs the block once a slot is free. Raises LLMSchedulerBusyError if rejected or timed out."""
+        ticket = self.submit(priority)
+        try:
+            if not ticket.wait(timeout if timeout is not None else Config.LLM_QUEUE_TIMEOUT_SECONDS):
+                raise LLMSchedulerBusyError(f"Timed out waiting for a free LLM slot ({self.PRIORITY_NAMES[priority]}).")
+            yield ticket
+        finally:
+            ticket.release()
+
+    def release(self, ticket: LLMTicket):
+        with self._lock:
+            stats = self._stats[ticket.priority]
+            if ticket.state == LLMTicket.RUNNING:
+                self._in_flight -= 1
+                stats["completed"] += 1
+                stats["run_seconds"].append(time.monotonic() - ticket.granted_at)
+                ticket.state = LLMTicket.DONE
+            elif ticket.state == LLMTicket.QUEUED:
+                # Left while still queued; it is skipped lazily when it reaches the heap top.
+                self._queued_by_priority[ticket.priority] -= 1
+                stats["cancelled"] += 1
+                ticket.state = LLMTicket.CANCELLED
+            else:
+                return
+            self._dispatch()
+
+    def _dispatch(self):
+        while self._in_flight < self.max_in_flight and self._queue:
+            ticket = heapq.heappop(self._queue)
+            if ticket.state != LLMTicket.QUEUED:
+                continue
+            self._queued_by_priority[ticket.priority] -= 1
+            self._in_flight += 1
+            ticket.state = LLMTicket.RUNNING
+            ticket.granted_at = time.monotonic()
+            self._stats[ticket.priority]["wait_seconds"].append(ticket.granted_at - ticket.enqueued_at)
+            ticket._granted.set()
+
+    def queue_depth(self, priority: int) -> int:
+        with self._lock:
+            return self._queued_by_priority[priority]
+
+    def queue_position(self, ticket: LLMTicket) -> int:
+        """1-based position among queued requests, 0 once running."""
+        with self._lock:
+            if ticket.state != LLMTicket.QUEUED:
+                return 0
+            return 1 + sum(1 for other in self._queue if other.state == LLMTicket.QUEUED and other < ticket)
+
+    # --- Metrics ---
+
+    @staticmethod
+    def _percentiles(samples) -> Dict[str, Optional[float]]:
+        if not samples:
+            return {"p50_ms": None, "p95_ms": None, "p99_ms": None}
+        ordered = sorted(samples)
+        pick = lambda fraction: round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000, 1)
+        return {"p50_ms": pick(0.50), "p95_ms": pick(0.95), "p99_ms": pick(0.99)}
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            classes = {}
+            for priority, name in self.PRIORITY_NAMES.items():
+                stats = self._stats[priority]
+                classes[name] = {
+                    "queued": self._queued_by_priority[priority],
+                    "max_queue_depth": self.max_queue_depth[priority],
+                    "admitted": stats["admitted"],
+                    "rejected": stats["rejected"],
+                    "cancelled": stats["cancelled"],
+                    "completed": stats["completed"],
+                    "queue_wait": self._percentiles(stats["wait_seconds"]),
+                    "generation": self._percentiles(stats["run_seconds"]),
+                }
+            return {"max_in_flight": self.max_in_flight, "in_flight": self._in_flight, "classes": classes}
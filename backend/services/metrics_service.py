@@ -0,0 +1,172 @@
+# backend/services/metrics_service.py
+import bisect
+import contextvars
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from config import Config
+
+# Upper bounds in seconds; from fast in-process stages up to full LLM generations.
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# Stages timed during the current request, for the optional Server-Timing header.
+_request_timings: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = contextvars.ContextVar("request_timings", default=None)
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ("metrics", "stage", "started_at")
+
+    def __init__(self, metrics: "Metrics", stage: str):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.observe(self.stage, time.perf_counter() - self.started_at)
+        return False
+
+
+class Metrics:
+    """
+    In-process latency histograms and counters, exported in the Prometheus text format.
+
+    Stages are timed with `with Metrics.shared().span("chat_retrieve"):` or reported with
+    observe() when a duration spans several calls (e.g. a stream's first token). When
+    METRICS_ENABLED is off, span() returns a shared no-op and observe()/add() return
+    straight away. Under gunicorn every worker keeps its own registry, so /metrics reports
+    the worker that answered the scrape.
+    """
+    STAGE_HISTOGRAM = "mushi_stage_duration_seconds"
+    REQUEST_HISTOGRAM = "mushi_http_request_duration_seconds"
+
+    _shared_instance: Optional["Metrics"] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, enabled: bool = True, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._help: Dict[str, str] = {
+            self.STAGE_HISTOGRAM: "Time spent in one stage of a request (embedding, search, upstream call, ...).",
+            self.REQUEST_HISTOGRAM: "Time from receiving a request until its response finished streaming.",
+        }
+        # name -> label values -> [bucket counts..., sum, count]
+        self._histograms: Dict[str, Dict[Tuple[Tuple[str, str], ...], list]] = {}
+        # name -> label values -> total
+        self._counters: Dict[str, Dict[Tuple[Tuple[str, str], ...], float]] = {}
+
+    @classmethod
+    def shared(cls) -> "Metrics":
+        if cls._shared_instance is None:
+            with cls._shared_lock:
+                if cls._shared_instance is None:
+                    cls._shared_instance = cls(enabled=Config.METRICS_ENABLED)
+        return cls._shared_instance
+
+    def span(self, stage: str):
+        """Times the enclosed block as `stage`."""
+        return _Span(self, stage) if self.enabled else _NOOP_SPAN
+
+    def observe(self, stage: str, seconds: float):
+        if not self.enabled:
+            return
+        self.observe_histogram(self.STAGE_HISTOGRAM, seconds, stage=stage)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((stage, seconds))
+
+    def observe_histogram(self, name: str, seconds: float, **labels: str):
+        if not self.enabled:
+            return
+        key = tuple(sorted(labels.items()))
+        bucket_index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            values = series.get(key)
+            if values is None:
+                values = series[key] = [0] * len(self.buckets) + [0.0, 0]
+            if bucket_index < len(self.buckets):
+                values[bucket_index] += 1
+            values[-2] += seconds
+            values[-1] += 1
+
+    def add(self, name: str, value: float = 1, help_text: Optional[str] = None, **labels: str):
+        """Increments counter `name` (Prometheus convention: ends in _total)."""
+        if not self.enabled:
+            return
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            if help_text and name not in self._help:
+                self._help[name] = help_text
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    # --- Per-request timings ---
+
+    def start_request(self):
+        if self.enabled:
+            _request_timings.set([])
+
+    def finish_request(self) -> List[Tuple[str, float]]:
+        """Returns the stages timed so far in this request and stops collecting them."""
+        timings = _request_timings.get()
+        _request_timings.set(None)
+        return timings or []
+
+    @staticmethod
+    def server_timing_header(timings: List[Tuple[str, float]]) -> str:
+        # Server-Timing durations are in milliseconds; repeated stages (e.g. several upstream pages) are summed.
+        totals: Dict[str, float] = {}
+        for stage, seconds in timings:
+            totals[stage] = totals.get(stage, 0.0) + seconds
+        return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in totals.items())
+
+    # --- Export ---
+
+    @staticmethod
+    def _format_labels(key: Tuple[Tuple[str, str], ...], extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(key) + ([extra] if extra else [])
+        if not pairs:
+            return ""
+        escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+        return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+    def render(self) -> str:
+        """The registry in the Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            histograms = {name: {key: list(values) for key, values in series.items()} for name, series in self._histograms.items()}
+            counters = {name: dict(series) for name, series in self._counters.items()}
+
+        lines = []
+        for name, series in sorted(histograms.items()):
+            lines.append(f"# HELP {name} {self._help.get(name, name)}")
+            lines.append(f"# TYPE {name} histogram")
+            for key, values in sorted(series.items()):
+                cumulative = 0
+                for upper_bound, count in zip(self.buckets, values):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{self._format_labels(key, ('le', repr(upper_bound)))} {cumulative}")
+                lines.append(f"{name}_bucket{self._format_labels(key, ('le', '+Inf'))} {values[-1]}")
+                lines.append(f"{name}_sum{self._format_labels(key)} {values[-2]:.6f}")
+                lines.append(f"{name}_count{self._format_labels(key)} {values[-1]}")
+        for name, series in sorted(counters.items()):
+            lines.append(f"# HELP {name} {self._help.get(name, name)}")
+            lines.append(f"# TYPE {name} counter")
+            for key, value in sorted(series.items()):
+                lines.append(f"{name}{self._format_labels(key)} {int(value) if float(value).is_integer() else value}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,163 @@
+# backend/services/model_residency_service.py
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import requests
+
+from config import Config
+from services.ollama_client import OllamaClient
+
+logger = logging.getLogger(__name__)
+
+NANOSECONDS_PER_SECOND = 1_000_000_000
+
+
+class ModelResidencyManager:
+    """
+    Keeps the configured Ollama models resident in memory.
+
+    It preloads the generation and embedding models in the background, hands out the
+    `keep_alive` hint each call path should send, and records how long Ollama spent
+    loading a model (as reported in `load_duration`) so cold starts show up as metrics.
+    """
+    KIND_GENERATION = "generation"
+    KIND_EMBEDDING = "embedding"
+
+    _shared_instance: Optional["ModelResidencyManager"] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, client: Optional[OllamaClient] = None):
+        self.client = client or OllamaClient.shared()
+        self.models = {
+            Config.OLLAMA_DEFAULT_GENERATION_MODEL: self.KIND_GENERATION,
+            Config.OLLAMA_EMBEDDING_MODEL: self.KIND_EMBEDDING,
+        }
+        self.keep_alive_by_path = {
+            "chat": Config.OLLAMA_CHAT_KEEP_ALIVE,
+            "embed": Config.OLLAMA_EMBED_KEEP_ALIVE,
+            "batch": Config.OLLAMA_BATCH_KEEP_ALIVE,
+        }
+        self.cold_start_threshold_seconds = Config.OLLAMA_COLD_START_THRESHOLD_MS / 1000.0
+        self._metrics: Dict[str, Dict[str, Any]] = {}
+        self._metrics_lock = threading.Lock()
+        self._warmup_thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def shared(cls) -> "ModelResidencyManager":
+        if cls._shared_instance is None:
+            with cls._shared_lock:
+                if cls._shared_instance is None:
+                    cls._shared_instance = cls()
+        return cls._shared_instance
+
+    def keep_alive_for(self, path: str) -> str:
+        """Returns the keep_alive hint for a call path: 'chat', 'embed' or 'batch'."""
+        return self.keep_alive_by_path.get(path, Config.OLLAMA_CHAT_KEEP_ALIVE)
+
+    # --- Metrics ---
+
+    def _model_metrics(self, model_name: str) -> Dict[str, Any]:
+        return self._metrics.setdefault(model_name, {
+            "requests_observed": 0,
+            "loads": 0,
+            "cold_starts": 0,
+            "total_load_seconds": 0.0,
+            "last_load_seconds": None,
+            "max_load_seconds": 0.0,
+            "last_warmup_seconds": None,
+            "last_warmup_at": None,
+        })
+
+    def record_load_duration(self, model_name: str, load_duration_ns: Optional[int]):
+        """Records Ollama's reported `load_duration` for one request to `model_name`."""
+        load_seconds = (load_duration_ns or 0) / NANOSECONDS_PER_SECOND
+        with self._metrics_lock:
+            metrics = self._model_metrics(model_name)
+            metrics["requests_observed"] += 1
+            metrics["total_load_seconds"] += load_seconds
+            metrics["last_load_seconds"] = round(load_seconds, 4)
+            metrics["max_load_seconds"] = max(metrics["max_load_seconds"], round(load_seconds, 4))
+            if load_seconds > 0:
+                metrics["loads"] += 1
+            if load_seconds >= self.cold_start_threshold_seconds:
+                metrics["cold_starts"] += 1
+                logger.info(f"ModelResidencyManager: Cold start for '{model_name}' took {load_seconds:.2f}s.")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._metrics_lock:
+            return {
+                "keep_alive": dict(self.keep_alive_by_path),
+                "cold_start_threshold_ms": Config.OLLAMA_COLD_START_THRESHOLD_MS,
+                "models": {name: dict(values) for name, values in self._metrics.items()},
+            }
+
+    # --- Warm-up & release ---
+
+    def warm_up_model(self, model_name: str, keep_alive: Optional[str] = None) -> bool:
+        """Loads one model into Ollama's memory without generating anything."""
+        kind = self.models.get(model_name, self.KIND_GENERATION)
+        keep_alive = keep_alive or self.keep_alive_for("embed" if kind == self.KIND_EMBEDDING else "chat")
+        if kind == self.KIND_EMBEDDING:
+            path, payload = "/api/embeddings", {"model": model_name, "prompt": "", "keep_alive": keep_alive}
+        else:
+            path, payload = "/api/generate", {"model": model_name, "keep_alive": keep_alive}
+
+        started_at = time.perf_counter()
+        try:
+            response = self.client.post(path, json=payload, timeout=Config.OLLAMA_GEN_TIMEOUT)
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"ModelResidencyManager: Warm-up of '{model_name}' failed: {e}")
+            return False
+        elapsed = time.perf_counter() - started_at
+
+        try:
+            load_duration_ns = response.json().get("load_duration")
+        except ValueError:
+            load_duration_ns = None
+        # The embeddings endpoint does not report load_duration, so fall back to wall time.
+        self.record_load_duration(model_name, load_duration_ns if load_duration_ns is not None else int(elapsed * NANOSECONDS_PER_SECOND))
+        with self._metrics_lock:
+            metrics = self._model_metrics(model_name)
+            metrics["last_warmup_seconds"] = round(elapsed, 4)
+            metrics["last_warmup_at"] = time.time()
+        logger.info(f"ModelResidencyManager: '{model_name}' is resident (warm-up took {elapsed:.2f}s, keep_alive={keep_alive}).")
+        return True
+
+    def warm_up_all(self):
+        for model_name in self.models:
+            self.warm_up_model(model_name)
+
+    def warm_up_in_background(self):
+        """Preloads every configured model on a daemon thread so startup never waits on Ollama."""
+        if self._warmup_thread and self._warmup_thread.is_alive():
+            return
+        self._warmup_thread = threading.Thread(target=self.warm_up_all, name="ollama-model-warmup", daemon=True)
+        self._warmup_thread.start()
+
+    def begin_batch_phase(self, kind: str):
+        """
+        Called before a batch phase that only needs one kind of model (embed everything,
+        then title everything). When enabled, models of the other kind are unloaded first
+        so the two never fight over memory mid-phase.
+        """
+        if not Config.OLLAMA_RELEASE_IDLE_MODELS_BETWEEN_PHASES:
+            return
+        for model_name, model_kind in self.models.items():
+            if model_kind != kind:
+                self.release_model(model_name)
+
+    def release_model(self, model_name: str):
+        """Asks Ollama to unload a model immediately (keep_alive=0), e.g. after a batch phase."""
+        kind = self.models.get(model_name, self.KIND_GENERATION)
+        path = "/api/embeddings" if kind == self.KIND_EMBEDDING else "/api/generate"
+        payload = {"model": model_name, "keep_alive": 0}
+        if kind == self.KIND_EMBEDDING:
+            payload["prompt"] = ""
+        try:
+            self.client.post(path, json=payload, timeout=30).raise_for_status()
+            logger.info(f"ModelResidencyManager: Released '{model_name}' from Ollama memory.")
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"ModelResidencyManager: Could not release '{model_name}': {e}")
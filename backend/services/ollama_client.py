@@ -0,0 +1,183 @@
+# backend/services/ollama_client.py
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class OllamaClient:
+    """
+    A shared, pooled HTTP client for the local Ollama server.
+
+    All Ollama traffic (generation and embeddings) goes through one keep-alive
+    `requests.Session`, so each call reuses an open TCP connection. Liveness is
+    tracked as a circuit breaker fed by the outcome of real requests and by an
+    optional background probe, so callers never pay for a health check per request.
+    """
+    STATE_CLOSED = "closed"        # Ollama is reachable, requests flow normally.
+    STATE_OPEN = "open"            # Ollama is down, requests fail fast until the cooldown ends.
+    STATE_HALF_OPEN = "half_open"  # Cooldown over, the next request is a trial; others wait for its outcome.
+
+    _shared_instance: Optional["OllamaClient"] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, base_url: Optional[str] = None):
+        self.base_url = (base_url or Config.OLLAMA_BASE_URL).rstrip('/')
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=Config.OLLAMA_POOL_MAXSIZE, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({'Content-Type': 'application/json'})
+
+        self.failure_threshold = Config.OLLAMA_CIRCUIT_FAILURE_THRESHOLD
+        self.cooldown_seconds = Config.OLLAMA_CIRCUIT_COOLDOWN_SECONDS
+        self._state = self.STATE_CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        # Set while the single half-open trial request is running, so a backed-up queue does not hit a dead server at once.
+        self._trial_in_flight = False
+        self._last_probe_at: Optional[float] = None
+        self._available_models: List[Dict[str, Any]] = []
+        self._state_lock = threading.Lock()
+        self._monitor_thread: Optional[threading.Thread] = None
+        self._monitor_stop = threading.Event()
+
+    @classmethod
+    def shared(cls) -> "OllamaClient":
+        """Returns the process-wide client used by the LLM service and the embedder."""
+        if cls._shared_instance is None:
+            with cls._shared_lock:
+                if cls._shared_instance is None:
+                    cls._shared_instance = cls()
+        return cls._shared_instance
+
+    # --- Circuit breaker ---
+
+    def record_success(self):
+        with self._state_lock:
+            if self._state != self.STATE_CLOSED:
+                logger.info(f"OllamaClient: Ollama at {self.base_url} is reachable again. Closing circuit.")
+            self._state = self.STATE_CLOSED
+            self._consecutive_failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._state_lock:
+            self._consecutive_failures += 1
+            self._trial_in_flight = False
+            if self._state == self.STATE_HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                if self._state != self.STATE_OPEN:
+                    logger.warning(f"OllamaClient: Ollama at {self.base_url} is unreachable. Opening circuit for {self.cooldown_seconds}s.")
+                self._state = self.STATE_OPEN
+                self._opened_at = time.monotonic()
+
+    def is_available(self) -> bool:
+        """
+        Cheap, non-blocking liveness check based on the cached circuit state. While half-open
+        it is True only until a request claims the trial, then False until that request's
+        outcome closes or re-opens the circuit.
+        """
+        with self._state_lock:
+            if self._state == self.STATE_OPEN and time.monotonic() - self._opened_at >= self.cooldown_seconds:
+                self._state = self.STATE_HALF_OPEN
+            if self._state == self.STATE_HALF_OPEN:
+                return not self._trial_in_flight
+            return self._state == self.STATE_CLOSED
+
+    def _claim_request(self) -> bool:
+        """Returns True if this request is the half-open trial; raises if another trial is already running."""
+        with self._state_lock:
+            if self._state != self.STATE_HALF_OPEN:
+                return False
+            if self._trial_in_flight:
+                raise requests.exceptions.ConnectionError(
+                    f"Ollama at {self.base_url} is recovering from an outage; waiting for the trial request to finish."
+                )
+            self._trial_in_flight = True
+            return True
+
+    def get_health(self) -> Dict[str, Any]:
+        with self._state_lock:
+            return {
+                "base_url": self.base_url,
+                "state": self._state,
+                "consecutive_failures": self._consecutive_failures,
+                "trial_in_flight": self._trial_in_flight,
+                "seconds_since_last_probe": round(time.monotonic() - self._last_probe_at, 1) if self._last_probe_at else None,
+                "monitor_running": bool(self._monitor_thread and self._monitor_thread.is_alive()),
+            }
+
+    # --- HTTP helpers ---
+
+    def _request(self, method: str, path: str, **kwargs) -> requests.Response:
+        is_trial = self._claim_request()
+        try:
+            response = self.session.request(method, f"{self.base_url}{path}", **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            self.record_failure()
+            raise
+        except Exception:
+            # Neither outcome says anything about the server; let the next request try again.
+            if is_trial:
+                with self._state_lock:
+                    self._trial_in_flight = False
+            raise
+        # A server answering 5xx (model failed to load, out of memory) is no healthier than one
+        # that does not answer; a half-open trial that gets one re-opens the circuit.
+        if response.status_code >= 500:
+            self.record_failure()
+        else:
+            self.record_success()
+        return response
+
+    def get(self, path: str, **kwargs) -> requests.Response:
+        return self._request('GET', path, **kwargs)
+
+    def post(self, path: str, **kwargs) -> requests.Response:
+        return self._request('POST', path, **kwargs)
+
+    # --- Background liveness probe ---
+
+    def refresh_health(self) -> bool:
+        """Probes /api/tags once and updates the circuit state and the cached model list."""
+        self._last_probe_at = time.monotonic()
+        try:
+            response = self.get('/api/tags', timeout=3)
+            response.raise_for_status()
+            self._available_models = response.json().get("models", [])
+            return True
+        except requests.exceptions.HTTPError as e:
+            # _request has already counted a 5xx against the circuit.
+            logger.warning(f"OllamaClient: Health probe returned an HTTP error: {e}")
+            return False
+        except (requests.exceptions.RequestException, ValueError):
+            return False
+
+    def get_available_models(self) -> List[Dict[str, Any]]:
+        return list(self._available_models)
+
+    def start_health_monitor(self, interval_seconds: Optional[int] = None):
+        """Starts a daemon thread that keeps the liveness state fresh. Safe to call more than once."""
+        if self._monitor_thread and self._monitor_thread.is_alive():
+            return
+        interval = interval_seconds or Config.OLLAMA_HEALTH_CHECK_INTERVAL_SECONDS
+        self._monitor_stop.clear()
+
+        def monitor_loop():
+            while not self._monitor_stop.is_set():
+                self.refresh_health()
+                self._monitor_stop.wait(interval)
+
+        self._monitor_thread = threading.Thread(target=monitor_loop, name="ollama-health-monitor", daemon=True)
+        self._monitor_thread.start()
+        logger.info(f"OllamaClient: Started background health monitor (every {interval}s).")
+
+    def stop_health_monitor(self):
+        self._monitor_stop.set()
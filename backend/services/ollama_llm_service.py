@@ -2,9 +2,17 @@
 import requests
 from config import Config
 import json
-from typing import Generator, Optional
+import time
+from typing import Any, Callable, Dict, Generator, List, Optional
+from services.ollama_client import OllamaClient
+from services.model_residency_service import ModelResidencyManager
+from services.llm_scheduler import LLMScheduler, LLMSchedulerBusyError, LLMTicket
+from services.llm_provider import LLMProvider
+from services.metrics_service import Metrics
 
-class OllamaLLMService:
+class OllamaLLMService(LLMProvider):
+    provider_key = "ollama_qwen3"
+    supports_context = True
     BASE_URL = Config.OLLAMA_BASE_URL
     GENERATION_MODEL = Config.OLLAMA_DEFAULT_GENERATION_MODEL
 
@@ -31,65 +39,123 @@ You MUST ONLY output the final, user-facing answer.
 3.  **Anime Title Linking:** The system will automatically handle linking. Just say the full, official titles of anime, manga, or movies naturally in your response. **DO NOT** add `[LINK:...]` tags yourself.
 """
 
-    def __init__(self, model_name: str = None):
+    def __init__(self, model_name: str = None, client: Optional[OllamaClient] = None, scheduler: Optional[LLMScheduler] = None):
         self.model_name = model_name if model_name else self.GENERATION_MODEL
+        self.client = client or OllamaClient.shared()
+        self.residency = ModelResidencyManager.shared()
+        # Every generation, from any instance, goes through the same process-wide scheduler.
+        self.scheduler = scheduler or LLMScheduler.shared()
 
-    def stream_formatted_response(self, user_prompt_with_context: str) -> Generator[str, None, None]:
-        if not self.is_ollama_running():
+    def stream_formatted_response(self, user_prompt_with_context: str, keep_alive: Optional[str] = None,
+                                  on_complete: Optional[Callable[[Dict[str, Any]], None]] = None,
+                                  context: Optional[List[int]] = None,
+                                  ticket: Optional[LLMTicket] = None) -> Generator[str, None, None]:
+        """
+        Streams the generated text chunk by chunk. `on_complete` receives Ollama's final
+        stats chunk (prompt_eval_count, eval_count, durations and the new `context`) once
+        generation is done. Passing a previous `context` continues that conversation, so
+        Ollama only evaluates the new prompt instead of the whole transcript.
+
+        `ticket` is a scheduler slot reserved by the caller; without one, an interactive
+        slot is requested here. The slot is released when the generator finishes or is
+        closed, e.g. because the client disconnected.
+        """
+        if not self.client.is_available():
+            if ticket:
+                ticket.release()
             yield "Error: Ollama server is not running or accessible."
             return
 
-        url = f"{self.BASE_URL}/api/generate"
+        if ticket is None:
+            try:
+                ticket = self.scheduler.submit(LLMScheduler.PRIORITY_INTERACTIVE)
+            except LLMSchedulerBusyError as e:
+                yield f"Error: {e}"
+                return
+        try:
+            if not ticket.wait(Config.LLM_QUEUE_TIMEOUT_SECONDS):
+                yield "Error: Timed out waiting for a free LLM slot."
+                return
+            yield from self._stream_generate(user_prompt_with_context, keep_alive, on_complete, context)
+        finally:
+            ticket.release()
+
+    def _stream_generate(self, user_prompt_with_context: str, keep_alive: Optional[str],
+                         on_complete: Optional[Callable[[Dict[str, Any]], None]],
+                         context: Optional[List[int]]) -> Generator[str, None, None]:
         data = {
             "model": self.model_name,
             "prompt": user_prompt_with_context,
             "system": self.MUSHI_HYBRID_PROMPT,
-            "stream": True
+            "stream": True,
+            "keep_alive": keep_alive or self.residency.keep_alive_for("chat")
         }
+        if context:
+            data["context"] = context
 
+        metrics = Metrics.shared()
+        started_at, first_token_seen = time.perf_counter(), False
         try:
-            # Set a generous timeout for generation
-            response = requests.post(url, json=data, timeout=Config.OLLAMA_GEN_TIMEOUT, stream=True)
-            response.raise_for_status()
-            for line in response.iter_lines():
-                if line:
-                    try:
-                        json_data = json.loads(line.decode('utf-8'))
-                        if "response" in json_data:
-                            yield json_data["response"]
-                        if json_data.get("done"):
-                            break
-                    except json.JSONDecodeError:
-                        continue
+            # Set a generous timeout for generation. The context manager releases the
+            # pooled connection even when the consumer stops iterating early.
+            with self.client.post("/api/generate", json=data, timeout=Config.OLLAMA_GEN_TIMEOUT, stream=True) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if line:
+                        try:
+                            json_data = json.loads(line.decode('utf-8'))
+                            if "response" in json_data:
+                                if not first_token_seen:
+                                    first_token_seen = True
+                                    metrics.observe("ollama_first_token", time.perf_counter() - started_at)
+                                yield json_data["response"]
+                            if json_data.get("done"):
+                                metrics.observe("ollama_generation", time.perf_counter() - started_at)
+                                self.residency.record_load_duration(self.model_name, json_data.get("load_duration"))
+                                if on_complete:
+                                    on_complete(json_data)
+                                break
+                        except json.JSONDecodeError:
+                            continue
         except requests.exceptions.RequestException as e:
             yield f"Error: An unexpected error occurred with Ollama: {e}"
 
-    def get_simple_response(self, prompt: str) -> Optional[str]:
-        if not self.is_ollama_running():
+    def get_simple_response(self, prompt: str, keep_alive: Optional[str] = None, system_prompt: Optional[str] = None,
+                            priority: int = LLMScheduler.PRIORITY_SUGGESTIONS) -> Optional[str]:
+        """
+        Returns the whole response at once. Waits for a scheduler slot of the given
+        priority and raises LLMSchedulerBusyError if the queue is full or the wait times out.
+        """
+        if not self.client.is_available():
             return "Error: Ollama server is not running or accessible."
 
-        url = f"{self.BASE_URL}/api/generate"
+        with self.scheduler.slot(priority):
+            return self._generate(prompt, keep_alive, system_prompt)
+
+    def _generate(self, prompt: str, keep_alive: Optional[str], system_prompt: Optional[str]) -> Optional[str]:
         data = {
             "model": self.model_name,
             "prompt": prompt,
-            "system": self.MUSHI_HYBRID_PROMPT,
-            "stream": False
+            "system": system_prompt or self.MUSHI_HYBRID_PROMPT,
+            "stream": False,
+            "keep_alive": keep_alive or self.residency.keep_alive_for("chat")
         }
 
         try:
-            response = requests.post(url, json=data, timeout=Config.OLLAMA_GEN_TIMEOUT)
+            response = self.client.post("/api/generate", json=data, timeout=Config.OLLAMA_GEN_TIMEOUT)
             response.raise_for_status()
             json_response = response.json()
+            self.residency.record_load_duration(self.model_name, json_response.get("load_duration"))
             return json_response.get("response", "").strip()
         except requests.exceptions.RequestException as e:
             return f"Error: An unexpected error occurred with Ollama: {e}"
         except json.JSONDecodeError:
             return f"Error: Failed to decode JSON response from Ollama. Response: {response.text}"
 
+    def is_available(self) -> bool:
+        return self.client.is_available()
+
     @staticmethod
     def is_ollama_running():
-        try:
-            requests.get(f"{OllamaLLMService.BASE_URL}/api/tags", timeout=3).raise_for_status()
-            return True
-        except Exception:
-            return False
+        """Reports the cached liveness of the shared Ollama client; never blocks on a probe."""
+        return OllamaClient.shared().is_available()
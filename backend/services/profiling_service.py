@@ -0,0 +1,182 @@
+# backend/services/profiling_service.py
+import hmac
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from typing import Dict, Optional
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class StackSampler:
+    """
+    Samples one thread's Python stack at a fixed interval from a background thread and
+    counts identical stacks. The result is written in the collapsed ("folded") format read
+    by flamegraph.pl, inferno and speedscope: one `frame;frame;...;leaf count` line per stack.
+    """
+
+    def __init__(self, thread_id: int, interval_seconds: float):
+        self.thread_id = thread_id
+        self.interval_seconds = interval_seconds
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"profiler-{thread_id}", daemon=True)
+
+    @staticmethod
+    def _frame_name(frame) -> str:
+        code = frame.f_code
+        filename = code.co_filename
+        if filename.startswith(BACKEND_DIR):
+            filename = os.path.relpath(filename, BACKEND_DIR)
+        return f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ":")
+
+    def _run(self):
+        while not self._stop.wait(self.interval_seconds):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                names.append(self._frame_name(frame))
+                frame = frame.f_back
+            self.stacks[";".join(reversed(names))] += 1
+            self.samples += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def write_folded(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class Profiler:
+    """
+    Opt-in profiling of ingestion phases and individual requests, without code edits.
+
+    profile(name) samples the calling thread's stack and records Python allocations with
+    tracemalloc while the block runs, then writes to PROFILING_DIR:
+    - `<time>-<name>.folded`: the sampled stacks, for a flamegraph;
+    - `<time>-<name>-memory.txt`: the lines that allocated the most during the block and
+      the largest allocations still held at its end.
+
+    phase(name) profiles only when PROFILING_ENABLED is set and is a no-op otherwise.
+    Requests are profiled on demand with `?profile=1`, which requires the admin token.
+    tracemalloc is process-wide, so the memory report of overlapping profiles includes
+    each other's allocations.
+    """
+    _shared_instance: Optional["Profiler"] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, enabled: bool, output_dir: str, sample_interval_ms: float = 5,
+                 top_allocations: int = 25, admin_token: str = ""):
+        self.enabled = enabled
+        self.output_dir = output_dir
+        self.sample_interval_seconds = sample_interval_ms / 1000
+        self.top_allocations = top_allocations
+        self.admin_token = admin_token
+        self._lock = threading.Lock()
+        self._active_sessions = 0
+        self._started_tracemalloc = False
+
+    @classmethod
+    def shared(cls) -> "Profiler":
+        if cls._shared_instance is None:
+            with cls._shared_lock:
+                if cls._shared_instance is None:
+                    cls._shared_instance = cls(
+                        enabled=Config.PROFILING_ENABLED,
+                        output_dir=Config.PROFILING_DIR,
+                        sample_interval_ms=Config.PROFILING_SAMPLE_INTERVAL_MS,
+                        top_allocations=Config.PROFILING_TOP_ALLOCATIONS,
+                        admin_token=Config.PROFILING_ADMIN_TOKEN
+                    )
+        return cls._shared_instance
+
+    def is_authorized(self, token: Optional[str]) -> bool:
+        """On-demand profiling needs a configured admin token, and the request must present it."""
+        return bool(self.admin_token) and token is not None and hmac.compare_digest(token, self.admin_token)
+
+    def phase(self, name: str):
+        return self.profile(name) if self.enabled else nullcontext()
+
+    @contextmanager
+    def profile(self, name: str, report: Optional[Dict[str, str]] = None):
+        """
+        Profiles the enclosed block as `name`. If `report` is given, it receives the paths
+        the reports will be written to, under "folded" and "memory", as soon as it starts.
+        """
+        paths = self._report_paths(name)
+        if report is not None:
+            report.update(paths)
+        with self._lock:
+            if self._active_sessions == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracemalloc = True
+            self._active_sessions += 1
+        start_snapshot = tracemalloc.take_snapshot()
+        sampler = StackSampler(threading.get_ident(), self.sample_interval_seconds)
+        started_at = time.perf_counter()
+        sampler.start()
+        try:
+            yield
+        finally:
+            sampler.stop()
+            elapsed = time.perf_counter() - started_at
+            end_snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            with self._lock:
+                self._active_sessions -= 1
+                if self._active_sessions == 0 and self._started_tracemalloc:
+                    tracemalloc.stop()
+                    self._started_tracemalloc = False
+            try:
+                self._write_reports(paths, name, sampler, start_snapshot, end_snapshot, elapsed, current, peak)
+                logger.info(f"Profiler: '{name}' took {elapsed:.2f}s ({sampler.samples} samples); reports in {paths['folded']} and {paths['memory']}.")
+            except OSError as e:
+                logger.error(f"Profiler: Could not write the reports for '{name}': {e}")
+
+    def _report_paths(self, name: str) -> Dict[str, str]:
+        safe_name = "".join(c if c.isalnum() or c in "-_" else "_" for c in name)
+        base = os.path.join(self.output_dir, f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{safe_name}")
+        return {"folded": f"{base}.folded", "memory": f"{base}-memory.txt"}
+
+    def _write_reports(self, paths: Dict[str, str], name: str, sampler: StackSampler, start_snapshot, end_snapshot,
+                       elapsed: float, current: int, peak: int):
+        os.makedirs(self.output_dir, exist_ok=True)
+        sampler.write_folded(paths["folded"])
+
+        # The profiler's own bookkeeping (sampled stacks, snapshots) is left out of the report.
+        ignore = (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__),
+                  tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"))
+        start_snapshot, end_snapshot = start_snapshot.filter_traces(ignore), end_snapshot.filter_traces(ignore)
+        lines = [
+            f"Profile: {name}",
+            f"Duration: {elapsed:.3f}s, stack samples: {sampler.samples} (every {self.sample_interval_seconds * 1000:g} ms)",
+            f"Traced memory at end: {current / 1024 ** 2:.1f} MiB, peak: {peak / 1024 ** 2:.1f} MiB",
+            "",
+            f"Top {self.top_allocations} lines by memory allocated during the profile (net):",
+        ]
+        for stat in end_snapshot.compare_to(start_snapshot, 'lineno')[:self.top_allocations]:
+            lines.append(f"  {stat}")
+        lines += ["", f"Top {self.top_allocations} lines by memory held at the end:"]
+        for stat in end_snapshot.statistics('lineno')[:self.top_allocations]:
+            lines.append(f"  {stat}")
+        with open(paths["memory"], 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
@@ -0,0 +1,212 @@
+# backend/services/prompt_builder.py
+import logging
+import math
+import re
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Callable
+
+logger = logging.getLogger(__name__)
+
+# Roughly four characters per token for English text with Qwen/Llama-style tokenizers.
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """A cheap, tokenizer-free token estimate; good enough for budgeting."""
+    return math.ceil(len(text or "") / CHARS_PER_TOKEN)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cuts text to roughly max_tokens, preferring to end on a sentence or word boundary."""
+    text = text or ""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    sentence_end = max(cut.rfind('. '), cut.rfind('\n'))
+    if sentence_end > max_chars // 2:
+        return cut[:sentence_end + 1].rstrip()
+    word_end = cut.rfind(' ')
+    return (cut[:word_end] if word_end > 0 else cut).rstrip() + "…"
+
+
+def _format_turn(message: Dict[str, Any]) -> str:
+    return f"{'User' if message.get('sender') == 'user' else 'Mushi'}: {message.get('text') or ''}"
+
+
+class ConversationSummaryCache:
+    """
+    Rolling summaries of the older part of each conversation, in a bounded LRU.
+
+    A summary records how many turns it covers. When more turns fall out of the verbatim
+    window, the summary is extended in the background from (previous summary + new turns),
+    so the request that triggered it never waits on the extra LLM call.
+    """
+    def __init__(self, summarize: Callable[[str], Optional[str]], max_entries: int = 256, max_summary_tokens: int = 300):
+        self.summarize = summarize
+        self.max_entries = max_entries
+        self.max_summary_tokens = max_summary_tokens
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._in_progress = set()
+        self._lock = threading.Lock()
+
+    def get(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(conversation_id)
+            if entry:
+                self._entries.move_to_end(conversation_id)
+            return dict(entry) if entry else None
+
+    def _put(self, conversation_id: str, summary: str, covered_turns: int):
+        with self._lock:
+            self._entries[conversation_id] = {"summary": summary, "covered_turns": covered_turns}
+            self._entries.move_to_end(conversation_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def extend_in_background(self, conversation_id: str, older_turns: List[Dict[str, Any]]):
+        """Schedules the summary to be brought up to date with `older_turns`, once per conversation."""
+        with self._lock:
+            if conversation_id in self._in_progress:
+                return
+            self._in_progress.add(conversation_id)
+        threading.Thread(target=self._extend, args=(conversation_id, older_turns),
+                         name="conversation-summary", daemon=True).start()
+
+    def _extend(self, conversation_id: str, older_turns: List[Dict[str, Any]]):
+        try:
+            entry = self.get(conversation_id) or {"summary": "", "covered_turns": 0}
+            new_turns = older_turns[entry["covered_turns"]:]
+            if not new_turns:
+                return
+            transcript = "\n".join(truncate_to_tokens(_format_turn(turn), 200) for turn in new_turns)
+            prompt = (
+                "Update the running summary of a conversation between a user and Mushi, an anime assistant.\n"
+                f"Keep it under {self.max_summary_tokens // 2} words, in plain prose, and keep every anime, character "
+                "and topic the user asked about.\n\n"
+                f"CURRENT SUMMARY:\n{entry['summary'] or '(empty)'}\n\nNEW TURNS:\n{transcript}\n\nUPDATED SUMMARY:"
+            )
+            summary = self.summarize(prompt)
+            if summary and not summary.startswith("Error:"):
+                self._put(conversation_id, truncate_to_tokens(summary, self.max_summary_tokens), len(older_turns))
+        except Exception as e:
+            logger.error(f"ConversationSummaryCache: Failed to summarise conversation '{conversation_id}': {e}", exc_info=True)
+        finally:
+            with self._lock:
+                self._in_progress.discard(conversation_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"conversations": len(self._entries), "max_entries": self.max_entries, "summaries_in_progress": len(self._in_progress)}
+
+
+class PromptBuilder:
+    """
+    Assembles the chat prompt (history, RAG context, query) within a token budget.
+
+    - The user query always goes in; the last `recent_turns` messages are kept verbatim.
+    - Older messages are replaced by the conversation's rolling summary, with a short
+      extractive digest covering any turns the summary has not caught up with yet.
+      Summaries are only kept for turns with a conversation id; without one the digest
+      stands alone.
+    - Retrieved documents are deduplicated, each capped to `max_document_tokens`, and
+      added in rank order until the remaining budget is used.
+
+    Since every part is bounded, the prompt size (and so prompt-eval time) stays flat
+    however long the conversation gets.
+    """
+    def __init__(self, summary_cache: ConversationSummaryCache, max_prompt_tokens: int = 3000,
+                 max_document_tokens: int = 400, recent_turns: int = 4, max_turn_tokens: int = 300,
+                 max_summary_tokens: int = 300):
+        self.summary_cache = summary_cache
+        self.max_prompt_tokens = max_prompt_tokens
+        self.max_document_tokens = max_document_tokens
+        self.recent_turns = recent_turns
+        self.max_turn_tokens = max_turn_tokens
+        self.max_summary_tokens = max_summary_tokens
+
+    def build(self, user_query: str, documents: List[Dict[str, Any]], history: Optional[List[Dict[str, Any]]] = None,
+              conversation_id: Optional[str] = None) -> Dict[str, Any]:
+        """Returns {"prompt", "context_ids", "usage"}; `usage` holds the estimated token counts per section."""
+        history = history or []
+        query_section = f"\n\nUser Query: {user_query}"
+        remaining = self.max_prompt_tokens - estimate_tokens(query_section)
+
+        history_section, history_usage = self._build_history(history, conversation_id, remaining // 2)
+        remaining -= estimate_tokens(history_section)
+
+        context_section, context_ids, documents_used = self._build_context(documents, remaining)
+
+        prompt = f"{history_section}{context_section}{query_section}"
+        usage = {
+            "prompt_tokens": estimate_tokens(prompt),
+            "budget_tokens": self.max_prompt_tokens,
+            "query_tokens": estimate_tokens(query_section),
+            "history_tokens": estimate_tokens(history_section),
+            "context_tokens": estimate_tokens(context_section),
+            "documents_retrieved": len(documents),
+            "documents_used": documents_used,
+            **history_usage,
+        }
+        return {"prompt": prompt, "context_ids": context_ids, "usage": usage}
+
+    def _build_history(self, history: List[Dict[str, Any]], conversation_id: Optional[str], budget: int):
+        if not history:
+            return "", {"turns_verbatim": 0, "turns_summarized": 0}
+
+        recent = history[-self.recent_turns:] if self.recent_turns else []
+        older = history[:len(history) - len(recent)]
+        recent_lines = [truncate_to_tokens(_format_turn(message), self.max_turn_tokens) for message in recent]
+
+        summary_text = ""
+        if older:
+            # Without a conversation id there is no safe key to share a summary under
+            # (unrelated conversations can start the same way), so they get the digest alone.
+            entry = (self.summary_cache.get(conversation_id) if conversation_id else None) or {"summary": "", "covered_turns": 0}
+            # Turns the cached summary does not cover yet get a one-line digest each for now.
+            uncovered = older[entry["covered_turns"]:]
+            # Newest first, so a lagging summary still leaves room for the turns closest to now.
+            digest, digest_budget = [], self.max_summary_tokens - estimate_tokens(entry["summary"])
+            for message in reversed(uncovered):
+                line = truncate_to_tokens(_format_turn(message), 40)
+                digest_budget -= estimate_tokens(line) + 1
+                if digest_budget < 0:
+                    break
+                digest.insert(0, line)
+            summary_text = "\n".join(filter(None, [entry["summary"]] + digest))
+            if uncovered and conversation_id:
+                self.summary_cache.extend_in_background(conversation_id, older)
+
+        # Drop the oldest verbatim turns first if the history is over its share of the budget.
+        while recent_lines and estimate_tokens(summary_text + "\n".join(recent_lines)) > budget:
+            recent_lines.pop(0)
+
+        parts = []
+        if summary_text:
+            parts.append("---EARLIER CONVERSATION (SUMMARY)---\n" + summary_text)
+        if recent_lines:
+            parts.append("---CONVERSATION HISTORY (FOR CONTEXT)---\n" + "\n".join(recent_lines))
+        section = "\n\n" + "\n".join(parts) + "\n---END HISTORY---\n"
+        return section, {"turns_verbatim": len(recent_lines), "turns_summarized": len(older)}
+
+    def _build_context(self, documents: List[Dict[str, Any]], budget: int):
+        seen_keys, chunks, context_ids = set(), [], []
+        # Section markers are part of the budget too.
+        remaining = budget - estimate_tokens("\n\n---CONTEXT---\n\n---END CONTEXT---\n")
+        for doc in documents:
+            content = (doc.get('content') or '').strip()
+            dedupe_key = doc.get('source_item_id') or re.sub(r'\s+', ' ', content.lower())
+            if not content or dedupe_key in seen_keys:
+                continue
+            seen_keys.add(dedupe_key)
+            chunk = truncate_to_tokens(content, min(self.max_document_tokens, remaining))
+            chunk_tokens = estimate_tokens(chunk) + 1
+            if not chunk or chunk_tokens > remaining:
+                break
+            chunks.append(chunk)
+            context_ids.append(doc.get('id'))
+            remaining -= chunk_tokens
+        if not chunks:
+            return "", [], 0
+        return "\n\n---CONTEXT---\n" + "\n".join(chunks) + "\n---END CONTEXT---\n", context_ids, len(chunks)
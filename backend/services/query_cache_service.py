@@ -0,0 +1,183 @@
+# backend/services/query_cache_service.py
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(text: str) -> str:
+    """Lowercases, collapses whitespace and drops trailing punctuation so trivially different queries share a key."""
+    normalized = re.sub(r'\s+', ' ', (text or '').strip().lower())
+    return normalized.rstrip('?!. ')
+
+
+class QueryEmbeddingCache:
+    """
+    A thread-safe LRU cache mapping normalised query text to its embedding.
+    Saves a full Ollama embedding round-trip for repeated questions.
+    """
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, text: str) -> Optional[List[float]]:
+        key = normalize_query(text)
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return embedding
+
+    def put(self, text: str, embedding: List[float]):
+        if not embedding or self.max_size <= 0:
+            return
+        key = normalize_query(text)
+        with self._lock:
+            self._entries[key] = embedding
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+class SemanticResponseCache:
+    """
+    Caches final chat answers and serves them for new queries whose embedding lies within
+    `max_distance` (cosine distance) of a cached query AND whose RAG context ids match exactly.
+    Entries expire after `ttl_seconds` and the least recently used entry is evicted past `max_entries`.
+    """
+    def __init__(self, max_entries: int = 512, ttl_seconds: int = 3600, max_distance: float = 0.08, enabled: bool = True):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_distance = max_distance
+        self.enabled = enabled
+        # entry_id -> entry dict, ordered by recency of use
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        # context key -> list of entry ids sharing that exact RAG context
+        self._buckets: Dict[Tuple, List[int]] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def make_context_key(context_ids: List[Any], scope: str = "") -> Tuple:
+        """Builds an order-independent key from the retrieved document ids (plus e.g. the provider name)."""
+        return (scope,) + tuple(sorted(str(doc_id) for doc_id in context_ids))
+
+    @staticmethod
+    def _to_unit_vector(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _remove_entry(self, entry_id: int):
+        entry = self._entries.pop(entry_id, None)
+        if entry is None:
+            return
+        bucket = self._buckets.get(entry["context_key"])
+        if bucket is not None:
+            bucket.remove(entry_id)
+            if not bucket:
+                del self._buckets[entry["context_key"]]
+
+    def _expire_stale(self, now: float):
+        stale_ids = [entry_id for entry_id, entry in self._entries.items() if now - entry["created_at"] > self.ttl_seconds]
+        for entry_id in stale_ids:
+            self._remove_entry(entry_id)
+        self.expirations += len(stale_ids)
+
+    def lookup(self, query_embedding: List[float], context_key: Tuple) -> Optional[Dict[str, Any]]:
+        """Returns the cached response payload of the closest matching entry, or None."""
+        if not self.enabled or not query_embedding:
+            return None
+        query_vector = self._to_unit_vector(query_embedding)
+        now = time.time()
+        with self._lock:
+            self._expire_stale(now)
+            candidate_ids = self._buckets.get(context_key, [])
+            best_id, best_distance = None, None
+            for entry_id in candidate_ids:
+                entry = self._entries[entry_id]
+                if entry["vector"].shape != query_vector.shape:
+                    continue
+                distance = 1.0 - float(np.dot(entry["vector"], query_vector))
+                if distance <= self.max_distance and (best_distance is None or distance < best_distance):
+                    best_id, best_distance = entry_id, distance
+            if best_id is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_id)
+            self.hits += 1
+            entry = self._entries[best_id]
+            logger.debug(f"SemanticResponseCache: Hit for cached query '{entry['query'][:50]}' at distance {best_distance:.4f}.")
+            return entry["response"]
+
+    def store(self, query: str, query_embedding: List[float], context_key: Tuple, response: Dict[str, Any]):
+        if not self.enabled or not query_embedding or self.max_entries <= 0:
+            return
+        entry = {
+            "query": query,
+            "vector": self._to_unit_vector(query_embedding),
+            "context_key": context_key,
+            "response": response,
+            "created_at": time.time(),
+        }
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = entry
+            self._buckets.setdefault(context_key, []).append(entry_id)
+            while len(self._entries) > self.max_entries:
+                oldest_id = next(iter(self._entries))
+                self._remove_entry(oldest_id)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "max_distance": self.max_distance,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
@@ -0,0 +1,143 @@
+# backend/services/retrieval_service.py
+import logging
+from typing import TYPE_CHECKING, List, Dict, Any, Optional
+
+import numpy as np
+
+from config import Config
+from embeddings.lexical_index import BM25Index
+
+if TYPE_CHECKING:
+    from embeddings.vector_store import VectorStore
+
+logger = logging.getLogger(__name__)
+
+
+def mmr_select(relevance: List[float], embeddings: List[Optional[List[float]]], top_k: int, mmr_lambda: float) -> List[int]:
+    """
+    Indices of up to `top_k` candidates picked by maximal marginal relevance: each pick
+    maximises mmr_lambda * relevance - (1 - mmr_lambda) * (highest cosine similarity to an
+    earlier pick). Candidates without an embedding are never considered redundant.
+    """
+    count = len(relevance)
+    dimension = next((len(e) for e in embeddings if e is not None), 0)
+    vectors = np.zeros((count, dimension), dtype=np.float32)
+    for i, embedding in enumerate(embeddings):
+        if embedding is not None:
+            vectors[i] = embedding
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+    similarity = vectors @ vectors.T
+    scores = mmr_lambda * np.asarray(relevance, dtype=np.float32)
+    redundancy = np.zeros(count, dtype=np.float32)
+    remaining = np.ones(count, dtype=bool)
+    selected = []
+    while len(selected) < min(top_k, count):
+        marginal = np.where(remaining, scores - (1 - mmr_lambda) * redundancy, -np.inf)
+        best = int(np.argmax(marginal))
+        selected.append(best)
+        remaining[best] = False
+        redundancy = np.maximum(redundancy, similarity[best])
+    return selected
+
+
+class HybridRetriever:
+    """
+    Retrieves RAG context from the dense FAISS index, the BM25 index, or both.
+
+    In 'hybrid' mode both rankings are fused with reciprocal rank fusion: each document
+    scores sum(1 / (k + rank)) over the lists it appears in. That keeps exact-name hits
+    from BM25 (a specific Devil Fruit or character) without losing semantic matches,
+    and needs no score normalisation between the two very different scales.
+
+    With mmr_lambda below 1, `candidates` results are fetched in every mode and the final
+    top_k is chosen from them by maximal marginal relevance (see mmr_select), using each
+    mode's own scores (normalised) as the relevance, so near-identical documents do not
+    fill every slot.
+    """
+    MODES = ("hybrid", "vector", "lexical")
+
+    def __init__(self, vector_store: 'VectorStore', lexical_index: BM25Index,
+                 candidates: int = 30, rrf_k: int = 60, mmr_lambda: float = 1.0):
+        self.vector_store = vector_store
+        self.lexical_index = lexical_index
+        self.candidates = candidates
+        self.rrf_k = rrf_k
+        self.mmr_lambda = mmr_lambda
+
+    def retrieve(self, query: str, query_embedding: Optional[List[float]], top_k: int = 5,
+                 mode: Optional[str] = None, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        mode = mode or Config.RETRIEVAL_MODE
+        if mode not in self.MODES:
+            logger.warning(f"HybridRetriever: Unknown retrieval mode '{mode}'. Falling back to 'hybrid'.")
+            mode = "hybrid"
+        # Without an embedding only the lexical side can run.
+        if not query_embedding:
+            mode = "lexical"
+
+        diversify = self.mmr_lambda < 1.0
+        pool = max(top_k, self.candidates) if diversify else top_k
+
+        if mode == "vector":
+            results = self.vector_store.similarity_search(query_embedding, top_k=pool, filters=filters)
+            relevance = [1.0 / (1.0 + doc['distance']) for doc in results]
+            return self._diversify(results, relevance, top_k) if diversify else results
+        if mode == "lexical":
+            results = self._documents_for(self.lexical_index.search(query, top_k=pool, filters=filters), "bm25_score")
+            return self._diversify(results, [doc["bm25_score"] for doc in results], top_k) if diversify else results
+
+        vector_results = self.vector_store.similarity_search(query_embedding, top_k=self.candidates, filters=filters)
+        lexical_results = self.lexical_index.search(query, top_k=self.candidates, filters=filters)
+
+        fused_scores: Dict[int, float] = {}
+        documents: Dict[int, Dict[str, Any]] = {}
+        for rank, doc in enumerate(vector_results):
+            fused_scores[doc['id']] = fused_scores.get(doc['id'], 0.0) + 1.0 / (self.rrf_k + rank + 1)
+            documents[doc['id']] = doc
+        for rank, (doc_id, bm25_score) in enumerate(lexical_results):
+            fused_scores[doc_id] = fused_scores.get(doc_id, 0.0) + 1.0 / (self.rrf_k + rank + 1)
+            if doc_id in documents:
+                documents[doc_id]['bm25_score'] = round(bm25_score, 4)
+            else:
+                for doc in self._documents_for([(doc_id, bm25_score)], "bm25_score"):
+                    documents[doc_id] = doc
+
+        results = []
+        for doc_id in sorted(fused_scores, key=fused_scores.get, reverse=True):
+            doc = documents.get(doc_id)
+            if doc is None:
+                continue
+            doc['rrf_score'] = round(fused_scores[doc_id], 6)
+            results.append(doc)
+            if len(results) == pool:
+                break
+        if diversify:
+            return self._diversify(results, [fused_scores[doc['id']] for doc in results], top_k)
+        return results
+
+    def _diversify(self, results: List[Dict[str, Any]], scores: List[float], top_k: int) -> List[Dict[str, Any]]:
+        if len(results) <= 1:
+            return results[:top_k]
+        top_score = max(scores) or 1.0
+        embeddings = [doc['embedding'] if doc.get('embedding') is not None else self.vector_store.get_embedding(doc['id'])
+                      for doc in results]
+        return [results[i] for i in mmr_select([score / top_score for score in scores], embeddings, top_k, self.mmr_lambda)]
+
+    def _documents_for(self, scored_ids, score_field: str) -> List[Dict[str, Any]]:
+        results = []
+        for doc_id, score in scored_ids:
+            doc = self.vector_store.get_document_by_id(doc_id)
+            if doc:
+                doc_copy = doc.copy()
+                doc_copy[score_field] = round(score, 4)
+                results.append(doc_copy)
+        return results
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "mode": Config.RETRIEVAL_MODE,
+            "candidates": self.candidates,
+            "rrf_k": self.rrf_k,
+            "mmr_lambda": self.mmr_lambda,
+            "lexical_index": self.lexical_index.get_stats(),
+        }
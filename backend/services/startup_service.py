@@ -0,0 +1,74 @@
+# backend/services/startup_service.py
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class StartupTasks:
+    """
+    Runs slow start-up work (loading the vector store, verifying Ollama models, building the
+    scraper session) on background threads once the server is already accepting requests,
+    and reports each task's progress for the readiness endpoints.
+
+    The app is ready when every *required* task has finished. Optional tasks (e.g. waiting
+    for Ollama to come up) are reported but never hold readiness back.
+    """
+    PENDING, RUNNING, WAITING, READY, FAILED = "pending", "running", "waiting", "ready", "failed"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tasks: Dict[str, Dict[str, Any]] = {}
+        self.started_at = time.monotonic()
+
+    def _update(self, name: str, **fields):
+        with self._lock:
+            self._tasks[name].update(fields)
+
+    def run_in_background(self, name: str, task: Callable[[], bool], required: bool = True,
+                          retry_seconds: Optional[float] = None):
+        """
+        Runs `task` on a daemon thread. It returns True on success; with `retry_seconds`, a
+        False result or an exception is retried at that interval until it succeeds.
+        Starting a task that is already known is a no-op.
+        """
+        with self._lock:
+            if name in self._tasks:
+                return
+            self._tasks[name] = {"state": self.PENDING, "required": required, "detail": None, "attempts": 0, "seconds": None}
+
+        def runner():
+            started_at = time.monotonic()
+            while True:
+                self._update(name, state=self.RUNNING, attempts=self._tasks[name]["attempts"] + 1)
+                try:
+                    succeeded, detail = bool(task()), None
+                except Exception as e:
+                    logger.error(f"StartupTasks: '{name}' failed: {e}", exc_info=True)
+                    succeeded, detail = False, str(e)
+                if succeeded:
+                    self._update(name, state=self.READY, detail=None, seconds=round(time.monotonic() - started_at, 3))
+                    logger.info(f"StartupTasks: '{name}' ready after {time.monotonic() - started_at:.2f}s.")
+                    return
+                if retry_seconds is None:
+                    self._update(name, state=self.FAILED, detail=detail or "Task reported failure.")
+                    return
+                self._update(name, state=self.WAITING, detail=detail or f"Not available yet; retrying every {retry_seconds}s.")
+                time.sleep(retry_seconds)
+
+        threading.Thread(target=runner, name=f"startup-{name}", daemon=True).start()
+
+    def is_ready(self) -> bool:
+        with self._lock:
+            return all(task["state"] == self.READY for task in self._tasks.values() if task["required"])
+
+    def get_status(self) -> Dict[str, Any]:
+        with self._lock:
+            tasks = {name: dict(task) for name, task in self._tasks.items()}
+        return {
+            "ready": all(task["state"] == self.READY for task in tasks.values() if task["required"]),
+            "uptime_seconds": round(time.monotonic() - self.started_at, 3),
+            "tasks": tasks,
+        }
@@ -0,0 +1,152 @@
+# backend/services/suggestion_service.py
+import hashlib
+import logging
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Dict, Any, Optional
+
+from services.llm_scheduler import LLMScheduler, LLMSchedulerBusyError
+from services.query_cache_service import normalize_query
+
+logger = logging.getLogger(__name__)
+
+MAX_SUGGESTIONS = 3
+# Document types whose titles make sensible follow-up subjects.
+SUGGESTION_DOCUMENT_TYPES = {"anime", "anime_details", "one_piece_character", "one_piece_fruit"}
+
+
+def parse_questions(raw_response: str) -> List[str]:
+    """Turns a '|||'-separated LLM answer into clean questions, dropping tags and numbering."""
+    cleaned = re.sub(r'<think>.*?</think>', '', raw_response or '', flags=re.DOTALL | re.IGNORECASE)
+    cleaned = re.sub(r'<mood>.*?</mood>', '', cleaned, flags=re.DOTALL | re.IGNORECASE)
+    cleaned = re.sub(r'<[^>]+>', '', cleaned)
+    questions = [q.strip().strip('"') for q in cleaned.split('|||') if q.strip()]
+    questions = [re.sub(r'^\s*[-*]?\s*\d*\.\s*', '', q) for q in questions]
+    return [q for q in questions if q][:MAX_SUGGESTIONS]
+
+
+class FollowupSuggestionService:
+    """
+    Produces follow-up question suggestions alongside a chat answer instead of after it.
+
+    In 'llm' mode a short generation is started (at suggestion priority) as soon as the
+    query's context is retrieved, so it runs while the answer streams. In 'retrieval'
+    mode suggestions are built instantly from the titles of the retrieved documents; this
+    is also the fallback when the LLM is busy or fails. Results are cached per
+    (query, answer) so /api/llm/suggest-questions returns instantly for the same turn.
+    """
+    MODES = ("off", "retrieval", "llm")
+
+    def __init__(self, llm_service, mode: str = "llm", cache_size: int = 512, max_workers: int = 2):
+        self.llm_service = llm_service
+        self.mode = mode if mode in self.MODES else "llm"
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, List[str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="followup-suggestions")
+        self.stats = {"hits": 0, "misses": 0, "speculative_llm": 0, "speculative_retrieval": 0, "llm_fallbacks": 0}
+
+    # --- Cache ---
+
+    @staticmethod
+    def cache_key(user_query: str, answer: str) -> str:
+        answer_hash = hashlib.sha1((answer or '').strip().encode('utf-8')).hexdigest()
+        return f"{hashlib.sha1(normalize_query(user_query).encode('utf-8')).hexdigest()}:{answer_hash}"
+
+    def get_cached(self, user_query: str, answer: str) -> Optional[List[str]]:
+        key = self.cache_key(user_query, answer)
+        with self._lock:
+            questions = self._cache.get(key)
+            if questions is None:
+                self.stats["misses"] += 1
+                return None
+            self._cache.move_to_end(key)
+            self.stats["hits"] += 1
+            return list(questions)
+
+    def store(self, user_query: str, answer: str, questions: List[str]):
+        if not questions:
+            return
+        key = self.cache_key(user_query, answer)
+        with self._lock:
+            self._cache[key] = list(questions)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    # --- Generation ---
+
+    @staticmethod
+    def from_documents(user_query: str, documents: List[Dict[str, Any]]) -> List[str]:
+        """Builds suggestions from neighbouring documents' titles; needs no LLM call."""
+        titles = []
+        query_lower = (user_query or '').lower()
+        for doc in documents:
+            metadata = doc.get('metadata') or {}
+            title = metadata.get('title')
+            if not title or metadata.get('type') not in SUGGESTION_DOCUMENT_TYPES or title in titles:
+                continue
+            titles.append(title)
+
+        # Titles the user did not ask about make the most useful follow-ups.
+        titles.sort(key=lambda title: title.lower() in query_lower)
+        templates = ["Can you tell me more about {}?", "What makes {} worth checking out?", "What anime are similar to {}?"]
+        questions = [template.format(title) for template, title in zip(templates, titles)]
+        if titles and len(questions) < MAX_SUGGESTIONS:
+            questions.append(f"What are the most important things to know about {titles[0]}?")
+        return questions[:MAX_SUGGESTIONS]
+
+    def generate_with_llm(self, user_query: str, answer: Optional[str] = None,
+                          documents: Optional[List[Dict[str, Any]]] = None) -> List[str]:
+        """One short generation at suggestion priority. Raises LLMSchedulerBusyError when the queue is full."""
+        titles = dict.fromkeys((doc.get('metadata') or {}).get('title') for doc in documents or [])
+        topics = ", ".join(title for title in titles if title)
+        turn = f'USER ASKED: "{user_query}"\n'
+        if answer:
+            turn += f'MUSHI ANSWERED: "{answer}"\n'
+        elif topics:
+            turn += f"RELATED TOPICS: {topics}\n"
+        prompt = f"""
+        Based on the following conversation turn:
+        {turn}
+        Generate exactly 3 diverse and insightful follow-up questions a user might ask next.
+        RULES:
+        1. Output ONLY the 3 questions, separated by "|||".
+        2. DO NOT use any special tags, numbering, or bullet points.
+        EXAMPLE OUTPUT: What are some other anime with a complex magic system?|||How does the power scaling in that anime compare to others?|||Are there any characters who question the morality of the magic system?
+        """
+        raw_response = self.llm_service.get_simple_response(prompt, priority=LLMScheduler.PRIORITY_SUGGESTIONS)
+        if not raw_response or raw_response.startswith("Error:"):
+            return []
+        return parse_questions(raw_response)
+
+    def start_speculative(self, user_query: str, documents: List[Dict[str, Any]]) -> Optional[Future]:
+        """Starts suggestions for a turn whose answer is still being generated. Returns None when disabled."""
+        if self.mode == "off":
+            return None
+        if self.mode == "retrieval":
+            self.stats["speculative_retrieval"] += 1
+            future = Future()
+            future.set_result(self.from_documents(user_query, documents))
+            return future
+        self.stats["speculative_llm"] += 1
+        return self._executor.submit(self._speculate_with_llm, user_query, documents)
+
+    def _speculate_with_llm(self, user_query: str, documents: List[Dict[str, Any]]) -> List[str]:
+        try:
+            questions = self.generate_with_llm(user_query, documents=documents)
+        except LLMSchedulerBusyError:
+            questions = []
+        except Exception as e:
+            logger.warning(f"FollowupSuggestionService: Speculative generation failed: {e}")
+            questions = []
+        if not questions:
+            self.stats["llm_fallbacks"] += 1
+            questions = self.from_documents(user_query, documents)
+        return questions
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"mode": self.mode, "cache_size": len(self._cache), "max_cache_size": self.cache_size, **self.stats}
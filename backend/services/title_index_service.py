@@ -0,0 +1,179 @@
+# backend/services/title_index_service.py
+import bisect
+import logging
+import re
+import threading
+import unicodedata
+from collections import Counter, OrderedDict
+from typing import List, Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+INDEXED_DOCUMENT_TYPES = {"anime", "anime_details"}
+JAPANESE_TITLE_PATTERN = re.compile(r'^Japanese Title:\s*(.+)$', re.MULTILINE)
+
+
+def normalize_title(title: str) -> str:
+    """Strips accents, punctuation and case so 'Shingeki no Kyojin!' and 'shingeki no kyojin' share a key."""
+    text = unicodedata.normalize('NFKD', title or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    text = re.sub(r'[^\w\s]', ' ', text.lower())
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def _trigrams(key: str) -> set:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TitleIndex:
+    """
+    An in-process index over every ingested anime's titles, Japanese titles and alternative names.
+
+    Lookups try an exact normalised match, then trigram (Dice similarity) fuzzy matching,
+    then a prefix match, all without leaving the process. Results resolved upstream on a
+    miss are cached in a bounded LRU and folded back into the index.
+    """
+    def __init__(self, min_similarity: float = 0.5, upstream_cache_size: int = 2048):
+        self.min_similarity = min_similarity
+        self.upstream_cache_size = upstream_cache_size
+        self._lock = threading.RLock()
+        self._upstream_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.stats = Counter()
+        self._reset()
+
+    def _reset(self):
+        self._entries: List[Dict[str, Any]] = []          # entry id -> {"title", "anime_id"}
+        self._key_to_entry: Dict[str, int] = {}           # normalised name -> entry id
+        self._sorted_keys: List[str] = []                 # for prefix lookups, sorted lazily
+        self._sorted_keys_dirty = False
+        self._trigram_postings: Dict[str, List[str]] = {}  # trigram -> normalised names
+        self._trigram_counts: Dict[str, int] = {}          # normalised name -> number of trigrams
+        self._anime_to_entry: Dict[str, int] = {}
+
+    # --- Building ---
+
+    def attach(self, vector_store):
+        """Indexes the store's current documents and follows every later change."""
+        vector_store.add_change_listener(self._on_store_changed)
+        self._on_store_changed("reset", vector_store.documents)
+
+    def _on_store_changed(self, event: str, documents: List[Dict[str, Any]]):
+        with self._lock:
+            if event == "reset":
+                self._reset()
+            for doc in documents:
+                metadata = doc.get("metadata") or {}
+                if metadata.get("type") not in INDEXED_DOCUMENT_TYPES or not metadata.get("anime_id"):
+                    continue
+                names = [metadata.get("japanese_title")] + list(metadata.get("alternative_titles") or [])
+                if not metadata.get("japanese_title"):
+                    # Older documents only carry the Japanese title inside their content.
+                    match = JAPANESE_TITLE_PATTERN.search(doc.get("content", ""))
+                    if match and match.group(1).strip() != 'N/A':
+                        names.append(match.group(1).strip())
+                self.add_title(metadata["anime_id"], metadata.get("title"), names)
+
+    def add_title(self, anime_id: str, title: Optional[str], alternative_names: Optional[List[str]] = None):
+        """Registers an anime under its display title and any number of alternative names."""
+        if not anime_id or not title:
+            return
+        with self._lock:
+            entry_id = self._anime_to_entry.get(anime_id)
+            if entry_id is None:
+                entry_id = len(self._entries)
+                self._entries.append({"title": title, "anime_id": anime_id})
+                self._anime_to_entry[anime_id] = entry_id
+            for name in [title] + [name for name in (alternative_names or []) if name]:
+                key = normalize_title(name)
+                if not key or key in self._key_to_entry:
+                    continue
+                self._key_to_entry[key] = entry_id
+                self._sorted_keys.append(key)
+                self._sorted_keys_dirty = True
+                trigrams = _trigrams(key)
+                self._trigram_counts[key] = len(trigrams)
+                for trigram in trigrams:
+                    self._trigram_postings.setdefault(trigram, []).append(key)
+
+    # --- Lookup ---
+
+    def lookup(self, title: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns {"title", "anime_id", "score", "match"} for the best local match, or None.
+        Each hit is counted in the stats as "local_<match>".
+        """
+        key = normalize_title(title)
+        if not key:
+            return None
+        with self._lock:
+            entry_id = self._key_to_entry.get(key)
+            if entry_id is not None:
+                return self._result(entry_id, 1.0, "exact")
+
+            query_trigrams = _trigrams(key)
+            overlaps = Counter()
+            for trigram in query_trigrams:
+                for candidate_key in self._trigram_postings.get(trigram, ()):
+                    overlaps[candidate_key] += 1
+            best_key, best_score = None, 0.0
+            for candidate_key, shared in overlaps.items():
+                score = 2.0 * shared / (len(query_trigrams) + self._trigram_counts[candidate_key])
+                if score > best_score:
+                    best_key, best_score = candidate_key, score
+            if best_key is not None and best_score >= self.min_similarity:
+                return self._result(self._key_to_entry[best_key], round(best_score, 4), "fuzzy")
+
+            # A truncated title ("Attack on Titan") still resolves to the shortest name it prefixes.
+            if self._sorted_keys_dirty:
+                self._sorted_keys.sort()
+                self._sorted_keys_dirty = False
+            position = bisect.bisect_left(self._sorted_keys, key)
+            prefixed = []
+            while position < len(self._sorted_keys) and self._sorted_keys[position].startswith(key):
+                prefixed.append(self._sorted_keys[position])
+                position += 1
+            if prefixed and len(key) >= 4:
+                shortest = min(prefixed, key=len)
+                return self._result(self._key_to_entry[shortest], round(len(key) / len(shortest), 4), "prefix")
+        return None
+
+    def _result(self, entry_id: int, score: float, match: str) -> Dict[str, Any]:
+        entry = self._entries[entry_id]
+        self.stats[f"local_{match}"] += 1
+        return {"title": entry["title"], "anime_id": entry["anime_id"], "score": score, "match": match}
+
+    # --- Upstream result cache ---
+
+    def get_cached_upstream(self, title: str) -> Optional[Dict[str, Any]]:
+        key = normalize_title(title)
+        with self._lock:
+            result = self._upstream_cache.get(key)
+            if result is not None:
+                self._upstream_cache.move_to_end(key)
+            return result
+
+    def cache_upstream(self, title: str, result: Dict[str, Any], anime_id: Optional[str] = None):
+        """Caches an upstream resolution; resolved anime are also added to the index itself."""
+        key = normalize_title(title)
+        with self._lock:
+            self._upstream_cache[key] = result
+            self._upstream_cache.move_to_end(key)
+            while len(self._upstream_cache) > self.upstream_cache_size:
+                self._upstream_cache.popitem(last=False)
+        if anime_id:
+            self.add_title(anime_id, result.get("title"), [title])
+
+    def record(self, kind: str):
+        """Counts a resolution made outside the index (e.g. "upstream_cached") in the stats."""
+        with self._lock:
+            self.stats[kind] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "anime": len(self._entries),
+                "names": len(self._key_to_entry),
+                "upstream_cache_size": len(self._upstream_cache),
+                "resolutions": dict(self.stats),
+            }
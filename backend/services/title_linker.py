@@ -0,0 +1,204 @@
+# backend/services/title_linker.py
+import json
+import logging
+import os
+import threading
+from collections import deque
+from typing import List, Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ONE_PIECE_NEWS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'one_piece_news.json')
+
+# Document types whose metadata title is a real, linkable anime title.
+LINKABLE_DOCUMENT_TYPES = {"anime", "anime_details"}
+
+
+def _fold_case(text: str) -> str:
+    """Lowercases character by character so that indexes in the result match the original text."""
+    return ''.join(lowered if len(lowered := char.lower()) == 1 else char for char in text)
+
+
+class TitleLinker:
+    """
+    Annotates known anime titles in a response with [LINK:...] markers in a single linear pass.
+
+    Titles come from the vector store metadata and `one_piece_news.json`, and are compiled
+    into an Aho-Corasick automaton. New documents are inserted into the trie as they are
+    added; the failure links are rebuilt lazily on the next annotation. Titles with a known
+    anime id are emitted as [LINK:Title|/anime/details/<id>] so the frontend needs no
+    extra resolve-link round-trip for them.
+    """
+    MIN_TITLE_LENGTH = 4
+    # Titles that appear in nearly every answer and would only add noise when linked. They are
+    # still matched, so that e.g. "Naruto" inside "Naruto Shippuden" is not linked on its own.
+    IGNORED_TITLES = ["One Piece", "Naruto Shippuden"]
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset_automaton()
+
+    def _reset_automaton(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]
+        self._patterns: List[str] = []
+        self._entries: List[Dict[str, Any]] = []
+        self._pattern_ids: Dict[str, int] = {}
+        self._merged_output: List[List[int]] = [[]]
+        self._dirty = False
+
+    # --- Building ---
+
+    def attach(self, vector_store):
+        """Indexes the store's current documents and follows every later change."""
+        vector_store.add_change_listener(self._on_store_changed)
+        self._on_store_changed("reset", vector_store.documents)
+
+    def _on_store_changed(self, event: str, documents: List[Dict[str, Any]]):
+        with self._lock:
+            if event == "reset":
+                self._reset_automaton()
+                self._add_entries([(title, None) for title in self.IGNORED_TITLES], ignored=True)
+                self._add_entries(self._load_news_titles())
+            self._add_entries(self._titles_from_documents(documents))
+
+    @staticmethod
+    def _titles_from_documents(documents: List[Dict[str, Any]]) -> List[Tuple[str, Optional[str]]]:
+        entries = []
+        for doc in documents:
+            metadata = doc.get("metadata") or {}
+            if metadata.get("type") not in LINKABLE_DOCUMENT_TYPES:
+                continue
+            anime_id = metadata.get("anime_id")
+            url = f"/anime/details/{anime_id}" if anime_id else None
+            for title in [metadata.get("title")] + list(metadata.get("alternative_titles") or []):
+                if title:
+                    entries.append((title, url))
+        return entries
+
+    @staticmethod
+    def _load_news_titles() -> List[Tuple[str, Optional[str]]]:
+        if not os.path.exists(ONE_PIECE_NEWS_PATH):
+            return []
+        try:
+            with open(ONE_PIECE_NEWS_PATH, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.error(f"TitleLinker: Could not read titles from {ONE_PIECE_NEWS_PATH}: {e}")
+            return []
+        titles = [data.get("main_title")] + list(data.get("alternative_titles") or [])
+        return [(title, None) for title in titles if title]
+
+    def _add_entries(self, entries: List[Tuple[str, Optional[str]]], ignored: bool = False):
+        for title, url in entries:
+            title = title.strip()
+            pattern = _fold_case(title)
+            if len(title) < self.MIN_TITLE_LENGTH or ']' in title or '|' in title:
+                continue
+            existing_id = self._pattern_ids.get(pattern)
+            if existing_id is not None:
+                # Keep the first title seen, but fill in a URL if it was missing.
+                if url and not self._entries[existing_id]["url"]:
+                    self._entries[existing_id]["url"] = url
+                continue
+
+            node = 0
+            for char in pattern:
+                next_node = self._goto[node].get(char)
+                if next_node is None:
+                    next_node = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                    self._goto[node][char] = next_node
+                node = next_node
+
+            pattern_id = len(self._patterns)
+            self._patterns.append(pattern)
+            self._entries.append({"title": title, "url": url, "ignored": ignored})
+            self._pattern_ids[pattern] = pattern_id
+            self._output[node].append(pattern_id)
+            self._dirty = True
+
+    def _build_failure_links(self):
+        """Recomputes failure links breadth-first. Only the trie is kept between rebuilds."""
+        self._fail = [0] * len(self._goto)
+        merged_output = [list(dict.fromkeys(output)) for output in self._output]
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                candidate = self._goto[fallback].get(char, 0)
+                self._fail[child] = candidate if candidate != child else 0
+                merged_output[child].extend(merged_output[self._fail[child]])
+        self._merged_output = merged_output
+        self._dirty = False
+
+    # --- Matching ---
+
+    def find_titles(self, text: str) -> List[Tuple[int, int, int]]:
+        """Returns non-overlapping (start, end, pattern_id) matches, preferring the leftmost-longest."""
+        with self._lock:
+            if not self._patterns:
+                return []
+            if self._dirty:
+                self._build_failure_links()
+
+            folded = _fold_case(text)
+            matches = []
+            node = 0
+            for position, char in enumerate(folded):
+                while node and char not in self._goto[node]:
+                    node = self._fail[node]
+                node = self._goto[node].get(char, 0)
+                for pattern_id in self._merged_output[node]:
+                    end = position + 1
+                    start = end - len(self._patterns[pattern_id])
+                    if self._is_linkable_span(text, start, end):
+                        matches.append((start, end, pattern_id))
+
+        matches.sort(key=lambda match: (match[0], -(match[1] - match[0])))
+        selected, last_end = [], 0
+        for start, end, pattern_id in matches:
+            if start >= last_end:
+                selected.append((start, end, pattern_id))
+                last_end = end
+        return selected
+
+    @staticmethod
+    def _is_linkable_span(text: str, start: int, end: int) -> bool:
+        """Matches must sit on word boundaries and, like a proper noun, not start lowercase."""
+        if start > 0 and (text[start - 1].isalnum() or text[start - 1] == '_'):
+            return False
+        if end < len(text) and (text[end].isalnum() or text[end] == '_'):
+            return False
+        return not text[start].islower()
+
+    def annotate(self, text: str) -> str:
+        """Wraps every known title in the text with a [LINK:...] marker."""
+        if not text:
+            return text
+        pieces, cursor = [], 0
+        for start, end, pattern_id in self.find_titles(text):
+            entry = self._entries[pattern_id]
+            if entry["ignored"]:
+                continue
+            matched_text = text[start:end]
+            pieces.append(text[cursor:start])
+            pieces.append(f"[LINK:{matched_text}|{entry['url']}]" if entry["url"] else f"[LINK:{matched_text}]")
+            cursor = end
+        pieces.append(text[cursor:])
+        return ''.join(pieces)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "titles": sum(1 for entry in self._entries if not entry["ignored"]),
+                "titles_with_url": sum(1 for entry in self._entries if entry["url"]),
+                "trie_nodes": len(self._goto),
+            }
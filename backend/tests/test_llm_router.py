@@ -0,0 +1,85 @@
+# backend/tests/test_llm_router.py
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services import llm_router
+from services.llm_provider import LLMProvider
+from services.llm_router import LLMRouter
+from services.llm_scheduler import LLMScheduler
+
+
+class FakeProvider(LLMProvider):
+    def __init__(self, key: str, scheduled: bool):
+        self.provider_key = key
+        self.model_name = key
+        if scheduled:
+            self.scheduler = LLMScheduler(max_in_flight=4)
+
+    def is_available(self) -> bool:
+        return True
+
+    def stream_formatted_response(self, *args, **kwargs):
+        yield "ok"
+
+    def get_simple_response(self, *args, **kwargs):
+        return "ok"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+def make_router(monkeypatch, slow_probe_seconds: float = 60.0):
+    clock = FakeClock()
+    monkeypatch.setattr(llm_router.time, "monotonic", clock.monotonic)
+    router = LLMRouter({"local": FakeProvider("local", scheduled=True), "cloud": FakeProvider("cloud", scheduled=False)},
+                       fallback_key="cloud", max_first_token_seconds=20.0, slow_probe_seconds=slow_probe_seconds)
+    return router, clock
+
+
+def reserve(router):
+    route = router.reserve_chat("local")
+    if route["ticket"]:
+        route["ticket"].release()
+    return route
+
+
+def test_slow_first_token_routes_to_fallback(monkeypatch):
+    router, _ = make_router(monkeypatch)
+    router.record_first_token("local", 25.0)
+    assert reserve(router)["reason"] == "slow"
+    assert reserve(router)["provider"] == "cloud"
+
+
+def test_router_returns_to_selected_provider_after_it_recovers(monkeypatch):
+    router, clock = make_router(monkeypatch)
+    router.record_first_token("local", 25.0)  # e.g. a cold model load
+    assert reserve(router)["reason"] == "slow"
+
+    # Once the probe interval has passed, one turn goes back to the selected provider...
+    clock.now += 61
+    probe = reserve(router)
+    assert probe["provider"] == "local" and probe["reason"] == "selected"
+    # ...and only one: the others keep using the fallback until the probe reports back.
+    assert reserve(router)["reason"] == "slow"
+
+    # A prompt first token from the probe brings the average back under the limit.
+    router.record_first_token("local", 1.0)
+    assert reserve(router)["provider"] == "local"
+    assert router.get_stats()["providers"]["local"]["routes"]["slow_probe"] == 1
+
+
+def test_router_stays_on_fallback_while_probes_are_still_slow(monkeypatch):
+    router, clock = make_router(monkeypatch)
+    router.record_first_token("local", 60.0)
+    assert reserve(router)["reason"] == "slow"
+    clock.now += 61
+    assert reserve(router)["provider"] == "local"
+    router.record_first_token("local", 60.0)
+    assert reserve(router)["reason"] == "slow"
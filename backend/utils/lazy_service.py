@@ -0,0 +1,53 @@
+# backend/utils/lazy_service.py
+import threading
+from typing import Any, Callable
+
+
+class LazyService:
+    """
+    Stands in for a service that is built on first use instead of at import time.
+
+    Attribute access is forwarded to the real instance, which `factory` builds once
+    (thread-safely) the first time anything is looked up on it, so callers can keep using
+    `global_x.method()` unchanged. The proxy's own attributes are underscore-prefixed to
+    avoid shadowing the service's.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], Any]):
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_instance", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    def _resolve(self) -> Any:
+        instance = self._instance
+        if instance is None:
+            with self._lock:
+                instance = self._instance
+                if instance is None:
+                    instance = self._factory()
+                    object.__setattr__(self, "_instance", instance)
+        return instance
+
+    @property
+    def _initialized(self) -> bool:
+        return self._instance is not None
+
+    def __getattr__(self, attribute: str) -> Any:
+        return getattr(self._resolve(), attribute)
+
+    def __setattr__(self, attribute: str, value: Any):
+        setattr(self._resolve(), attribute, value)
+
+    def __repr__(self) -> str:
+        state = repr(self._instance) if self._instance is not None else "not initialized"
+        return f"<LazyService {self._name}: {state}>"
+
+
+def resolve(service: Any) -> Any:
+    """The real object behind a LazyService (building it if needed); other objects are returned as-is."""
+    return service._resolve() if isinstance(service, LazyService) else service
+
+
+def is_initialized(service: Any) -> bool:
+    return service._initialized if isinstance(service, LazyService) else True
@@ -0,0 +1,127 @@
+# backend/utils/text_processing.py
+from typing import List, Tuple
+
+
+class StreamingResponseProcessor:
+    """
+    Incrementally cleans an LLM token stream as it arrives.
+
+    Chunks are fed in one at a time and turned into ("mood", value) and ("text", delta)
+    events straight away: <think>...</think> spans are suppressed, <mood> tags are parsed
+    as soon as they close, and any other tag is stripped even when it is split across
+    chunk boundaries. The cleaned text is stripped of leading/trailing whitespace, exactly
+    like the old buffer-then-send implementation.
+    """
+    DEFAULT_MOOD = 'happy'
+    # A '<' that is not closed within this many characters is treated as literal text.
+    MAX_TAG_LENGTH = 32
+
+    def __init__(self):
+        self.mood = None
+        self.text = ""
+        self._buffer = ""
+        self._in_think = False
+        self._in_mood = False
+        self._mood_buffer = ""
+        self._pending_whitespace = ""
+
+    def feed(self, chunk: str) -> List[Tuple[str, str]]:
+        """Consumes one chunk of raw model output and returns the events it completes."""
+        events = []
+        self._buffer += chunk
+        self._drain(events, final=False)
+        return events
+
+    def finish(self) -> List[Tuple[str, str]]:
+        """Flushes whatever is still buffered once the stream has ended."""
+        events = []
+        self._drain(events, final=True)
+        if self._in_mood and self._mood_buffer:
+            # An unterminated <mood> tag: keep its content as text rather than losing it.
+            self._emit_text(self._mood_buffer, events)
+        self._in_mood = False
+        self._mood_buffer = ""
+        return events
+
+    def _consume_until(self, closing_tag: str, final: bool) -> Tuple[str, bool]:
+        """Returns (consumed_text, closed) for the span ending at closing_tag."""
+        end = self._buffer.lower().find(closing_tag)
+        if end == -1:
+            # Hold back just enough characters to recognise a closing tag split across chunks.
+            keep = 0 if final else len(closing_tag) - 1
+            split_at = max(len(self._buffer) - keep, 0)
+            consumed, self._buffer = self._buffer[:split_at], self._buffer[split_at:]
+            return consumed, False
+        consumed = self._buffer[:end]
+        self._buffer = self._buffer[end + len(closing_tag):]
+        return consumed, True
+
+    def _drain(self, events: List[Tuple[str, str]], final: bool):
+        while self._buffer:
+            if self._in_think:
+                _, closed = self._consume_until('</think>', final)
+                if not closed:
+                    return
+                self._in_think = False
+                continue
+
+            if self._in_mood:
+                consumed, closed = self._consume_until('</mood>', final)
+                self._mood_buffer += consumed
+                if not closed:
+                    return
+                self._in_mood = False
+                self.mood = self._mood_buffer.strip().lower() or self.DEFAULT_MOOD
+                self._mood_buffer = ""
+                events.append(("mood", self.mood))
+                continue
+
+            tag_start = self._buffer.find('<')
+            if tag_start == -1:
+                self._emit_text(self._buffer, events)
+                self._buffer = ""
+                return
+            if tag_start > 0:
+                self._emit_text(self._buffer[:tag_start], events)
+                self._buffer = self._buffer[tag_start:]
+
+            tag_end = self._buffer.find('>')
+            if tag_end == -1:
+                if not final and len(self._buffer) < self.MAX_TAG_LENGTH:
+                    return  # Possibly a tag split across chunks; wait for more input.
+                self._emit_text('<', events)
+                self._buffer = self._buffer[1:]
+                continue
+            if tag_end == 1:
+                # '<>' is not a tag.
+                self._emit_text('<>', events)
+                self._buffer = self._buffer[2:]
+                continue
+
+            tag_name = self._buffer[1:tag_end].strip().lower()
+            self._buffer = self._buffer[tag_end + 1:]
+            if tag_name == 'think':
+                self._in_think = True
+            elif tag_name == 'mood':
+                self._in_mood = True
+                self._mood_buffer = ""
+            # Every other tag (closing tags, stray markup) is simply dropped.
+
+    def _emit_text(self, text: str, events: List[Tuple[str, str]]):
+        if not self.text:
+            text = (self._pending_whitespace + text).lstrip()
+            self._pending_whitespace = ""
+            if not text:
+                return
+            if self.mood is None:
+                self.mood = self.DEFAULT_MOOD
+                events.append(("mood", self.mood))
+        else:
+            text = self._pending_whitespace + text
+
+        # Trailing whitespace is held back until more text follows, so the stream never ends on it.
+        stripped = text.rstrip()
+        self._pending_whitespace = text[len(stripped):]
+        if stripped:
+            self.text += stripped
+            events.append(("text", stripped))
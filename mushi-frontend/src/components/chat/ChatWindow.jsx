@@ -19,6 +19,13 @@ const snailImages = {
 
 const getSnailIcon = (mood = 'default') => snailImages[mood] || snailImages.default;
 
+// Metadata filters sent with each question, to scope the knowledge-base search.
+const chatScopes = {
+    all: { label: 'Everything', filters: null },
+    onePiece: { label: 'One Piece lore', filters: { source: 'One Piece API' } },
+    anime: { label: 'Anime catalogue', filters: { source: 'Anime API' } },
+};
+
 const MushiAvatar = ({ src }) => (
   <div className="w-10 h-10 rounded-full flex-shrink-0 bg-gradient-to-br from-purple-600 to-pink-600 flex items-center justify-center shadow-lg">
     <img src={src} alt="Mushi Icon" className="w-9 h-9 object-contain" />
@@ -32,11 +39,13 @@ const UserAvatar = () => (
 );
 
 
-const ResolvedLink = ({ title }) => {
-    const [linkData, setLinkData] = useState({ title: title, url: null });
-    const [isLoading, setIsLoading] = useState(true);
+const ResolvedLink = ({ title, url }) => {
+    const [linkData, setLinkData] = useState({ title: title, url: url || null });
+    const [isLoading, setIsLoading] = useState(!url);
 
     useEffect(() => {
+        // Titles the backend already matched to a known anime arrive with their URL.
+        if (url) return;
         let isMounted = true;
         api.llm.resolveLink(title).then(data => {
             if (isMounted && data) setLinkData(data);
@@ -47,7 +56,7 @@ const ResolvedLink = ({ title }) => {
             if (isMounted) setIsLoading(false);
         });
         return () => { isMounted = false; };
-    }, [title]);
+    }, [title, url]);
 
     if (isLoading) {
         return <span className="text-pink-400/50">{title}</span>;
@@ -71,10 +80,10 @@ const MessageRenderer = ({ text }) => {
     return (
         <div className="markdown-content">
             {parts.map((part, index) => {
-                const linkMatch = part.match(/\[LINK:(.*?)\]/);
+                const linkMatch = part.match(/\[LINK:(.*?)(?:\|(.*?))?\]/);
                 if (linkMatch) {
-                    const title = linkMatch[1];
-                    return <ResolvedLink key={`${index}-${title}`} title={title} />;
+                    const [, title, url] = linkMatch;
+                    return <ResolvedLink key={`${index}-${title}`} title={title} url={url} />;
                 }
 
                 const spoilerMatch = part.match(/<spoiler>(.*?)<\/spoiler>/s);
@@ -102,10 +111,12 @@ function ChatWindow({ initialQuery }) {
     const [copiedMessageId, setCopiedMessageId] = useState(null);
     const [editingMessageId, setEditingMessageId] = useState(null);
     const [editingMessageText, setEditingMessageText] = useState('');
+    const [chatScope, setChatScope] = useState('all');
 
     const abortControllerRef = useRef(null);
     const chatContainerRef = useRef(null);
     const initialQueryProcessed = useRef(false);
+    const conversationIdRef = useRef(`conv-${Date.now()}-${Math.random().toString(36).slice(2, 8)}`);
 
     useEffect(() => {
         chatContainerRef.current?.scrollTo({ top: chatContainerRef.current.scrollHeight, behavior: 'smooth' });
@@ -121,12 +132,14 @@ function ChatWindow({ initialQuery }) {
     const processQueryAndGetResponse = async (queryToProcess) => {
         setSuggestedQuestions([]);
         setIsLoading(true);
-        const history = messages.slice(-4).map(m => ({ sender: m.sender, text: m.text }));
+        // The backend keeps recent turns verbatim and compacts older ones, so send the whole conversation.
+        const history = messages.filter(m => m.id !== 'welcome-message').map(m => ({ sender: m.sender, text: m.text }));
         const userMessageId = `user-${Date.now()}`;
         setMessages(prev => [...prev, { sender: 'user', text: queryToProcess, id: userMessageId }]);
         setCurrentStreamingBotMessage('');
 
         let accumulatedBotResponse = '';
+        let streamedSuggestions = null;
         let finalBotIcon = getSnailIcon('thinking');
         setCurrentBotIcon(finalBotIcon);
 
@@ -134,7 +147,7 @@ function ChatWindow({ initialQuery }) {
         const signal = abortControllerRef.current.signal;
 
         try {
-            await api.llm.chat(queryToProcess, history, (chunk) => {
+            await api.llm.chat(queryToProcess, history, conversationIdRef.current, (chunk) => {
                 if (signal.aborted) return;
 
                 if (chunk.type === 'mood') {
@@ -142,15 +155,23 @@ function ChatWindow({ initialQuery }) {
                     setCurrentBotIcon(finalBotIcon);
                 } else if (chunk.type === 'text') {
                     accumulatedBotResponse += chunk.content;
+                } else if (chunk.type === 'final') {
+                    // The link-annotated answer replaces the raw text streamed so far.
+                    accumulatedBotResponse = chunk.content;
+                } else if (chunk.type === 'suggestions') {
+                    // Generated alongside the answer, so no separate request is needed.
+                    streamedSuggestions = chunk.content || [];
                 } else if (chunk.type === 'error') {
                      accumulatedBotResponse += `\n\n**Error:** ${chunk.content}`;
                      finalBotIcon = getSnailIcon('error');
                      setCurrentBotIcon(finalBotIcon);
                 }
                 setCurrentStreamingBotMessage(accumulatedBotResponse);
-            }, signal);
+            }, signal, chatScopes[chatScope].filters);
 
-            if (!signal.aborted && accumulatedBotResponse) {
+            if (!signal.aborted && streamedSuggestions) {
+                setSuggestedQuestions(streamedSuggestions);
+            } else if (!signal.aborted && accumulatedBotResponse) {
                 const suggestionPayload = { user_query: queryToProcess, mushi_response: accumulatedBotResponse };
                 const suggestionsResponse = await api.llm.getSuggestedQuestions(suggestionPayload);
                 if (suggestionsResponse) setSuggestedQuestions(suggestionsResponse.suggested_questions || []);
@@ -176,7 +197,7 @@ function ChatWindow({ initialQuery }) {
     const handleSaveEdit = () => { processQueryAndGetResponse(editingMessageText); setEditingMessageId(null); setEditingMessageText(''); };
     const handleCancelEdit = () => { setEditingMessageId(null); setEditingMessageText(''); };
     const handleCopy = (text, id) => { navigator.clipboard.writeText(text).then(() => { setCopiedMessageId(id); setTimeout(() => setCopiedMessageId(null), 2000); }); };
-    const handleClearChat = () => { setMessages([{ sender: 'bot', text: 'Welcome to Mushi AI. How can I help you today?', id: 'welcome-message', iconSrc: getSnailIcon('happy') }]); setSuggestedQuestions([]); handleStopGeneration(); };
+    const handleClearChat = () => { setMessages([{ sender: 'bot', text: 'Welcome to Mushi AI. How can I help you today?', id: 'welcome-message', iconSrc: getSnailIcon('happy') }]); setSuggestedQuestions([]); handleStopGeneration(); conversationIdRef.current = `conv-${Date.now()}-${Math.random().toString(36).slice(2, 8)}`; };
 
     return (
         <div className="flex flex-col h-full bg-neutral-950/50 p-4 rounded-lg shadow-2xl border border-white/10">
@@ -248,6 +269,17 @@ function ChatWindow({ initialQuery }) {
                     {isSpeechActive ? <StopCircle size={20}/> : <Mic size={20}/>}
                 </button>
 
+                <select
+                    value={chatScope}
+                    onChange={(e) => setChatScope(e.target.value)}
+                    className="bg-white/10 rounded-full py-3 px-4 text-sm text-gray-200 focus:outline-none focus:ring-2 focus:ring-pink-500 border border-white/20"
+                    title="Search scope"
+                >
+                    {Object.entries(chatScopes).map(([key, scope]) => (
+                        <option key={key} value={key} className="bg-neutral-900">{scope.label}</option>
+                    ))}
+                </select>
+
                 <input
                     type="text"
                     value={inputValue}
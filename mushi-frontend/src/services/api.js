@@ -23,12 +23,12 @@ const handleError = (context, error) => {
 
 export const api = {
   llm: {
-    chat: async (query, history, onChunkReceived, signal) => {
+    chat: async (query, history, conversationId, onChunkReceived, signal, filters = null) => {
         try {
             const response = await fetch(`/api/llm/chat`, {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ query, history }),
+                body: JSON.stringify({ query, history, conversation_id: conversationId, session_id: conversationId, filters }),
                 signal: signal,
             });
 
@@ -87,6 +87,16 @@ export const api = {
         return { title, url: `/search?keyword=${encodeURIComponent(title)}` };
       }
     },
+    bulkSearch: async (queries, topK = 5, filters = null, includeContent = false) => {
+      try {
+        const response = await apiClient.post('/api/llm/search', {
+          queries, top_k: topK, filters, include_content: includeContent
+        });
+        return response.data;
+      } catch (error) {
+        handleError('searching documents', error);
+      }
+    },
     getProviders: async () => {
       try {
         const response = await apiClient.get('/api/llm/providers');
@@ -305,6 +315,30 @@ export const api = {
           handleError(`ingesting category data for ${categories}`, error);
         }
     },
+    getIngestionJob: async (jobId) => {
+        try {
+          const response = await apiClient.get(`/api/data/jobs/${jobId}`);
+          return response.data;
+        } catch (error) {
+          handleError(`fetching ingestion job ${jobId}`, error);
+        }
+    },
+    listIngestionJobs: async (limit = 20) => {
+        try {
+          const response = await apiClient.get('/api/data/jobs', { params: { limit } });
+          return response.data;
+        } catch (error) {
+          handleError('listing ingestion jobs', error);
+        }
+    },
+    cancelIngestionJob: async (jobId) => {
+        try {
+          const response = await apiClient.post(`/api/data/jobs/${jobId}/cancel`);
+          return response.data;
+        } catch (error) {
+          handleError(`cancelling ingestion job ${jobId}`, error);
+        }
+    },
   },
 
   news: {